@@ -0,0 +1,58 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Measuring helpers shared by the benchmarks (imported as `_common`, the script directory is in sys.path).
+"""
+
+import time
+import tracemalloc
+
+
+def timed(func):
+    """ Call function once and measure its run time
+    :param func: The function without arguments
+    :return Tuple [elapsed time in seconds, return value of func]
+    """
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def each(func, items):
+    """ Call function for every item, the loop measured by measure() """
+    for item in items:
+        func(item)
+
+
+def measure(name, func, repeat=5, width=8):
+    """ Measure the best run time of repeated calls and print it in ms
+    :param name: The case name
+    :param func: The function without arguments
+    :param repeat: Count of calls, the fastest one is reported
+    :param width: Width of name column
+    :return the best elapsed time in seconds
+    """
+    elapsed = min(timed(func)[0] for _ in range(repeat))
+    print(" {:<{}s}: {:8.3f} ms".format(name, width, elapsed * 1e3))
+    return elapsed
+
+
+def measure_peak(name, func, width=8):
+    """ Measure run time and peak of traced memory allocations of one call and print them
+    :param name: The case name
+    :param func: The function without arguments
+    :param width: Width of name column
+    :return Tuple [elapsed time in seconds, peak memory in bytes, return value of func]
+    """
+    tracemalloc.start()
+    try:
+        elapsed, result = timed(func)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    print(" {:<{}s}: {:8.3f} ms, peak {:8.1f} MB".format(name, width, elapsed * 1e3, peak / 1e6))
+    return elapsed, peak, result
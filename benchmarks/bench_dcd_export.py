@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of memory usage and export time of DCD write entries.
+
+    $ python benchmarks/bench_dcd_export.py [count of write entries, default: 7000]
+
+ - "legacy" keeps the entries as list of [address, value] lists and packs them one by one (original implementation)
+ - "current" keeps the entries in array('I') and exports them by single byteswap
+"""
+
+import sys
+import time
+import tracemalloc
+from struct import pack
+
+import imx.img as img
+
+
+class LegacyWriteData(object):
+
+    def __init__(self):
+        self.header = img.CmdWriteData().export()
+        self.data = []
+
+    def append(self, address, value):
+        self.data.append([address, value])
+
+    def export(self):
+        raw_data = self.header
+        for cmd in self.data:
+            raw_data += pack(">LL", cmd[0], cmd[1])
+        return raw_data
+
+
+def measure(name, cls, count, repeat=5):
+    tracemalloc.start()
+    cmd = cls()
+    for i in range(count):
+        cmd.append(0x307A0000 + 4 * i, i)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    elapsed = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cmd.export()
+        elapsed.append(time.perf_counter() - start)
+    print(" {:<8s}: {:8.1f} kB ({:5.1f} B/entry), export {:8.3f} ms".format(
+        name, memory / 1e3, memory / count, min(elapsed) * 1e3))
+    return memory, min(elapsed)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 7000
+    print(" DCD: {} write entries".format(count))
+    before = measure('legacy', LegacyWriteData, count)
+    after = measure('current', img.CmdWriteData, count)
+    print(" Memory  : {:8.1f}x less, export {:.1f}x faster".format(before[0] / after[0], before[1] / after[1]))
+
+
+if __name__ == '__main__':
+    main()
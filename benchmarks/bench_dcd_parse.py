@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of binary DCD parsing.
+
+    $ python benchmarks/bench_dcd_parse.py [count of write entries, default: 10000]
+
+The length of DCD segment is 16-bit value, so the entries are split into more segments (max 7000 entries per segment).
+
+ - "legacy" tries every command class for each command and decodes the write entries one by one
+   (original implementation)
+ - "current" selects the command parser by header tag and decodes the write entries in bulk
+"""
+
+import sys
+from struct import unpack_from
+
+import imx.img as img
+from imx.img.header import Header, SegTag, UnparsedException, CorruptedException
+from _common import each, measure
+
+
+def legacy_write_data(data, offset):
+    header = Header.parse(data, offset, 0xCC)
+    obj = img.CmdWriteData(header.param & 0x7, (header.param >> 3) & 0x3)
+    index = header.size
+    while index < header.length:
+        (address, value) = unpack_from(">LL", data, offset + index)
+        obj.append(address, value)
+        index += 8
+    return obj
+
+
+def legacy(data):
+    parsers = (legacy_write_data, img.CmdCheckData.parse, img.CmdNop.parse, img.CmdUnlock.parse)
+    header = Header.parse(data, 0, SegTag.DCD)
+    index = header.size
+    obj = img.SegDCD(header.param, True)
+    while index < header.length:
+        for parser in parsers:
+            try:
+                cmd_obj = parser(data, index)
+            except UnparsedException:
+                continue
+            obj.append(cmd_obj)
+            index += cmd_obj.size
+            break
+        else:
+            raise CorruptedException("at position: " + hex(index))
+    return obj
+
+
+def dcd_blobs(count, max_count=7000):
+    """ Create DCD segments with write commands interleaved by check commands (as DDR init does) """
+    blobs = []
+    for start in range(0, count, max_count):
+        dcd = img.SegDCD(enabled=True)
+        for block in range(start, min(count, start + max_count), 100):
+            cmd = img.CmdWriteData(4)
+            for i in range(block, min(count, start + max_count, block + 100)):
+                cmd.append(0x307A0000 + 4 * i, i)
+            dcd.append(cmd)
+            dcd.append(img.CmdCheckData(4, 0, 0x307A0004, 0x1))
+        blobs.append(dcd.export())
+    return blobs
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    blobs = dcd_blobs(count)
+    print(" DCD: {} write entries, {} segments, {} Bytes".format(count, len(blobs), sum(map(len, blobs))))
+    for data in blobs:
+        assert legacy(data).export() == img.SegDCD.parse(data).export() == data
+    before = measure('legacy', lambda: each(legacy, blobs))
+    after = measure('current', lambda: each(img.SegDCD.parse, blobs))
+    print(" Speedup : {:8.1f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of DCD rendering into text (SegDCD.export_txt) and info string (SegDCD.info).
+
+    $ python benchmarks/bench_dcd_render.py [count of write entries, default: 50000]
+
+The length of DCD segment is 16-bit value, so the entries are split into more segments (max 7000 entries per segment).
+
+ - "legacy" concatenates the string by += with one format call per entry (original implementation)
+ - "current" renders the entries in chunks by single % operation and joins the parts at once
+"""
+
+import io
+import sys
+
+import imx.img as img
+from _common import each, measure
+
+
+def legacy_txt(dcd):
+    write_ops = ('WriteValue', 'WriteValue1', 'ClearBitMask', 'SetBitMask')
+    check_ops = ('CheckAllClear', 'CheckAllSet', 'CheckAnyClear', 'CheckAnySet')
+    txt_data = ""
+    for cmd in dcd:
+        if type(cmd) is img.CmdWriteData:
+            for (address, value) in cmd:
+                txt_data += "{0:s} {1:d} 0x{2:08X} 0x{3:08X}\n".format(write_ops[cmd.ops], cmd.bytes, address, value)
+        else:
+            txt_data += "{0:s} {1:d} 0x{2:08X} 0x{3:08X}".format(check_ops[cmd.ops], cmd.bytes, cmd.address, cmd.mask)
+            txt_data += " {0:d}\n".format(cmd.count) if cmd.count else "\n"
+        txt_data += '\n'
+    return txt_data
+
+
+def legacy_info(dcd):
+    msg = ""
+    for cmd in dcd:
+        if type(cmd) is img.CmdWriteData:
+            msg += "-" * 60 + "\n"
+            msg += "Write Data Command (Ops: {0:s}, Bytes: {1:d})\n".format(img.EnumWriteOps[cmd.ops], cmd.bytes)
+            msg += "-" * 60 + "\n"
+            for entry in cmd:
+                msg += "- Address: 0x{0:08X}, Value: 0x{1:08X}\n".format(entry[0], entry[1])
+        else:
+            msg += str(cmd)
+        msg += "\n"
+    return msg
+
+
+def dcd_segments(count, max_count=7000):
+    """ Create DCD segments with write commands interleaved by check commands (as DDR init does) """
+    segments = []
+    for start in range(0, count, max_count):
+        dcd = img.SegDCD(enabled=True)
+        for block in range(start, min(count, start + max_count), 1000):
+            cmd = img.CmdWriteData(4)
+            for i in range(block, min(count, start + max_count, block + 1000)):
+                cmd.append(0x307A0000 + 4 * i, i)
+            dcd.append(cmd)
+            dcd.append(img.CmdCheckData(4, 0, 0x307A0004, 0x1, 5))
+        segments.append(dcd)
+    return segments
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    segments = dcd_segments(count)
+    print(" DCD: {} write entries, {} segments".format(count, len(segments)))
+    for dcd in segments:
+        assert legacy_txt(dcd) == dcd.export_txt()
+        assert legacy_info(dcd) == dcd.info()
+    before = measure('legacy txt', lambda: each(legacy_txt, segments), width=14)
+    after = measure('export_txt', lambda: each(img.SegDCD.export_txt, segments), width=14)
+    measure('write_txt', lambda: each(lambda dcd: dcd.write_txt(io.StringIO()), segments), width=14)
+    print(" Speedup       : {:8.1f}x".format(before / after))
+    before = measure('legacy info', lambda: each(legacy_info, segments), width=14)
+    after = measure('info', lambda: each(img.SegDCD.info, segments), width=14)
+    print(" Speedup       : {:8.1f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of DCD text parsing, the text is created by SegDCD.export_txt() and parsed back (round-trip).
+
+    $ python benchmarks/bench_dcd_txt.py [count of write entries, default: 10000]
+
+The length of DCD segment is 16-bit value, so the entries are split into more segments (max 7000 entries per segment).
+The texts are parsed as exported and with comment at the end of every write line ("# reg N").
+
+ - "legacy" splits every line and converts the values one by one (original implementation)
+ - "current" matches the write lines by precompiled regex and converts whole write blocks at once
+"""
+
+import sys
+
+import imx.img as img
+from imx.img.commands import EnumWriteOps, EnumCheckOps
+from _common import each, measure
+
+
+def legacy(text):
+    write_ops = {'WriteValue': int(EnumWriteOps.WRITE_VALUE), 'WriteValue1': int(EnumWriteOps.WRITE_VALUE1),
+                 'ClearBitMask': int(EnumWriteOps.CLEAR_BITMASK), 'SetBitMask': int(EnumWriteOps.SET_BITMASK)}
+    check_ops = {'CheckAllClear': int(EnumCheckOps.ALL_CLEAR), 'CheckAllSet': int(EnumCheckOps.ALL_SET),
+                 'CheckAnyClear': int(EnumCheckOps.ANY_CLEAR), 'CheckAnySet': int(EnumCheckOps.ANY_SET)}
+    cmd_write = None
+    dcd_obj = img.SegDCD(enabled=True)
+    for line in text.split('\n'):
+        cmd = line.rstrip('\0').split()
+        if not cmd or cmd[0] not in write_ops and cmd[0] not in check_ops:
+            continue
+        if cmd[0] in write_ops:
+            ops, bytes, addr, value = write_ops[cmd[0]], int(cmd[1]), int(cmd[2], 0), int(cmd[3], 0)
+            if cmd_write is not None and (cmd_write.ops != ops or cmd_write.bytes != bytes):
+                dcd_obj.append(cmd_write)
+                cmd_write = None
+            if cmd_write is None:
+                cmd_write = img.CmdWriteData(bytes, ops)
+            cmd_write.append(addr, value)
+        else:
+            if cmd_write is not None:
+                dcd_obj.append(cmd_write)
+                cmd_write = None
+            count = int(cmd[4], 0) if len(cmd) > 4 else None
+            dcd_obj.append(img.CmdCheckData(int(cmd[1]), check_ops[cmd[0]], int(cmd[2], 0), int(cmd[3], 0), count))
+    if cmd_write is not None:
+        dcd_obj.append(cmd_write)
+    return dcd_obj
+
+
+def dcd_texts(count, max_count=7000):
+    """ Create DCD texts with write commands interleaved by check commands (as DDR init does) """
+    texts = []
+    for start in range(0, count, max_count):
+        dcd = img.SegDCD(enabled=True)
+        for block in range(start, min(count, start + max_count), 100):
+            cmd = img.CmdWriteData(4)
+            for i in range(block, min(count, start + max_count, block + 100)):
+                cmd.append(0x307A0000 + 4 * i, i)
+            dcd.append(cmd)
+            dcd.append(img.CmdCheckData(4, 0, 0x307A0004, 0x1, 5))
+        texts.append(dcd.export_txt())
+    return texts
+
+
+def commented(text):
+    """ Add comment at the end of every write line """
+    lines = text.split('\n')
+    for i, line in enumerate(lines):
+        if line.startswith('WriteValue'):
+            lines[i] = line + ' # reg {}'.format(i)
+    return '\n'.join(lines)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    texts = dcd_texts(count)
+    for name, cases in (('exported', texts), ('commented', [commented(text) for text in texts])):
+        print(" DCD {}: {} write entries, {} segments, {} chars".format(name, count, len(cases),
+                                                                     sum(map(len, cases))))
+        for text, origin in zip(cases, texts):
+            dcd = img.SegDCD.parse_txt(text)
+            assert legacy(text).export() == dcd.export()
+            assert dcd.export_txt() == origin
+        before = measure('legacy', lambda: each(legacy, cases))
+        after = measure('current', lambda: each(img.SegDCD.parse_txt, cases))
+        print(" Speedup : {:8.1f}x\n".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
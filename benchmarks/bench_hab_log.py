@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of i.MX6 HAB log decoding from many boards.
+
+    $ python benchmarks/bench_hab_log.py [count of logs, default: 10000]
+
+ - "legacy" unpacks the log word by word into text (original implementation)
+ - "text" decodes the log into events and renders them into text (parse_hab_log)
+ - "table" decodes all logs into single columnar table (decode_hab_logs)
+"""
+
+import sys
+import struct
+import random
+
+from imx import hab
+from imx.hab.parser import MX6_SINGLE_DESC, MX6_DOUBLE_DESC
+from _common import measure
+
+
+def legacy(data):
+    ret_msg = ''
+    log_loop = 0
+    while log_loop < 64:
+        log_value = struct.unpack_from('I', data, log_loop * 4)[0]
+        if log_value == 0x0:
+            break
+        if log_value in MX6_SINGLE_DESC:
+            ret_msg += " %02d. (0x%08X) -> %s\n" % (log_loop, log_value, MX6_SINGLE_DESC[log_value])
+        elif log_value in MX6_DOUBLE_DESC:
+            ret_msg += " %02d. (0x%08X) -> %s\n" % (log_loop, log_value, MX6_DOUBLE_DESC[log_value])
+            log_loop += 1
+            log_data = struct.unpack_from('I', data, log_loop * 4)[0]
+            if log_value == 0x00090000:
+                ret_msg += " %02d. (0x%08X) -> HAB Status Code: 0x%02X  %s\n" % \
+                           (log_loop, log_data, log_data & 0xff, hab.EnumHabStatus.desc(log_data & 0xff))
+                ret_msg += "                     HAB Reason Code: 0x%02X  %s\n" % \
+                           ((log_data >> 8) & 0xff, hab.EnumHabReason.desc((log_data >> 8) & 0xff))
+            else:
+                ret_msg += " %02d. (0x%08X) -> Address: 0x%08X\n" % (log_loop, log_data, log_data)
+        else:
+            ret_msg += " Log Buffer Code not found\n"
+        log_loop += 1
+    return ret_msg
+
+
+def mx6_logs(count):
+    """ Create logs of USDHC boot with some HAB failures """
+    random.seed(0)
+    logs = []
+    for _ in range(count):
+        words = [0x00010000, 0x000200CC, 0x00030000, 0x00040000, 0x00050000, 0x00060001, 0x00070000, 0x000700F0]
+        for _ in range(random.randint(1, 6)):
+            words += [0x00080000, random.randrange(0x80000000, 0x90000000, 0x200), 0x000800F0]
+            words += [0x00090000, random.choice((0x000000F0, 0x00001833, 0x00000569))]
+        words += [0x000B0000, 0x87800000]
+        logs.append(struct.pack('<64I', *(words + [0] * 64)[:64]))
+    return logs
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    logs = mx6_logs(count)
+    print(" HAB Logs: {} x i.MX6".format(count))
+    for data in logs[:100]:
+        assert legacy(data) == hab.parse_hab_log(hab.EnumDevType.IMX6, data)
+    before = measure('legacy', lambda: [legacy(data) for data in logs], repeat=3)
+    measure('text', lambda: [hab.parse_hab_log(hab.EnumDevType.IMX6, data) for data in logs], repeat=3)
+    after = measure('table', lambda: hab.decode_hab_logs(hab.EnumDevType.IMX6, logs), repeat=3)
+    print(" Speedup : {:8.1f}x (table vs legacy)".format(before / after))
+
+    # Failure statistics: count of HAB status codes over all boards
+    table = hab.decode_hab_logs(hab.EnumDevType.IMX6, logs)
+    failed = set(log for log, word in zip(table['log'], table['hab']) if word is not None and word & 0xFF != 0xF0)
+    print(" Boards with HAB event other than success: {} of {}".format(len(failed), count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of boot image export (time and peak of allocated memory).
+
+    $ python benchmarks/bench_img_export.py [APP sizes in MB, default: 1,16,256]
+
+ - "legacy" concatenates the padded segments one by one (original implementation)
+ - "export" joins the image parts into single preallocated bytearray
+ - "export_to" streams the image parts directly into file
+"""
+
+import os
+import sys
+import tempfile
+
+import imx.img as img
+from _common import measure_peak
+
+
+def legacy(boot):
+    boot._update()
+    data = boot.ivt.export(True)
+    data += boot.bdt.export(True)
+    data += boot.dcd.export(True)
+    data += boot.app.export(True)
+    data += boot.csf.export(True)
+    return data
+
+
+def main():
+    sizes = [int(size) for size in sys.argv[1].split(',')] if len(sys.argv) > 1 else [1, 16, 256]
+    fd, path = tempfile.mkstemp(suffix='.imx')
+    os.close(fd)
+    try:
+        for size in sizes:
+            boot = img.BootImg2(address=0x877FF000)
+            boot.app = img.SegAPP(bytes(size * 1024 * 1024 + 123))
+            print(" APP: {} MB".format(size))
+            before = measure_peak('legacy', lambda: legacy(boot), width=10)[0]
+            after = measure_peak('export', boot.export, width=10)[0]
+            with open(path, 'wb') as f:
+                measure_peak('export_to', lambda: boot.export_to(f), width=10)
+            print(" Speedup   : {:9.1f}x\n".format(before / after))
+            del boot
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of boot image parsing from bytes (time and peak of allocated memory).
+
+    $ python benchmarks/bench_img_load.py [APP size in MB]
+
+ - "legacy" wraps the input into BufferedReader(BytesIO()) (original implementation)
+ - "current" parses directly over memoryview of the input, the APP data stay a zero-copy slice
+"""
+
+import sys
+from io import BytesIO, BufferedReader
+
+import imx.img as img
+from _common import measure_peak
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    boot = img.BootImg2(address=0x877FF000)
+    boot.app = img.SegAPP(bytes(size * 1024 * 1024))
+    data = boot.export()
+    print(" Image: {} MB".format(len(data) // (1024 * 1024)))
+    before = measure_peak('legacy', lambda: img.parse(BufferedReader(BytesIO(data))))[:2]
+    after = measure_peak('current', lambda: img.parse(data))[:2]
+    print(" Speedup : {:8.1f}x, memory: {:.1f} MB -> {:.1f} MB".format(
+        before[0] / after[0], before[1] / 1e6, after[1] / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of boot image detection in imx.img.parse on synthetic disk image.
+
+    $ python benchmarks/bench_img_parse.py [size in MB]
+
+The disk image is filled by random data and the boot image is placed at its end, so the whole disk
+must be scanned. The "legacy" path reproduces the original implementation (seek + read per step),
+the "current" path is imx.img.parse reading from the same file object.
+"""
+
+import os
+import sys
+import tempfile
+from io import BufferedReader
+
+import imx.img as img
+from imx.img.header import Header
+from imx.img.misc import read_raw_data
+from imx.img.segments import SegTag, SegIVT2, SegIVT3a, SegIVT3b
+from _common import timed
+
+
+def legacy_parse(buffer, step=0x100):
+    start_index = buffer.tell()
+    buffer.seek(0, 2)
+    last_index = buffer.tell()
+    buffer.seek(start_index, 0)
+
+    while buffer.tell() < (last_index - Header.SIZE):
+        hrd = read_raw_data(buffer, Header.SIZE)
+        buffer.seek(-Header.SIZE, 1)
+        if   hrd[0] == SegTag.IVT2 and ((hrd[1] << 8) | hrd[2]) == SegIVT2.SIZE:
+            return img.BootImg2.parse(buffer)
+        elif hrd[0] == SegTag.IVT2 and ((hrd[1] << 8) | hrd[2]) == SegIVT3b.SIZE:
+            return img.BootImg3b.parse(buffer)
+        elif hrd[0] == SegTag.IVT3 and ((hrd[1] << 8) | hrd[2]) == SegIVT3a.SIZE:
+            return img.BootImg3a.parse(buffer)
+        elif hrd[3] == SegTag.BIC1:
+            return img.BootImg4.parse(buffer)
+        else:
+            buffer.seek(step, 1)
+
+    raise Exception(' Not an i.MX Boot Image !')
+
+
+def disk_image(f, size):
+    boot = img.BootImg2(address=0x877FF000)
+    boot.app = img.SegAPP(bytes(0x10000))
+    block = bytearray(os.urandom(0x100000))
+    # Remove accidental tags at scanned positions
+    for i in range(0, len(block), 0x100):
+        if block[i] in (SegTag.IVT2, SegTag.IVT3):
+            block[i] = 0
+        if block[i + 3] == SegTag.BIC1:
+            block[i + 3] = 0
+    for _ in range(size):
+        f.write(block)
+    f.write(boot.export())
+    f.flush()
+
+
+def measure(name, parse, file):
+    with open(file, 'rb') as f:
+        elapsed, boot = timed(lambda: parse(f))
+    print(" {:<8s}: {:8.3f} s ({})".format(name, elapsed, type(boot).__name__))
+    return elapsed
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 256
+    with tempfile.NamedTemporaryFile(suffix='.img') as f:
+        disk_image(f, size)
+        print(" Disk image: {} MB".format(size))
+        before = measure('legacy', legacy_parse, f.name)
+        after = measure('current', img.parse, f.name)
+    print(" Speedup : {:8.1f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
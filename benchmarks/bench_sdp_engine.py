@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of the SDP data phase with and without the pipelined TransferEngine.
+
+    $ python benchmarks/bench_sdp_engine.py [size in MB] [latency in us]
+
+The i.MX device is simulated by RawHidSim which blocks for the given latency per report (the time the bus
+needs to move one report), so the host side work can be overlapped with the transfer.
+"""
+
+import sys
+
+from imx.sdp import SdpMX67, TransferEngine
+from imx.sdp.simulator import RawHidSim
+from _common import timed
+
+
+def measure(name, engine, data, latency):
+    flasher = SdpMX67(RawHidSim(latency=latency), engine=engine)
+    flasher.open()
+    elapsed, _ = timed(lambda: flasher.write_file(0x80000000, data))
+    print(" {:<10s}: {:8.2f} MB/s ({:.3f} s)".format(name, len(data) / elapsed / 1e6, elapsed))
+    return elapsed
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1e6
+    data = bytes(size * 1000000)
+    print(" Payload: {} MB, Latency: {:.0f} us/report".format(size, latency * 1e6))
+    before = measure('serial', None, data, latency)
+    after = measure('pipelined', TransferEngine(depth=8), data, latency)
+    print(" Speedup   : {:8.2f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of "imxsd info" device info collection.
+
+    $ python benchmarks/bench_sdp_info.py [device name, default: MX6UL] [latency in us, default: 1000]
+
+The i.MX device is simulated by RawHidSim which blocks for the given latency per report.
+
+ - "legacy" reads every register by own READ command (original implementation)
+ - "current" reads all planned registers by read_dev_info(), the near ones by single READ command
+"""
+
+import sys
+import struct
+
+from imx import sdp
+from imx.sdp.info import get_rom_info, get_dev_info, HAB_LOG_SIZE
+from imx.sdp.simulator import RawHidSim
+from _common import timed
+
+
+def legacy(flasher):
+    def read_memory_32(addr):
+        return struct.unpack_from('I', flasher.read(addr, 4))[0]
+
+    rom_info = get_rom_info(flasher.device_name)
+    for release, address in zip(rom_info['RELEASE'], rom_info['PIDADDR']):
+        if read_memory_32(address) & 0xFFFF == flasher.usbd.pid:
+            break
+    desc, regs = get_dev_info(flasher.device_name, read_memory_32(rom_info['VERADDR']))
+    values = [read_memory_32(address) for address in regs[:5]]
+    return values, flasher.read(regs[6], HAB_LOG_SIZE)
+
+
+def measure(name, func, dev_name, latency, repeat=3):
+    vid, pid = sdp.SdpMX67.DEVICES[dev_name]
+    elapsed = []
+    for _ in range(repeat):
+        hid = RawHidSim(vid, pid, latency=latency)
+        # The last ROM release is selected
+        hid.memory.write_value(get_rom_info(dev_name)['PIDADDR'][-1], pid)
+        flasher = sdp.SdpMX67(hid)
+        flasher.open()
+        elapsed.append(timed(lambda: func(flasher))[0])
+    print(" {:<8s}: {:8.2f} ms, {:2d} READ commands".format(name, min(elapsed) * 1e3,
+                                                            hid.commands.count(RawHidSim.READ)))
+    return min(elapsed)
+
+
+def main():
+    dev_name = sys.argv[1] if len(sys.argv) > 1 else 'MX6UL'
+    latency = (int(sys.argv[2]) if len(sys.argv) > 2 else 1000) / 1e6
+    print(" Device: {}, Latency: {:.0f} us/report".format(dev_name, latency * 1e6))
+    before = measure('legacy', legacy, dev_name, latency)
+    after = measure('current', sdp.read_dev_info, dev_name, latency)
+    print(" Speedup : {:8.1f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
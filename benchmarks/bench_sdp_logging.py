@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Micro-benchmark of logging overhead per USB report (1025 bytes).
+
+    $ python benchmarks/bench_sdp_logging.py [count of reports]
+
+ - "eager" formats the HEX dump as logging argument (original implementation)
+ - "guarded" formats it only if DEBUG level is enabled (current implementation)
+"""
+
+import sys
+import timeit
+import logging
+
+from imx.sdp.misc import atos
+
+logger = logging.getLogger('bench')
+
+
+def legacy_atos(data, sep=' ', fmt='02X'):
+    ret = ''
+    for x in data:
+        ret += ('{:'+fmt+'}').format(x)
+        ret += sep
+    return ret
+
+
+def eager(rawdata):
+    logger.debug('USB-OUT[0x]: %s', legacy_atos(rawdata))
+
+
+def guarded(rawdata):
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('USB-OUT[0x]: %s', atos(rawdata))
+
+
+def measure(name, func, count):
+    rawdata = bytearray(range(256)) * 4 + b'\x00'
+    elapsed = timeit.timeit(lambda: func(rawdata), number=count)
+    print(" {:<22s}: {:10.3f} us/report".format(name, elapsed / count * 1e6))
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    logging.basicConfig(level=logging.INFO)
+    print(" Logging OFF (INFO level)")
+    before = measure('eager', eager, count)
+    after = measure('guarded', guarded, count)
+    print(" {:<22s}: {:10.1f}x".format('Speedup', before / after))
+    print(" HEX dump of one report")
+    before = measure('legacy atos', legacy_atos, count)
+    after = measure('atos', atos, count)
+    print(" {:<22s}: {:10.1f}x".format('Speedup', before / after))
+
+
+if __name__ == '__main__':
+    main()
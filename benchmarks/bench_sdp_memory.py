@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Memory benchmark of "imxsd wimg" image loading (Linux only, reads /proc/self/status).
+
+    $ python benchmarks/bench_sdp_memory.py [size in MB, ...]
+
+Every case runs in own process and reports the anonymous (heap) memory held while the image is transferred:
+ - "legacy" reads the file into bytearray (original implementation)
+ - "mmap"   maps the file into memory (current implementation), pages are file-backed and reclaimable
+ - "cache"  same as "mmap" with *.imx layout loaded from ImageCache entry (imxsd --cache)
+Both raw *.bin file and *.imx boot image (parsed before the transfer) are measured.
+"""
+
+import os
+import sys
+import tempfile
+import subprocess
+
+from imx.img import BootImg2, SegAPP, ImageCache, parse
+from imx.sdp import SdpMX67
+from imx.sdp.usb import RawHid
+from imx.sdp.__main__ import load_image
+
+
+class NullHid(RawHid):
+    """ RawHid which only consumes the encoded reports and tracks peak of RssAnon """
+
+    def __init__(self):
+        super().__init__()
+        self.peak = 0
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def write_raw(self, id, rawdata):
+        if self.peak == 0:
+            self.peak = rss_anon()
+
+
+def rss_anon():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('RssAnon:'):
+                return int(line.split()[1]) // 1024
+    return 0
+
+
+def run(mode, file):
+    if mode == 'legacy':
+        data = bytearray(os.path.getsize(file))
+        with open(file, 'rb') as f:
+            f.readinto(data)
+        # The parsed image is held during the transfer, as by original wimg
+        img = parse(data) if file.endswith('.imx') else None
+    elif mode == 'cache':
+        with tempfile.TemporaryDirectory() as path:
+            cache = ImageCache(path)
+            # The first load creates the cache entry, the second one uses it
+            load_image(file, None, 0, cache)
+            data, img, _ = load_image(file, None, 0, cache)
+            assert cache.hits == 1
+    else:
+        data, _, _ = load_image(file, None if file.endswith('.imx') else 0, 0)
+    hid = NullHid()
+    flasher = SdpMX67(hid)
+    flasher.opened = True
+    flasher._send_data(data)
+    print(max(hid.peak, rss_anon()))
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] in ('legacy', 'mmap', 'cache'):
+        run(sys.argv[1], sys.argv[2])
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [16, 64, 256]
+    print(" {:>8s} {:>5s} {:>14s} {:>14s} {:>14s}".format("SIZE", "TYPE", "legacy [MB]", "mmap [MB]", "cache [MB]"))
+    for size in sizes:
+        for suffix in ('.bin', '.imx'):
+            with tempfile.NamedTemporaryFile(suffix=suffix) as f:
+                if suffix == '.imx':
+                    boot = BootImg2(address=0x877FF000)
+                    boot.app = SegAPP(bytes(size * 1024 * 1024))
+                    boot.export_to(f)
+                    del boot
+                else:
+                    f.truncate(size * 1024 * 1024)
+                f.flush()
+                modes = ('legacy', 'mmap', 'cache') if suffix == '.imx' else ('legacy', 'mmap')
+                result = [subprocess.check_output([sys.executable, __file__, mode, f.name]).decode().strip()
+                          for mode in modes]
+            print(" {:>5d} MB {:>5s} {:>14s} {:>14s} {:>14s}".format(size, suffix[1:], *(result + ['-'])[:3]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of "scan_usb()" without device filter on hub with many HID devices (PyUSB backend only).
+
+    $ python benchmarks/bench_sdp_scan.py [count of HID devices, default: 24] [count of i.MX devices, default: 2]
+
+The pyusb devices are simulated, set_configuration() and reset() take 20 ms and 50 ms, string descriptor 2 ms.
+
+ - "legacy" configures, resets and reads the strings of every HID device while scanning (original implementation)
+ - "current" lists the devices by descriptors only, the chosen device is configured by open()
+"""
+
+import sys
+import time
+
+import usb.core
+import usb.util
+
+from imx.sdp import SdpMX67, scan_usb
+from imx.sdp.sdp import SDP_CLS
+from imx.sdp.usb import RawHid
+from _common import timed
+
+
+class SlowDevice(object):
+    """ pyusb Device stand-in which blocks for the time of USB control transfers """
+
+    def __init__(self, vid, pid):
+        self.idVendor = vid
+        self.idProduct = pid
+
+    def is_kernel_driver_active(self, interface):
+        return False
+
+    def get_active_configuration(self):
+        return {(0, 0): []}
+
+    def set_configuration(self):
+        time.sleep(0.020)
+
+    def reset(self):
+        time.sleep(0.050)
+
+
+def get_string(dev, index):
+    time.sleep(0.002)
+    return "SE Blank\0"
+
+
+def legacy():
+    objs = []
+    devs = []
+    for dev in usb.core.find(find_all=True):
+        if dev.is_kernel_driver_active(0):
+            dev.detach_kernel_driver(0)
+        dev.set_configuration()
+        dev.reset()
+        new_device = RawHid()
+        new_device.dev = dev
+        new_device.vid = dev.idVendor
+        new_device.pid = dev.idProduct
+        new_device.vendor_name = get_string(dev, 1).strip('\0')
+        new_device.product_name = get_string(dev, 2).strip('\0')
+        devs.append(new_device)
+    for cls in SDP_CLS:
+        for dev in devs:
+            for value in cls.DEVICES.values():
+                if dev.vid == value[0] and dev.pid == value[1]:
+                    objs += [cls(dev)]
+    return objs
+
+
+def current():
+    flashers = scan_usb()
+    # The chosen device is opened, the others aren't touched
+    flashers[0].usbd.product_name
+    flashers[0].open()
+    return flashers
+
+
+def measure(name, func):
+    elapsed, devices = timed(func)
+    count = len(devices)
+    print(" {:<8s}: {:8.1f} ms, {} i.MX devices".format(name, elapsed * 1e3, count))
+    return elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    imx_count = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    vid, pid = SdpMX67.DEVICES['MX6UL']
+    devices = [SlowDevice(vid, pid) if i < imx_count else SlowDevice(0x046D, 0xC000 + i) for i in range(count)]
+    usb.core.find = lambda *args, **kwargs: iter(devices)
+    usb.util.get_string = get_string
+    print(" HID devices: {}, i.MX devices: {}".format(count, imx_count))
+    before = measure('legacy', legacy)
+    after = measure('current', current)
+    print(" Speedup : {:8.1f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
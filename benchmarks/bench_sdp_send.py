@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of SdpBase._send_data (host side only) against a fake RawHid.
+
+    $ python benchmarks/bench_sdp_send.py [size in MB]
+
+The "legacy" path reproduces the original implementation (slice per packet and packet encoding
+with bytes concatenation), the "current" path is the one used by imx.sdp.
+"""
+
+import sys
+
+from imx.sdp import SdpMX67
+from imx.sdp.usb import RawHid
+from _common import timed
+
+
+class NullHid(RawHid):
+    """ RawHid which only consumes the encoded reports """
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def write(self, id, data, size):
+        self.count += len(self._encode_packet(id, data, size))
+
+
+class LegacyHid(NullHid):
+
+    @staticmethod
+    def _legacy_encode_packet(report_id, data, pkglen):
+        buf = bytes([report_id])
+        buf += data
+        buf += bytes([0x00]*(pkglen - len(data)))
+        return buf
+
+    def write(self, id, data, size):
+        self.count += len(self._legacy_encode_packet(id, data, size))
+
+
+def legacy_send_data(flasher, data):
+    report = flasher.HID_REPORT['DAT']
+    length = len(data)
+    offset = 0
+    pkglen = report['LEN']
+    while length > 0:
+        if length < report['LEN']:
+            pkglen = length
+        flasher.usbd.write(report['ID'], data[offset:offset + pkglen], report['LEN'])
+        offset += pkglen
+        length -= pkglen
+
+
+def measure(name, hid, send, data):
+    flasher = SdpMX67(hid)
+    flasher.opened = True
+    elapsed, _ = timed(lambda: send(flasher, data))
+    print(" {:<8s}: {:8.1f} MB/s ({:.3f} s)".format(name, len(data) / elapsed / 1e6, elapsed))
+    return elapsed
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    data = bytes(size * 1000000 + 123)
+    print(" Payload: {} MB".format(size))
+    before = measure('legacy', LegacyHid(), legacy_send_data, data)
+    after = measure('current', NullHid(), lambda f, d: f._send_data(d), data)
+    print(" Speedup : {:8.2f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of scripted imxsd sequence (wdcd, wimg, jump, stat) with and without "imxsd serve".
+
+    $ python benchmarks/bench_sdp_server.py [enumeration time in ms, default: 300]
+
+The USB enumeration (kernel driver detach, set_configuration(), reset() and string descriptors) is simulated by
+SimBus which blocks for the given time.
+
+ - "legacy" enumerates and opens the device for every command (original implementation)
+ - "server" uses the device opened by SdpServer over Unix domain socket
+"""
+
+import os
+import sys
+import time
+import tempfile
+import threading
+
+from imx import sdp
+from imx.img import SegDCD, CmdWriteData
+from imx.sdp.simulator import RawHidSim, SimBus
+from imx.sdp.server import SdpServer, SdpClient
+
+
+class SlowBus(SimBus):
+
+    def __init__(self, devices, delay):
+        super().__init__(devices)
+        self.delay = delay
+
+    def enumerate(self, vid=None, pid=None):
+        time.sleep(self.delay)
+        return super().enumerate(vid, pid)
+
+
+def sequence(dcd, data):
+    return (
+        lambda flasher: flasher.write_dcd(0x910000, dcd),
+        lambda flasher: flasher.write_file(0x80000000, data),
+        lambda flasher: flasher.jump_and_run(0x80000000),
+        lambda flasher: flasher.read_status(),
+    )
+
+
+def measure(name, scan, steps):
+    start = time.perf_counter()
+    for step in steps:
+        flasher = scan('MX6UL')[0]
+        flasher.open()
+        step(flasher)
+        flasher.close()
+    elapsed = time.perf_counter() - start
+    print(" {:<8s}: {:8.1f} ms".format(name, elapsed * 1e3))
+    return elapsed
+
+
+def main():
+    delay = (int(sys.argv[1]) if len(sys.argv) > 1 else 300) / 1e3
+    bus = SlowBus([RawHidSim(*sdp.SdpMX67.DEVICES['MX6UL'])], delay)
+    cmd = CmdWriteData(4)
+    for i in range(100):
+        cmd.append(0x20E0000 + 4 * i, i)
+    dcd = SegDCD(enabled=True)
+    dcd.append(cmd)
+    steps = sequence(dcd.export(), bytes(1000000))
+    print(" Enumeration: {:.0f} ms, Steps: {}".format(delay * 1e3, len(steps)))
+
+    before = measure('legacy', lambda name: sdp.scan_usb(name, backend=bus), steps)
+
+    path = os.path.join(tempfile.mkdtemp(), 'imxsd.sock')
+    server = SdpServer(path, backend=bus)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        client = SdpClient(path)
+        # The first scan enumerates the devices, it's paid once per serve session
+        client.scan('MX6UL')
+        after = measure('server', client.scan, steps)
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+        os.rmdir(os.path.dirname(path))
+    print(" Speedup : {:8.1f}x".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+SDP transfer benchmark suite.
+
+    $ python benchmarks/bench_sdp_suite.py [-s 4,1K,64K,1M,16M,256M] [-r 5] [-l 125] [-j result.json]
+    $ python benchmarks/bench_sdp_suite.py -t MX6UL -a 0x80000000 -m 0x910000     (real hardware)
+
+Measures SdpBase.read, write, write_file and write_dcd at several payload sizes and reports throughput,
+per-command latency percentiles and host CPU time per MB. Without target the i.MX device is simulated
+by RawHidSim with configurable latency (us per report) and bandwidth (MB/s). The results can be saved
+as JSON for tracking regressions between releases.
+"""
+
+import sys
+import json
+import time
+import argparse
+import platform
+
+import imx
+from imx.sdp import SdpMX67, TransferEngine, scan_usb
+from imx.sdp.simulator import RawHidSim
+from imx.img import SegDCD, CmdWriteData
+
+UNITS = {'K': 1024, 'M': 1024 * 1024}
+
+
+def parse_size(value):
+    value = value.strip().upper()
+    if value[-1] in UNITS:
+        return int(value[:-1], 0) * UNITS[value[-1]]
+    return int(value, 0)
+
+
+def percentile(values, pct):
+    """ Nearest-rank percentile of sorted values """
+    index = max(0, min(len(values) - 1, int(round(pct / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def dcd_blob(size):
+    """ Create DCD blob with write commands of max given size """
+    cmd = CmdWriteData(4)
+    for i in range(max(1, (size - 8) // 8)):
+        cmd.append(0x20E0000 + 4 * i, i)
+    dcd = SegDCD(enabled=True)
+    dcd.append(cmd)
+    return dcd.export()
+
+
+def measure(name, size, repeat, func):
+    wall = []
+    cpu = 0.0
+    for _ in range(repeat):
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        func()
+        wall.append(time.perf_counter() - start)
+        cpu += time.process_time() - cpu_start
+
+    wall.sort()
+    mbytes = size * repeat / 1e6
+    result = {
+        'command': name,
+        'size': size,
+        'repeat': repeat,
+        'mbps': size / percentile(wall, 50) / 1e6,
+        'latency': {
+            'min': wall[0],
+            'p50': percentile(wall, 50),
+            'p90': percentile(wall, 90),
+            'p99': percentile(wall, 99),
+            'max': wall[-1],
+        },
+        'cpu_per_mb': cpu / mbytes if mbytes else 0.0,
+    }
+    print(" {0:<10s} {1:>10d} {2:>10.2f} {3:>10.3f} {4:>10.3f} {5:>10.3f} {6:>10.3f}".format(
+        name, size, result['mbps'], result['latency']['p50'] * 1e3, result['latency']['p90'] * 1e3,
+        result['latency']['p99'] * 1e3, result['cpu_per_mb']))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SDP transfer benchmark suite")
+    parser.add_argument('-s', '--sizes', default='4,1K,64K,1M,16M,256M', help="Payload sizes (comma separated)")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help="Count of repetitions per size")
+    parser.add_argument('-l', '--latency', type=float, default=0.0, help="Simulated latency in us per report")
+    parser.add_argument('-b', '--bandwidth', type=float, default=0.0, help="Simulated bandwidth in MB/s")
+    parser.add_argument('-e', '--engine', type=int, default=0, help="Depth of pipelined engine (0 = disabled)")
+    parser.add_argument('-t', '--target', default=None, help="Use real device MX6UL, ... or VID:PID")
+    parser.add_argument('-a', '--address', type=lambda x: int(x, 0), default=0x80000000, help="Data address")
+    parser.add_argument('-m', '--ocram', type=lambda x: int(x, 0), default=0x910000, help="DCD address")
+    parser.add_argument('-x', '--max-read', type=parse_size, default=UNITS['M'], help="Max size of read")
+    parser.add_argument('-j', '--json', default=None, help="Save results into JSON file")
+    args = parser.parse_args()
+
+    engine = TransferEngine(args.engine) if args.engine > 0 else None
+    if args.target is None:
+        backend = 'simulator'
+        hid = RawHidSim(latency=args.latency / 1e6, bandwidth=args.bandwidth * 1e6 or None)
+        flasher = SdpMX67(hid, engine=engine)
+    else:
+        backend = 'usb'
+        devices = scan_usb(args.target)
+        if not devices:
+            print(" - No i.MX board detected !")
+            sys.exit(1)
+        flasher = devices[0]
+        flasher.engine = engine
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    results = []
+
+    print(" Backend: {}, Device: {}".format(backend, flasher.usbd.info))
+    print(" {0:<10s} {1:>10s} {2:>10s} {3:>10s} {4:>10s} {5:>10s} {6:>10s}".format(
+        "COMMAND", "SIZE [B]", "MB/s", "p50 [ms]", "p90 [ms]", "p99 [ms]", "CPU [s/MB]"))
+    print(" " + "-" * 76)
+
+    flasher.open()
+    try:
+        results.append(measure('write', 4, args.repeat, lambda: flasher.write(args.address, 0x12345678)))
+        for size in sizes:
+            if size <= args.max_read:
+                results.append(measure('read', size, args.repeat, lambda: flasher.read(args.address, size)))
+        for size in sizes:
+            data = bytes(size)
+            results.append(measure('write_file', size, args.repeat, lambda: flasher.write_file(args.address, data)))
+            del data
+        for size in sorted(set(min(size, flasher.DCD_MAX_SIZE) for size in sizes)):
+            blob = dcd_blob(size)
+            results.append(measure('write_dcd', len(blob), args.repeat, lambda: flasher.write_dcd(args.ocram, blob)))
+    finally:
+        flasher.close()
+
+    if args.json:
+        report = {
+            'version': imx.__version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'backend': backend,
+            'device': flasher.usbd.info,
+            'settings': {
+                'latency_us': args.latency,
+                'bandwidth_mbps': args.bandwidth,
+                'engine_depth': args.engine,
+                'repeat': args.repeat,
+            },
+            'results': results,
+        }
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print("\n Results saved into: {}".format(args.json))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+"""
+Benchmark of CSF and DCD segment parsing with many short commands.
+
+    $ python benchmarks/bench_seg_parse.py [count of commands, default: 2000]
+
+ - "legacy" tries every class from CMD_TYPES until one doesn't raise UnparsedException (original implementation)
+ - "current" selects the command class from CMD_PARSERS table by the tag in command header
+"""
+
+import sys
+
+import imx.img as img
+from imx.img.header import Header, SegTag, UnparsedException, CorruptedException
+from _common import measure
+
+
+def legacy(cls, tag, data, offset=0):
+    header = Header.parse(data, offset, tag)
+    index = header.size
+    obj = cls(header.param, True)
+    while index < header.length:
+        for cmd_class in cls.CMD_TYPES:
+            try:
+                cmd_obj = cmd_class.parse(data, offset + index)
+            except UnparsedException:
+                continue
+            obj.append(cmd_obj)
+            index += cmd_obj.size
+            break
+        else:
+            raise CorruptedException("at position: " + hex(offset + index))
+    return obj
+
+
+def csf_blob(count):
+    """ Create CSF segment, the commands are at the end of CMD_TYPES (the worst case for legacy parser) """
+    csf = img.SegCSF(enabled=True)
+    for i in range(count):
+        csf.append(img.CmdInstallKey(crthsh=bytes(32)) if i % 2 else img.CmdUnlock(data=[i]))
+    return csf.export()
+
+
+def dcd_blob(count):
+    """ Create DCD segment with check and unlock commands """
+    dcd = img.SegDCD(enabled=True)
+    for i in range(count):
+        dcd.append(img.CmdCheckData(4, 0, 0x307A0000 + 4 * i, 0x1) if i % 2 else img.CmdUnlock(data=[i]))
+    return dcd.export()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for name, cls, tag, data in (('CSF', img.SegCSF, SegTag.CSF, csf_blob(count)),
+                                 ('DCD', img.SegDCD, SegTag.DCD, dcd_blob(count))):
+        print(" {}: {} commands, {} Bytes".format(name, count, len(data)))
+        assert legacy(cls, tag, data).export() == cls.parse(data).export() == data
+        before = measure('legacy', lambda: legacy(cls, tag, data))
+        after = measure('current', lambda: cls.parse(data))
+        print(" Speedup : {:8.1f}x\n".format(before / after))
+
+
+if __name__ == '__main__':
+    main()
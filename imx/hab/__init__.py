@@ -5,13 +5,16 @@
 # or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
 
 from .enums import EnumDevType, EnumHabStatus, EnumHabReason, EnumHabContext
-from .parser import parse_hab_log
+from .parser import HabEvent, decode_hab_log, decode_hab_logs, parse_hab_log
 
 __all__ = [
     'EnumDevType',
     'EnumHabStatus',
     'EnumHabReason',
     'EnumHabContext',
+    'HabEvent',
+    'decode_hab_log',
+    'decode_hab_logs',
     'parse_hab_log',
     'status_info'
 ]
@@ -4,195 +4,319 @@
 # The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
 # or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
 
-import struct
+import sys
+from array import array
 from .enums import EnumDevType, EnumHabStatus, EnumHabReason
 
 
-def parse_mx6_log(data):
+########################################################################################################################
+# Log Codes
+########################################################################################################################
 
-    log_single_desc = {
-        0x00010000: "BOOTMODE - Internal Fuse",
-        0x00010001: "BOOTMODE - Serial Bootloader",
-        0x00010002: "BOOTMODE - Internal/Override",
-        0x00010003: "BOOTMODE - Test Mode",
-        0x00020000: "Security Mode - Fab",
-        0x00020033: "Security Mode - Return",
-        0x000200F0: "Security Mode - Open",
-        0x000200CC: "Security Mode - Closed",
-        0x00030000: "DIR_BT_DIS = 0",
-        0x00030001: "DIR_BT_DIS = 1",
-        0x00040000: "BT_FUSE_SEL = 0",
-        0x00040001: "BT_FUSE_SEL = 1",
-        0x00050000: "Primary Image Selected",
-        0x00050001: "Secondary Image Selected",
-        0x00060000: "NAND Boot",
-        0x00060001: "USDHC Boot",
-        0x00060002: "SATA Boot",
-        0x00060003: "I2C Boot",
-        0x00060004: "ECSPI Boot",
-        0x00060005: "NOR Boot",
-        0x00060006: "ONENAND Boot",
-        0x00060007: "QSPI Boot",
-        0x00061003: "Recovery Mode I2C",
-        0x00061004: "Recovery Mode ECSPI",
-        0x00061FFF: "Recovery Mode NONE",
-        0x00062001: "MFG Mode USDHC",
-        0x00070000: "Device INIT Call",
-        0x000700F0: "Device INIT Pass",
-        0x00070033: "Device INIT Fail",
-        0x000800F0: "Device READ Data Pass",
-        0x00080033: "Device READ Data Fail",
-        0x000A00F0: "Plugin Image Pass",
-        0x000A0033: "Plugin Image Fail",
-        0x000C0000: "Serial Downloader Entry",
-        0x000E0000: "ROMCP Patch"
-    }
-
-    log_double_desc = {
-        0x00080000: "Device READ Data Call",
-        0x00090000: "HAB Authentication Status Code:",
-        0x000A0000: "Plugin Image Call",
-        0x000B0000: "Program Image Call",
-        0x000D0000: "Serial Downloader Call"
-    }
-
-    ret_msg = ''
-    log_loop = 0
-    while log_loop < 64:
-        log_value = struct.unpack_from('I', data, log_loop * 4)[0]
-
-        if log_value == 0x0:
-            break
-        else:
-            if log_value in log_single_desc:
-                ret_msg += " %02d. (0x%08X) -> %s\n" % (log_loop, log_value, log_single_desc[log_value])
-                if log_value & 0xffff0000 == 0x00060000:
-                    boot_type = log_value & 0xff
-            elif log_value in log_double_desc:
-                ret_msg += " %02d. (0x%08X) -> %s\n" % (log_loop, log_value, log_double_desc[log_value])
-                log_loop += 1
-                log_data = struct.unpack_from('I', data, log_loop * 4)[0]
-                if log_value == 0x00090000:
-                    ret_msg += " %02d. (0x%08X) -> HAB Status Code: 0x%02X  %s\n" % \
-                               (log_loop, log_data, log_data & 0xff, EnumHabStatus.desc(log_data & 0xff))
-                    ret_msg += "                     HAB Reason Code: 0x%02X  %s\n" % \
-                               ((log_data >> 8) & 0xff, EnumHabReason.desc((log_data >> 8) & 0xff))
-                else:
-                    ret_msg += " %02d. (0x%08X) -> Address: 0x%08X\n" % (log_loop, log_data, log_data)
-            else:
-                ret_msg += " Log Buffer Code not found\n"
-
-            log_loop += 1
-
-    return ret_msg
+# Max count of 32-bit words in HAB log buffer
+LOG_SIZE = 64
 
+# i.MX6: events described by single word
+MX6_SINGLE_DESC = {
+    0x00010000: "BOOTMODE - Internal Fuse",
+    0x00010001: "BOOTMODE - Serial Bootloader",
+    0x00010002: "BOOTMODE - Internal/Override",
+    0x00010003: "BOOTMODE - Test Mode",
+    0x00020000: "Security Mode - Fab",
+    0x00020033: "Security Mode - Return",
+    0x000200F0: "Security Mode - Open",
+    0x000200CC: "Security Mode - Closed",
+    0x00030000: "DIR_BT_DIS = 0",
+    0x00030001: "DIR_BT_DIS = 1",
+    0x00040000: "BT_FUSE_SEL = 0",
+    0x00040001: "BT_FUSE_SEL = 1",
+    0x00050000: "Primary Image Selected",
+    0x00050001: "Secondary Image Selected",
+    0x00060000: "NAND Boot",
+    0x00060001: "USDHC Boot",
+    0x00060002: "SATA Boot",
+    0x00060003: "I2C Boot",
+    0x00060004: "ECSPI Boot",
+    0x00060005: "NOR Boot",
+    0x00060006: "ONENAND Boot",
+    0x00060007: "QSPI Boot",
+    0x00061003: "Recovery Mode I2C",
+    0x00061004: "Recovery Mode ECSPI",
+    0x00061FFF: "Recovery Mode NONE",
+    0x00062001: "MFG Mode USDHC",
+    0x00070000: "Device INIT Call",
+    0x000700F0: "Device INIT Pass",
+    0x00070033: "Device INIT Fail",
+    0x000800F0: "Device READ Data Pass",
+    0x00080033: "Device READ Data Fail",
+    0x000A00F0: "Plugin Image Pass",
+    0x000A0033: "Plugin Image Fail",
+    0x000C0000: "Serial Downloader Entry",
+    0x000E0000: "ROMCP Patch"
+}
+
+# i.MX6: events followed by data word (HAB status or address)
+MX6_DOUBLE_DESC = {
+    0x00080000: "Device READ Data Call",
+    0x00090000: "HAB Authentication Status Code:",
+    0x000A0000: "Plugin Image Call",
+    0x000B0000: "Program Image Call",
+    0x000D0000: "Serial Downloader Call"
+}
+
+# i.MX7: event code is in the highest byte of log word
+MX7_DESC = {
+    0x10: "BOOTMODE - Internal Fuse",
+    0x11: "BOOTMODE - Serial Bootloader ",
+    0x12: "BOOTMODE - Internal/Override ",
+    0x13: "BOOTMODE - Test Mode ",
+    0x20: "Security Mode - Fab ",
+    0x21: "Security Mode - Return ",
+    0x22: "Security Mode - Open ",
+    0x23: "Security Mode - Closed ",
+    0x30: "DIR_BT_DIS = 0 ",
+    0x31: "DIR_BT_DIS = 1 ",
+    0x40: "BT_FUSE_SEL = 0 ",
+    0x41: "BT_FUSE_SEL = 1 ",
+    0x50: "Primary Image Selected ",
+    0x51: "Secondary Image Selected ",
+    0x60: "NAND Boot ",
+    0x61: "USDHC Boot ",
+    0x62: "SATA Boot ",
+    0x63: "I2C Boot ",
+    0x64: "ECSPI Boot ",
+    0x65: "NOR Boot ",
+    0x66: "ONENAND Boot ",
+    0x67: "QSPI Boot ",
+    0x70: "Recovery Mode I2C ",
+    0x71: "Recovery Mode ECSPI ",
+    0x72: "Recovery Mode NONE ",
+    0x73: "MFG Mode USDHC ",
+    0xB1: "Plugin Image Pass ",
+    0xBF: "Plugin Image Fail ",
+    0xD0: "Serial Downloader Entry ",
+    0xE0: "ROMCP Patch ",
+    0x80: "Device INIT Call ",
+    0x81: "Device INIT Pass ",
+    0x91: "Device READ Data Pass ",
+    0xA0: "HAB Authentication Status Code:  ",
+    0x90: "Device READ Data Call ",
+    0xB0: "Plugin Image Call ",
+    0xC0: "Program Image Call ",
+    0xD1: "Serial Downloader Call ",
+    0x8F: "Device INIT Fail ",
+    0x9F: "Device READ Data Fail "
+}
+
+# i.MX7: events with error code in the lower bytes of log word
+MX7_ERROR_CODES = (0x8F, 0x9F, 0xBF)
+# i.MX7: events followed by address word
+MX7_ADDRESS_CODES = (0x90, 0xB0, 0xC0, 0xD1)
+# i.MX7: events followed by HAB status word
+MX7_HAB_CODES = (0xA0,)
+# i.MX7: events followed by tick word (after address word, if any)
+MX7_TICK_CODES = (0x80, 0x81, 0x8F, 0x91, 0x9F, 0xB0, 0xC0)
+
+# Columns of the table created by decode_hab_logs()
+TABLE_COLUMNS = ('log', 'index', 'value', 'code', 'address', 'hab', 'tick', 'error')
+
+
+########################################################################################################################
+# Decoder
+########################################################################################################################
+
+class HabEvent(object):
+    """ Event record of HAB log
+
+    The optional data are None if the event doesn't have them. The records are hashable, so they can be counted
+    by collections.Counter or collected into set over many boards.
+    """
+
+    @property
+    def status(self):
+        """ HAB status code, None if the event doesn't have HAB status word """
+        return None if self.hab is None else self.hab & 0xFF
+
+    @property
+    def reason(self):
+        """ HAB reason code, None if the event doesn't have HAB status word """
+        return None if self.hab is None else (self.hab >> 8) & 0xFF
+
+    def __init__(self, index, value, code, desc=None, address=None, hab=None, tick=None, error=None,
+                 dev_type=EnumDevType.IMX7):
+        """ Initialize HabEvent object
+        :param index: The index of event word in log
+        :param value: The raw event word
+        :param code: The event code (i.MX6: the whole word, i.MX7: the highest byte)
+        :param desc: The event description, None for unknown code
+        :param address: The address word
+        :param hab: The HAB status word
+        :param tick: The tick word
+        :param error: The error code
+        :param dev_type: The device type (EnumDevType), selects the text format of info()
+        """
+        self.index = index
+        self.value = value
+        self.code = code
+        self.desc = desc
+        self.address = address
+        self.hab = hab
+        self.tick = tick
+        self.error = error
+        self.dev_type = dev_type
+
+    def __eq__(self, obj):
+        return isinstance(obj, HabEvent) and vars(obj) == vars(self)
+
+    def __hash__(self):
+        return hash(tuple(vars(self).values()))
+
+    def __str__(self):
+        return self.info()
+
+    def __repr__(self):
+        return "HabEvent({})".format(', '.join('{}={}'.format(k, v) for k, v in vars(self).items() if v is not None))
+
+    def info(self):
+        return _event_txt(self, self.dev_type)
+
+
+def _log_words(logs):
+    """ Unpack the log buffers into single array of 32-bit words at once, every log takes LOG_SIZE words """
+    size = LOG_SIZE * 4
+    words = array('I')
+    words.frombytes(b''.join(bytes(data[:size]).ljust(size, b'\0') for data in logs))
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
 
-def parse_mx7_log(data):
 
-    log_all_desc = {
-        0x10: "BOOTMODE - Internal Fuse",
-        0x11: "BOOTMODE - Serial Bootloader ",
-        0x12: "BOOTMODE - Internal/Override ",
-        0x13: "BOOTMODE - Test Mode ",
-        0x20: "Security Mode - Fab ",
-        0x21: "Security Mode - Return ",
-        0x22: "Security Mode - Open ",
-        0x23: "Security Mode - Closed ",
-        0x30: "DIR_BT_DIS = 0 ",
-        0x31: "DIR_BT_DIS = 1 ",
-        0x40: "BT_FUSE_SEL = 0 ",
-        0x41: "BT_FUSE_SEL = 1 ",
-        0x50: "Primary Image Selected ",
-        0x51: "Secondary Image Selected ",
-        0x60: "NAND Boot ",
-        0x61: "USDHC Boot ",
-        0x62: "SATA Boot ",
-        0x63: "I2C Boot ",
-        0x64: "ECSPI Boot ",
-        0x65: "NOR Boot ",
-        0x66: "ONENAND Boot ",
-        0x67: "QSPI Boot ",
-        0x70: "Recovery Mode I2C ",
-        0x71: "Recovery Mode ECSPI ",
-        0x72: "Recovery Mode NONE ",
-        0x73: "MFG Mode USDHC ",
-        0xB1: "Plugin Image Pass ",
-        0xBF: "Plugin Image Fail ",
-        0xD0: "Serial Downloader Entry ",
-        0xE0: "ROMCP Patch ",
-        0x80: "Device INIT Call ",
-        0x81: "Device INIT Pass ",
-        0x91: "Device READ Data Pass ",
-        0xA0: "HAB Authentication Status Code:  ",
-        0x90: "Device READ Data Call ",
-        0xB0: "Plugin Image Call ",
-        0xC0: "Program Image Call ",
-        0xD1: "Serial Downloader Call ",
-        0x8F: "Device INIT Fail ",
-        0x9F: "Device READ Data Fail "
-    }
-
-    log_error_desc = {
-        0x8F: "Device INIT Fail ",
-        0x9F: "Device READ Data Fail ",
-        0xBF: "Plugin Image Fail "
-    }
-
-    log_tick_desc = {
-        0x80: "Device INIT Call ",
-        0x81: "Device INIT Pass ",
-        0x8F: "Device INIT Fail ",
-        0x91: "Device READ Data Pass ",
-        0x9F: "Device READ Data Fail ",
-        0xB0: "Plugin Image Call ",
-        0xC0: "Program Image Call "
-    }
-
-    log_address_desc = {
-        0x90: "Device READ Data Call ",
-        0xB0: "Plugin Image Call ",
-        0xC0: "Program Image Call ",
-        0xD1: "Serial Downloader Call "
-    }
-
-    log_hab_desc = {
-        0xA0: "HAB Authentication Status Code "
-    }
-
-    ret_msg = ''
-    log_loop = 0
-    while log_loop < 64:
-        log_value_full = struct.unpack_from('I', data, log_loop * 4)[0]
-        log_value = (log_value_full >> 24) & 0xff
-
-        if log_value == 0x0:
+def _decode_mx6(words, log, rows):
+    """ Decode i.MX6 log from words, append Tuple [log, index, value, code, address, hab, tick, error] into rows """
+    append = rows.append
+    start = log * LOG_SIZE
+    stop = start + LOG_SIZE
+    index = start
+    while index < stop:
+        value = words[index]
+        if value == 0:
             break
+        kind = _MX6_KINDS.get(value)
+        if kind is not None and index + 1 < stop:
+            data = words[index + 1]
+            append((log, index - start, value, value, None, data, None, None) if kind == 'hab' else
+                   (log, index - start, value, value, data, None, None, None))
+            index += 2
         else:
-            if log_value in log_all_desc:
-                ret_msg += " %02d. (0x%08X) -> %s\n" % (log_loop, log_value_full, log_all_desc[log_value])
-            else:
-                ret_msg += " %02d. Log Buffer Code not found\n"
-            if log_value in log_address_desc:
-                log_loop += 1
-                log_data = struct.unpack_from('I', data, log_loop * 4)[0]
-                ret_msg += " %02d. (0x%08X) -> Address: 0x%08X\n" % (log_loop, log_data, log_data)
-            if log_value in log_hab_desc:
-                log_loop += 1
-                log_data = struct.unpack_from('I', data, log_loop * 4)[0]
-                ret_msg += " %02d. (0x%08X) -> HAB Status Code: 0x%02X  %s\n" % \
-                           (log_loop, log_data, log_data & 0xff, EnumHabStatus.desc(log_data & 0xff))
-                ret_msg += "                     HAB Reason Code: 0x%02X  %s\n" % \
-                           ((log_data >> 8) & 0xff, EnumHabReason.desc((log_data >> 8) & 0xff))
-            if log_value in log_error_desc:
-                ret_msg += "                     Error Code: 0x%06X\n" % (log_value_full & 0xffffff)
-            if log_value in log_tick_desc:
-                log_loop += 1
-                log_data = struct.unpack_from('I', data, log_loop * 4)[0]
-                ret_msg += " %02d. (0x%08X) -> Tick: 0x%08X\n" % (log_loop, log_data, log_data)
-
-            log_loop = log_loop + 1
-
-    return ret_msg
+            append((log, index - start, value, value, None, None, None, None))
+            index += 1
+
+
+def _decode_mx7(words, log, rows):
+    """ Decode i.MX7 log from words, append Tuple [log, index, value, code, address, hab, tick, error] into rows """
+    append = rows.append
+    start = log * LOG_SIZE
+    stop = start + LOG_SIZE
+    index = start
+    while index < stop:
+        value = words[index]
+        code = value >> 24
+        if code == 0:
+            break
+        event = index
+        address = hab = tick = None
+        if code in MX7_ADDRESS_CODES and index + 1 < stop:
+            index += 1
+            address = words[index]
+        if code in MX7_HAB_CODES and index + 1 < stop:
+            index += 1
+            hab = words[index]
+        if code in MX7_TICK_CODES and index + 1 < stop:
+            index += 1
+            tick = words[index]
+        error = value & 0xFFFFFF if code in MX7_ERROR_CODES else None
+        append((log, event - start, value, code, address, hab, tick, error))
+        index += 1
+
+
+# i.MX6: the kind of data word following the event
+_MX6_KINDS = {code: 'hab' if code == 0x00090000 else 'address' for code in MX6_DOUBLE_DESC}
+_DECODERS = {EnumDevType.IMX6: _decode_mx6, EnumDevType.IMX7: _decode_mx7}
+_DESC = {EnumDevType.IMX6: dict(list(MX6_SINGLE_DESC.items()) + list(MX6_DOUBLE_DESC.items())),
+         EnumDevType.IMX7: MX7_DESC}
+
+
+def _decode(dev_type, logs):
+    if dev_type not in _DECODERS:
+        raise ValueError("Not Implemented Log Decoder for device type: {}".format(dev_type))
+    decoder = _DECODERS[dev_type]
+    words = _log_words(logs)
+    rows = []
+    for log in range(len(words) // LOG_SIZE):
+        decoder(words, log, rows)
+    return rows
+
+
+def decode_hab_log(dev_type, data):
+    """ Decode HAB log into list of events
+    :param dev_type: The device type (EnumDevType)
+    :param data: The raw log buffer (64 words, little-endian)
+    :return: list of HabEvent objects
+    """
+    rows = _decode(dev_type, [data])
+    desc = _DESC[dev_type]
+    return [HabEvent(index, value, code, desc.get(code), address, hab, tick, error, dev_type)
+            for _, index, value, code, address, hab, tick, error in rows]
+
+
+def decode_hab_logs(dev_type, logs):
+    """ Decode many HAB logs into columnar table for statistics over many boards
+    :param dev_type: The device type (EnumDevType)
+    :param logs: The iterable of raw log buffers
+    :return: dict of columns (see TABLE_COLUMNS), every column is list with one item per event, the 'log' column is
+             the index of log in logs and the missing optional data are None
+    """
+    rows = _decode(dev_type, logs)
+    columns = zip(*rows) if rows else [()] * len(TABLE_COLUMNS)
+    return {name: list(column) for name, column in zip(TABLE_COLUMNS, columns)}
+
+
+########################################################################################################################
+# Text Output
+########################################################################################################################
+
+def _event_txt(event, dev_type=EnumDevType.IMX7):
+    """ Render HAB log event into text """
+    index = event.index
+    if event.desc is not None:
+        msg = " %02d. (0x%08X) -> %s\n" % (index, event.value, event.desc)
+    elif dev_type == EnumDevType.IMX6:
+        msg = " Log Buffer Code not found\n"
+    else:
+        msg = " %02d. Log Buffer Code not found\n" % index
+    if event.address is not None:
+        index += 1
+        msg += " %02d. (0x%08X) -> Address: 0x%08X\n" % (index, event.address, event.address)
+    if event.hab is not None:
+        index += 1
+        status, reason = event.status, event.reason
+        msg += " %02d. (0x%08X) -> HAB Status Code: 0x%02X  %s\n" % \
+               (index, event.hab, status, EnumHabStatus.desc(status))
+        msg += "                     HAB Reason Code: 0x%02X  %s\n" % (reason, EnumHabReason.desc(reason))
+    if event.error is not None:
+        msg += "                     Error Code: 0x%06X\n" % event.error
+    if event.tick is not None:
+        index += 1
+        msg += " %02d. (0x%08X) -> Tick: 0x%08X\n" % (index, event.tick, event.tick)
+    return msg
+
+
+def parse_mx6_log(data):
+    return ''.join([event.info() for event in decode_hab_log(EnumDevType.IMX6, data)])
+
+
+def parse_mx7_log(data):
+    return ''.join([event.info() for event in decode_hab_log(EnumDevType.IMX7, data)])
 
 
 def parse_hab_log(dev_type, data):
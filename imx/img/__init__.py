@@ -8,7 +8,8 @@ from .commands import EnumWriteOps, EnumCheckOps, EnumAlgorithm, EnumProtocol, E
                       EnumItm, CmdWriteData, CmdCheckData, CmdNop, CmdSet, CmdInitialize, CmdUnlock, CmdInstallKey, \
                       CmdAuthData
 from .segments import SegIVT2, SegIVT3a, SegIVT3b, SegBDT, SegAPP, SegDCD, SegCSF
-from .images import parse, BootImg2, BootImg3a, BootImg3b, BootImg4, EnumAppType
+from .images import parse, scan, BootImg2, BootImg3a, BootImg3b, BootImg4, KernelImg, EnumAppType
+from .cache import ImageCache
 
 __all__ = [
     # Main Classes
@@ -16,6 +17,8 @@ __all__ = [
     'BootImg3a',
     'BootImg3b',
     'BootImg4',
+    'KernelImg',
+    'ImageCache',
     # Segments
     'SegIVT2',
     'SegIVT3a',
@@ -45,5 +48,6 @@ __all__ = [
     'EnumEngine',
     'EnumItm',
     # Methods
-    'parse'
+    'parse',
+    'scan'
 ]
\ No newline at end of file
@@ -11,7 +11,8 @@ import sys
 import yaml
 import click
 
-from imx.img import parse, SegDCD, BootImg2, BootImg3a, BootImg3b, BootImg4, EnumAppType
+from imx.img import parse, scan, SegDCD, BootImg2, BootImg3a, BootImg3b, BootImg4, KernelImg, EnumAppType, \
+                    ImageCache
 from imx import __version__
 
 
@@ -111,14 +112,15 @@ def cli():
               default='auto', show_default=True, help="Image type")
 @click.option('-o', '--offset', type=UINT, default=0, show_default=True, help="File Offset")
 @click.option('-s', '--step', type=UINT, default=0x100, show_default=True, help="Parsing step")
+@click.option('--cache', is_flag=True, default=False, envvar='IMX_CACHE', help="Use the on-disk cache of parsed images")
 @click.argument('file', nargs=1, type=click.Path(exists=True))
-def info(offset, type, step, file):
+def info(offset, type, step, cache, file):
     """ List i.MX boot image content """
     try:
         with open(file, 'rb') as stream:
             stream.seek(offset)
             if type == "auto":
-                boot_image = parse(stream, step)
+                boot_image = ImageCache().parse(file, offset, step) if cache else parse(stream, step)
             else:
                 img_type = {'67RT': BootImg2,
                             '8M': BootImg2,
@@ -128,13 +130,50 @@ def info(offset, type, step, file):
                 boot_image = img_type[type].parse(stream, step)
 
         # print image info
-        click.echo(str(boot_image))
+        for text in boot_image.iter_info():
+            click.echo(text, nl=False)
+        click.echo()
 
     except Exception as e:
         click.echo(str(e) if str(e) else "Unknown Error !")
         sys.exit(ERROR_CODE)
 
 
+# IMX Image: Find all IMX boot images in file
+@cli.command('scan', short_help="Find all i.MX boot images in file (disk dump)")
+@click.option('-o', '--offset', type=UINT, default=0, show_default=True, help="File Offset")
+@click.option('-s', '--step', type=UINT, default=0x100, show_default=True, help="Parsing step")
+@click.argument('file', nargs=1, type=click.Path(exists=True))
+def scan_file(offset, step, file):
+    """ Find all i.MX boot images in file (disk dump) and print offset table """
+    img_name = {BootImg2: 'i.MX6/7/8M/RT',
+                BootImg3a: 'i.MX8QXP_A0',
+                BootImg3b: 'i.MX8QM_A0',
+                BootImg4: 'i.MX8X',
+                KernelImg: 'Kernel'}
+    count = 0
+    try:
+        with open(file, 'rb') as stream:
+            stream.seek(offset)
+            click.echo(" {0:<12s} {1:<14s} {2:s}".format("OFFSET", "FORMAT", "DETAILS"))
+            click.echo(" " + "-" * 60)
+            for index, img_cls, segment in scan(stream, step):
+                if img_cls is BootImg4:
+                    details = "Images: {0:d}".format(segment.images_count)
+                elif img_cls in (BootImg2, KernelImg):
+                    details = "IVT: 0x{0:08X}, Entry: 0x{1:08X}".format(segment.ivt_address, segment.app_address)
+                else:
+                    details = "IVT: 0x{0:08X}".format(segment.ivt_address)
+                click.echo(" 0x{0:08X}   {1:<14s} {2:s}".format(index, img_name[img_cls], details))
+                count += 1
+
+    except Exception as e:
+        click.echo(str(e) if str(e) else "Unknown Error !")
+        sys.exit(ERROR_CODE)
+
+    click.echo("\n Found %d boot images\n" % count)
+
+
 @cli.command(short_help="Create new i.MX6/7/RT boot image from attached files")
 @click.argument('address', nargs=1, type=UINT)
 @click.argument('appfile', nargs=1, type=click.Path(exists=True))
@@ -168,7 +207,7 @@ def create2a(address, appfile, outfile, dcd, csf, offset, plugin, version):
 
         # Save as IMX Boot image
         with open(outfile, 'wb') as f:
-            f.write(boot_image.export())
+            boot_image.export_to(f)
 
     except Exception as e:
         click.echo(str(e) if str(e) else "Unknown Error !")
@@ -210,7 +249,7 @@ def create2b(address, appfile, outfile, dcd, csf, offset, plugin, version):
 
         # Save as IMX Boot image
         with open(outfile, 'wb') as f:
-            f.write(boot_image.export())
+            boot_image.export_to(f)
 
     except Exception as e:
         click.echo(str(e) if str(e) else "Unknown Error !")
@@ -276,7 +315,7 @@ def create3a(scfw, outfile, app, m4, dcd, scd, csf, offset, version):
 
         # Save as IMX Boot image
         with open(outfile, 'wb') as f:
-            f.write(boot_image.export())
+            boot_image.export_to(f)
 
     except Exception as e:
         click.echo(str(e) if str(e) else "Unknown Error !")
@@ -342,7 +381,7 @@ def create3b(scfw, outfile, app, m4, dcd, scd, csf, offset, version):
 
         # Save as IMX Boot image
         with open(outfile, 'wb') as f:
-            f.write(boot_image.export())
+            boot_image.export_to(f)
 
     except Exception as e:
         click.echo(str(e) if str(e) else "Unknown Error !")
@@ -437,7 +476,7 @@ def create(infile, outfile):
 
         # Save as IMX Boot image
         with open(outfile, 'wb') as f:
-            f.write(boot_image.export())
+            boot_image.export_to(f)
 
     except Exception as e:
         click.echo(str(e) if str(e) else "Unknown Error !")
@@ -575,13 +614,11 @@ def extract(file, type, offset, step, embedded):
             if embedded:
                 yaml_string += '  DATA: |\n'
                 dcd_txt = img_obj.dcd.export_txt()
-                for line in dcd_txt.split('\n'):
-                    #if line.strip():
-                    yaml_string += '    {}\n'.format(line)
+                yaml_string += ''.join('    {}\n'.format(line) for line in dcd_txt.split('\n'))
             else:
                 yaml_string += '  PATH: dcd.txt\n'
                 with open(os.path.join(out_path, 'dcd.txt'), 'w') as f:
-                    f.write(img_obj.dcd.export_txt())
+                    img_obj.dcd.write_txt(f)
 
         # Save CSF Segment
         if img_obj.csf.enabled:
@@ -634,7 +671,7 @@ def dcdfc(outfile, infile, outfmt, infmt):
         else:
             # Save DCD as TXT File
             with open(outfile, 'w') as f:
-                f.write(dcd.export_txt())
+                dcd.write_txt(f)
 
     except Exception as e:
         click.echo(str(e) if str(e) else "Unknown Error !")
@@ -0,0 +1,197 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import os
+import mmap
+import zlib
+import hashlib
+from struct import pack, unpack_from, calcsize
+
+from .header import SegTag
+from .misc import ViewReader
+from .segments import SegIVT2, SegBDT, SegDCD
+from .images import _parse, BootImg2, BootImg3a, BootImg3b, BootImg4
+
+
+########################################################################################################################
+# Cache of Parsed Boot Images
+########################################################################################################################
+
+class ImageCache(object):
+    """ On-disk cache of parsed boot images
+
+    The cache entry is saved per file path, offset and searching step. It's valid only if the file size, mtime and
+    CRC32 of the image header (IVT, BDT and DCD) are the same as at the time of parsing. The entry keeps the image
+    format and offset, for BootImg2 also the raw IVT, BDT and DCD segments and the location of APP data. The repeated
+    parsing skips only the image searching, the segments are still decoded from the saved raw data (or from the file
+    at saved offset for other formats). The APP data stay a view of the buffer passed by caller (see parse()).
+    """
+
+    MAGIC = b'IMXC'
+    VERSION = 1
+
+    # Entry header: magic, version, format, file size, mtime [ns], image offset, end of image header, CRC32 of header
+    HEADER_FORMAT = '<4sBB2xQQQQI'
+    HEADER_SIZE = calcsize(HEADER_FORMAT)
+    # BootImg2 record: APP start, APP size, IVT size, BDT size, DCD size
+    IMG2_FORMAT = '<QQHHI'
+
+    # Default max size of all entries in Bytes
+    MAX_SIZE = 0x400000
+
+    FORMATS = (BootImg2, BootImg3a, BootImg3b, BootImg4)
+
+    @staticmethod
+    def default_path():
+        """ Get default cache directory: $IMX_CACHE_DIR or $XDG_CACHE_HOME/imx or ~/.cache/imx """
+        if os.environ.get('IMX_CACHE_DIR'):
+            return os.environ['IMX_CACHE_DIR']
+        root = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+        return os.path.join(root, 'imx')
+
+    def __init__(self, path=None, max_size=MAX_SIZE):
+        """ Initialize ImageCache object
+        :param path: The cache directory (default: ImageCache.default_path())
+        :param max_size: Max size of all entries in Bytes, the least recently used are removed
+        """
+        self.path = path if path is not None else self.default_path()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, file, offset, step):
+        key = "{}:{}:{}".format(os.path.abspath(file), offset, step)
+        return os.path.join(self.path, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.bin')
+
+    def _load(self, entry, stream, view, stat):
+        """ Load boot image from cache entry, return None if entry is not valid """
+        try:
+            with open(entry, 'rb') as f:
+                data = f.read()
+            magic, version, index, size, mtime, offset, end, crc = unpack_from(self.HEADER_FORMAT, data)
+            if magic != self.MAGIC or version != self.VERSION or index >= len(self.FORMATS) or \
+               size != stat.st_size or mtime != stat.st_mtime_ns or crc != zlib.crc32(view[offset:end]):
+                return None
+
+            cls = self.FORMATS[index]
+            if cls is BootImg2 and len(data) > self.HEADER_SIZE:
+                obj = self._load_img2(data, view, isinstance(stream, ViewReader))
+            else:
+                stream.seek(offset)
+                obj = cls.parse(stream)
+        except Exception:
+            return None
+
+        try:
+            # Mark entry as recently used
+            os.utime(entry)
+        except OSError:
+            pass
+        return obj
+
+    def _load_img2(self, data, view, zero_copy):
+        """ Create BootImg2 object from cache entry data, same as BootImg2.parse()
+        The APP data are kept as view of the file content if zero_copy is True, otherwise they are read.
+        """
+        app_start, app_size, ivt_size, bdt_size, dcd_size = unpack_from(self.IMG2_FORMAT, data, self.HEADER_SIZE)
+        start = self.HEADER_SIZE + calcsize(self.IMG2_FORMAT)
+        obj = BootImg2()
+        obj.ivt = SegIVT2.parse(data[start:start + ivt_size])
+        start += ivt_size
+        obj.bdt = SegBDT.parse(data[start:start + bdt_size])
+        start += bdt_size
+        obj.offset = obj.ivt.ivt_address - obj.bdt.start
+        obj.address = obj.bdt.start
+        obj.plugin = True if obj.bdt.plugin else False
+        if dcd_size:
+            obj.dcd = SegDCD.parse(data[start:start + dcd_size])
+            obj.dcd.padding = (obj.ivt.app_address - obj.ivt.dcd_address) - obj.dcd.size
+        app_data = view[app_start:app_start + app_size]
+        obj.app.data = app_data if zero_copy else bytes(app_data)
+        obj.app.padding = 0
+        return obj
+
+    def _store(self, entry, view, stat, offset, obj):
+        """ Save parsed boot image as cache entry """
+        record = b''
+        end = offset
+        # The BootImg2 parser continues searching if IVT version is not valid, save the segments only if found here
+        if type(obj) is BootImg2 and view[offset] == SegTag.IVT2 and view[offset + 3] in (0x40, 0x41, 0x42, 0x43):
+            ivt_size = obj.ivt.size
+            dcd_size = obj.dcd.header.length if obj.ivt.dcd_address else 0
+            app_start = offset + (obj.ivt.app_address - obj.ivt.ivt_address)
+            end = offset + ivt_size + SegBDT.SIZE + dcd_size
+            record = pack(self.IMG2_FORMAT, app_start, obj.app.size, ivt_size, SegBDT.SIZE, dcd_size) + view[offset:end]
+
+        data = pack(self.HEADER_FORMAT, self.MAGIC, self.VERSION, self.FORMATS.index(type(obj)), stat.st_size,
+                    stat.st_mtime_ns, offset, end, zlib.crc32(view[offset:end])) + record
+
+        os.makedirs(self.path, exist_ok=True)
+        temp = "{}.{}.tmp".format(entry, os.getpid())
+        with open(temp, 'wb') as f:
+            f.write(data)
+        os.replace(temp, entry)
+        self.evict()
+
+    def _entries(self):
+        """ Get list of cache entries as Tuple [mtime, size, path], the most recently used first """
+        try:
+            entries = [(e.stat(), e.path) for e in os.scandir(self.path) if e.name.endswith('.bin')]
+        except OSError:
+            return []
+        return sorted(((stat.st_mtime, stat.st_size, path) for stat, path in entries), reverse=True)
+
+    def evict(self):
+        """ Remove the least recently used entries while the cache size is above max_size """
+        total = 0
+        for _, size, path in self._entries():
+            total += size
+            if total > self.max_size:
+                os.remove(path)
+
+    def clear(self):
+        """ Remove all entries """
+        for _, _, path in self._entries():
+            os.remove(path)
+
+    def parse(self, file, offset=0, step=0x100, buffer=None):
+        """ Parse boot image from file, use cache entry if valid
+        :param file: The path to image file
+        :param offset: File offset where the searching starts
+        :param step: Image searching step
+        :param buffer: The content of file as bytes-like object, e.g. mmap opened by caller (optional). The parsed
+                       image keeps a view of it, so the APP data are read only on access. Without buffer the file is
+                       mapped only for the time of parsing and the data are read.
+        :return: the object of boot image
+        """
+        with open(file, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if buffer is not None:
+                reader = ViewReader(buffer)
+                return self._parse_file(reader, reader.view, stat, file, offset, step)
+            if not stat.st_size:
+                return self._parse_file(f, b'', stat, file, offset, step)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, memoryview(mm) as view:
+                return self._parse_file(f, view, stat, file, offset, step)
+
+    def _parse_file(self, stream, view, stat, file, offset, step):
+        """ Parse boot image from opened file or ViewReader of its content, the view is used for cache entry
+        validation and, with ViewReader, as source of the APP data """
+        entry = self._entry_path(file, offset, step)
+        obj = self._load(entry, stream, view, stat)
+        if obj is not None:
+            self.hits += 1
+            return obj
+
+        self.misses += 1
+        stream.seek(offset)
+        index, obj = _parse(stream, step)
+        try:
+            self._store(entry, view, stat, index, obj)
+        except OSError:
+            # The cache is optional, ignore not writable directory
+            pass
+        return obj
@@ -4,9 +4,11 @@
 # The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
 # or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
 
+import sys
+from array import array
 from easy_enum import EEnum as Enum
 from struct import pack, unpack_from
-from .header import CmdTag, Header
+from .header import CmdTag, Header, CorruptedException
 
 
 ########################################################################################################################
@@ -121,9 +123,51 @@ class CmdBase(object):
         pass
 
 
+class WriteDataItem(object):
+    ''' Address and value of CmdWriteData entry, the item assignment writes into the command '''
+
+    __slots__ = ('_data', '_index')
+
+    def __init__(self, data, index):
+        '''
+        :param data: The array('I') of interleaved addresses and values
+        :param index: The index of entry address in data
+        '''
+        self._data = data
+        self._index = index
+
+    def __len__(self):
+        return 2
+
+    def __getitem__(self, key):
+        return [self._data[self._index], self._data[self._index + 1]][key]
+
+    def __setitem__(self, key, value):
+        if not -2 <= key < 2:
+            raise IndexError("index out of range")
+        self._data[self._index + key % 2] = value
+
+    def __iter__(self):
+        return iter(self._data[self._index:self._index + 2])
+
+    def __eq__(self, other):
+        try:
+            return list(self) == list(other)
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self):
+        return repr(list(self))
+
+
 class CmdWriteData(object):
     ''' Write data command '''
 
+    TAG = CmdTag.WRT_DAT
+
+    # Count of entries rendered into text at once
+    TXT_CHUNK = 1024
+
     @property
     def bytes(self):
         return self._header.param & 0x7
@@ -152,7 +196,8 @@ class CmdWriteData(object):
         assert bytes in (1, 2, 4), "Unsupported Value !"
         assert EnumWriteOps.is_valid(ops), "Unsupported Value !"
         self._header = Header(tag=CmdTag.WRT_DAT, param=((int(ops) & 0x3) << 3) | (bytes & 0x7))
-        self._data = []
+        # Interleaved address and value of entries: [address0, value0, address1, value1, ...]
+        self._data = array('I')
 
     def __str__(self):
         return self.info()
@@ -161,62 +206,104 @@ class CmdWriteData(object):
         return self.info()
 
     def __len__(self):
-        len(self._data)
+        return len(self._data) // 2
+
+    def _index(self, key):
+        index = key + len(self) if key < 0 else key
+        if not 0 <= index < len(self):
+            raise IndexError("index out of range")
+        return index * 2
 
     def __getitem__(self, key):
-        return self._data[key]
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        return WriteDataItem(self._data, self._index(key))
 
     def __setitem__(self, key, value):
-        self._data[key] = value
+        index = self._index(key)
+        value = array('I', value)
+        assert len(value) == 2, "value must be [address, value]"
+        self._data[index:index + 2] = value
 
     def __iter__(self):
-        return self._data.__iter__()
+        data = self._data
+        return (WriteDataItem(data, index) for index in range(0, len(data), 2))
+
+    def iter_txt(self, line_format):
+        """ Render the entries line by line, every TXT_CHUNK lines are formatted at once
+        :param line_format: The %-format of one line with address and value, e.g.: "0x%08X 0x%08X\n"
+        :return generator of strings
+        """
+        size = self.TXT_CHUNK * 2
+        for start in range(0, len(self._data), size):
+            data = self._data[start:start + size]
+            yield (line_format * (len(data) // 2)) % tuple(data)
+
+    def iter_info(self):
+        yield "-" * 60 + "\n"
+        yield "Write Data Command (Ops: {0:s}, Bytes: {1:d})\n".format(EnumWriteOps[self.ops], self.bytes)
+        yield "-" * 60 + "\n"
+        yield from self.iter_txt("- Address: 0x%08X, Value: 0x%08X\n")
 
     def info(self):
-        msg  = "-" * 60 + "\n"
-        msg += "Write Data Command (Ops: {0:s}, Bytes: {1:d})\n".format(EnumWriteOps[self.ops], self.bytes)
-        msg += "-" * 60 + "\n"
-        for cmd in self._data:
-            msg += "- Address: 0x{0:08X}, Value: 0x{1:08X}\n".format(cmd[0], cmd[1])
-        return msg
+        return ''.join(self.iter_info())
 
     def append(self, address, value):
         assert 0 <= address <= 0xFFFFFFFF, "address out of range"
         assert 0 <= value <= 0xFFFFFFFF, "value out of range"
-        self._data.append([address, value])
+        self._data.append(address)
+        self._data.append(value)
         self._header.length += 8
 
+    def extend(self, data):
+        """ Append more entries at once
+        :param data: The array('I') or sequence of interleaved addresses and values [address0, value0, ...]
+        """
+        data = data if isinstance(data, array) and data.typecode == 'I' else array('I', data)
+        assert len(data) % 2 == 0, "address without value"
+        self._data.extend(data)
+        self._header.length += len(data) * 4
+
     def pop(self, index):
-        assert 0 <= index < len(self._data)
-        cmd = self._data.pop(index)
+        assert 0 <= index < len(self)
+        cmd = list(self[index])
+        del self._data[index * 2:index * 2 + 2]
         self._header.length -= 8
         return cmd
 
     def clear(self):
-        self._data.clear()
+        del self._data[:]
         self._header.length = self._header.size
 
     def export(self):
-        raw_data = self._header.export()
-        for cmd in self._data:
-            raw_data += pack(">LL", cmd[0], cmd[1])
-        return raw_data
+        data = self._data
+        if sys.byteorder == 'little':
+            data = array('I', data)
+            data.byteswap()
+        return self._header.export() + data.tobytes()
 
     @classmethod
     def parse(cls, data, offset=0):
         header = Header.parse(data, offset, CmdTag.WRT_DAT)
         obj = cls(header.param & 0x7, (header.param >> 3) & 0x3)
-        index = header.size
-        while index < header.length:
-            (address, value) = unpack_from(">LL", data, offset + index)
-            obj.append(address, value)
-            index += 8
+        # Load all address/value pairs at once, the big-endian values are swapped in place
+        count = (header.length - header.size + 7) // 8
+        start = offset + header.size
+        raw_data = memoryview(data)[start:start + count * 8]
+        if len(raw_data) != count * 8:
+            raise CorruptedException(" Not enough data for Write Data command at position: " + hex(offset))
+        obj._data.frombytes(raw_data)
+        if sys.byteorder == 'little':
+            obj._data.byteswap()
+        obj._header.length = header.size + count * 8
         return obj
 
 
 class CmdCheckData(object):
     ''' Check data command '''
 
+    TAG = CmdTag.CHK_DAT
+
     @property
     def bytes(self):
         return self._header.param & 0x7
@@ -312,6 +399,8 @@ class CmdCheckData(object):
 class CmdNop(object):
     ''' Nop command '''
 
+    TAG = CmdTag.NOP
+
     @property
     def size(self):
         return self._header.length
@@ -345,6 +434,8 @@ class CmdNop(object):
 class CmdSet(object):
     ''' Set command '''
 
+    TAG = CmdTag.SET
+
     @property
     def itm(self):
         return self._header.param
@@ -417,6 +508,8 @@ class CmdSet(object):
 class CmdInitialize(object):
     ''' Initialize command '''
 
+    TAG = CmdTag.INIT
+
     @property
     def engine(self):
         return self._header.param
@@ -489,6 +582,8 @@ class CmdInitialize(object):
 class CmdUnlock(object):
     ''' Unlock engine command '''
 
+    TAG = CmdTag.UNLK
+
     @property
     def engine(self):
         return self._header.param
@@ -570,6 +665,9 @@ class CmdUnlock(object):
 
 class CmdInstallKey(object):
     ''' Install key command '''
+
+    TAG = CmdTag.INS_KEY
+
     @property
     def param(self):
         return self._header.param
@@ -670,12 +768,15 @@ class CmdInstallKey(object):
     def parse(cls, data, offset=0):
         header = Header.parse(data, offset, CmdTag.INS_KEY)
         pcl, alg, src, tgt, keydat = unpack_from(">BBBBL", data, offset + header.size)
-        crthsh = data[offset + header.size + 8 : offset + header.size + 8 + header.length]
+        crthsh = data[offset + header.size + 8 : offset + header.length]
         return cls(header.param, pcl, alg, src, tgt, keydat, crthsh)
 
 
 class CmdAuthData(object):
     ''' write here Doc '''
+
+    TAG = CmdTag.AUT_DAT
+
     @property
     def flag(self):
         return self._header.param
@@ -4,8 +4,10 @@
 # The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
 # or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
 
-from io import BytesIO, BufferedReader
-from .misc import read_raw_data, read_raw_segment
+import re
+import mmap
+from operator import attrgetter
+from .misc import read_raw_data, read_raw_segment, open_buffer, ViewReader
 from .header import Header, Header2
 from .segments import SegTag, SegIVT2, SegBDT, SegAPP, SegDCD, SegCSF, SegIVT3a, SegIVT3b, SegBDS3a, SegBDS3b, \
                       SegBIC1
@@ -15,38 +17,179 @@ from .segments import SegTag, SegIVT2, SegBDT, SegAPP, SegDCD, SegCSF, SegIVT3a,
 # i.MX Image Public Methods
 ########################################################################################################################
 
+# Size of data block scanned at once
+SCAN_BLOCK_SIZE = 0x1000000
+
+# Max size of padding block written at once by export_to()
+EXPORT_CHUNK_SIZE = 0x100000
+
+# The first byte of IVT header (IVT2 and IVT3) at scanned position
+_IVT_TAGS = re.compile(b'[' + bytes([SegTag.IVT2, SegTag.IVT3]) + b']')
+
+# Get modification counter of segment
+_revision = attrgetter('revision')
+
+# Count of bytes available at every candidate position (the largest header segment)
+_SCAN_OVERLAP = max(Header.SIZE, SegIVT2.SIZE, SegIVT3a.SIZE, SegIVT3b.SIZE, SegBIC1.SIZE)
+
+
+def _scan_source(buffer):
+    """ Prepare stream buffer or bytes array for scanning
+    :return: Tuple [stream, function read(offset, length) -> bytes-like object, start index, last index]
+    """
+    buffer = open_buffer(buffer)
+    if isinstance(buffer, ViewReader):
+        view = buffer.view
+    else:
+        try:
+            view = memoryview(mmap.mmap(buffer.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError):
+            view = None
+
+    start_index = buffer.tell()  # Get stream start index
+    buffer.seek(0, 2)            # Seek to end
+    last_index = buffer.tell()   # Get stream last index
+    buffer.seek(start_index, 0)  # Seek to start
+
+    if view is not None:
+        return buffer, lambda offset, length: view[offset:offset + length], start_index, last_index
+
+    def read(offset, length):
+        buffer.seek(offset, 0)
+        return buffer.read(length)
+
+    return buffer, read, start_index, last_index
+
+
+def _scan_candidates(read, start, stop, step):
+    """ Find positions (start + n * step) where the boot image header may start
+    Every block of positions is scanned at once by strided views of the first and last header byte.
+    :param read: The function read(offset, length) returning bytes-like object
+    :param start: The first position
+    :param stop: The last position (excluded)
+    :param step: Image searching step
+    :return: Iterator of Tuple [position, data at position (max _SCAN_OVERLAP bytes)]
+    """
+    block_size = max(1, SCAN_BLOCK_SIZE // step) * step
+    for block in range(start, stop, block_size):
+        length = min(block_size, stop - block)
+        data = read(block, length + _SCAN_OVERLAP)
+        tags = bytes(data[0:length:step])
+        bics = bytes(data[3:length + 3:step])
+        index = sorted({m.start() for m in _IVT_TAGS.finditer(tags)} |
+                       {m.start() for m in re.finditer(bytes([SegTag.BIC1]), bics)})
+        for i in index:
+            yield block + i * step, data[i * step:i * step + _SCAN_OVERLAP]
+
+
+def _detect(hrd):
+    """ Get boot image class from header bytes
+    :param hrd: The header bytes
+    :return: BootImg class or None
+    """
+    if   hrd[0] == SegTag.IVT2 and ((hrd[1] << 8) | hrd[2]) == SegIVT2.SIZE:
+        return BootImg2
+    elif hrd[0] == SegTag.IVT2 and ((hrd[1] << 8) | hrd[2]) == SegIVT3b.SIZE:
+        return BootImg3b
+    elif hrd[0] == SegTag.IVT3 and ((hrd[1] << 8) | hrd[2]) == SegIVT3a.SIZE:
+        return BootImg3a
+    elif hrd[3] == SegTag.BIC1:
+        return BootImg4
+    return None
+
+
+def _parse(buffer, step):
+    """ Find and parse the first boot image in stream buffer or bytes array
+    :return: Tuple [offset of boot image, the object of boot image]
+    """
+    buffer, read, start_index, last_index = _scan_source(buffer)
+
+    for index, data in _scan_candidates(read, start_index, last_index - Header.SIZE, step):
+        cls = _detect(data)
+        if cls is not None:
+            buffer.seek(index, 0)
+            return index, cls.parse(buffer)
+
+    raise Exception(' Not an i.MX Boot Image !')
+
+
 def parse(buffer, step=0x100):
     """ Common parser for all versions of i.MX boot images
+    The image parsed from bytes-like object (bytearray, mmap, ...) keeps a view of it, the buffer must not be modified
+    or resized while the image is used.
     :param buffer: stream buffer to image
     :param step: Image searching step
     :return: the object of boot image
     """
-    if isinstance(buffer, (bytes, bytearray)):
-        buffer = BufferedReader(BytesIO(buffer))
+    return _parse(buffer, step)[1]
 
-    if not isinstance(buffer, BufferedReader):
-        raise TypeError(" Not correct value type: \"{}\" !".format(type(buffer)))
 
-    start_index = buffer.tell()  # Get stream start index
-    buffer.seek(0, 2)            # Seek to end
-    last_index = buffer.tell()   # Get stream last index
-    buffer.seek(start_index, 0)  # Seek to start
+def scan(buffer, step=0x100):
+    """ Find all i.MX boot images in stream buffer or bytes array (disk dump)
+    The data are read block by block in single pass, so the memory usage doesn't depend on input size.
+    The kernel images (IVT without BDT) are reported as KernelImg.
+    :param buffer: stream buffer to image
+    :param step: Image searching step
+    :return: Iterator of Tuple [offset, boot image class, header segment (SegIVT2, SegIVT3a, SegIVT3b, SegBIC1)]
+    """
+    segments = {BootImg3a: SegIVT3a, BootImg3b: SegIVT3b, BootImg4: SegBIC1}
+    buffer, read, start_index, last_index = _scan_source(buffer)
+
+    for index, data in _scan_candidates(read, start_index, last_index - Header.SIZE, step):
+        cls = _detect(data)
+        if cls is None:
+            continue
+        try:
+            if cls is BootImg2:
+                segment = SegIVT2.parse(bytes(data[:SegIVT2.SIZE]), validate=False)
+                if segment.header.param not in (0x40, 0x41, 0x42, 0x43) or segment.ivt_address == 0:
+                    continue
+                if segment.bdt_address == 0:
+                    cls = KernelImg
+                else:
+                    segment.validate()
+            else:
+                segment = segments[cls].parse(bytes(data[:segments[cls].SIZE]))
+        except Exception:
+            continue
+        yield index, cls, segment
 
-    while buffer.tell() < (last_index - Header.SIZE):
-        hrd = read_raw_data(buffer, Header.SIZE)
-        buffer.seek(-Header.SIZE, 1)
-        if   hrd[0] == SegTag.IVT2 and ((hrd[1] << 8) | hrd[2]) == SegIVT2.SIZE:
-            return BootImg2.parse(buffer)
-        elif hrd[0] == SegTag.IVT2 and ((hrd[1] << 8) | hrd[2]) == SegIVT3b.SIZE:
-            return BootImg3b.parse(buffer)
-        elif hrd[0] == SegTag.IVT3 and ((hrd[1] << 8) | hrd[2]) == SegIVT3a.SIZE:
-            return BootImg3a.parse(buffer)
-        elif hrd[3] == SegTag.BIC1:
-            return BootImg4.parse(buffer)
-        else:
-            buffer.seek(step, 1)
 
-    raise Exception(' Not an i.MX Boot Image !')
+def _export_parts(parts):
+    """ Join image parts into single preallocated buffer
+    :param parts: The list of tuples [(bytes-like object, padding length, padding value), ...]
+    :return: bytearray
+    """
+    image = bytearray(sum(len(data) + padding for data, padding, _ in parts))
+    # Assign through memoryview, bytearray slice assignment makes a temporary copy of not bytearray values
+    view = memoryview(image)
+    offset = 0
+    for data, padding, value in parts:
+        view[offset:offset + len(data)] = data
+        offset += len(data)
+        if value and padding:
+            view[offset:offset + padding] = bytes([value]) * padding
+        offset += padding
+    view.release()
+    return image
+
+
+def _write_parts(parts, fileobj):
+    """ Write image parts into file object without joining them
+    :param parts: The list of tuples [(bytes-like object, padding length, padding value), ...]
+    :param fileobj: The writable file object
+    :return: Count of written bytes
+    """
+    length = 0
+    for data, padding, value in parts:
+        fileobj.write(data)
+        length += len(data) + padding
+        if padding:
+            chunk = bytes([value]) * min(padding, EXPORT_CHUNK_SIZE)
+            while padding > 0:
+                fileobj.write(chunk[:padding] if padding < len(chunk) else chunk)
+                padding -= len(chunk)
+    return length
 
 
 ########################################################################################################################
@@ -84,6 +227,7 @@ class BootImgBase(object):
         """
         self.offset = offset
         self.address = address
+        self._state = None
 
     def __str__(self):
         return self.info()
@@ -91,15 +235,49 @@ class BootImgBase(object):
     def __repr__(self):
         return self.info()
 
-    def info(self):
+    def _segments(self):
+        """ Get all segments the image layout is computed from """
+        raise NotImplementedError()
+
+    def _layout_state(self):
+        """ Get the state of image attributes and segments the layout depends on """
+        segments = tuple(self._segments())
+        address = tuple(self.address) if isinstance(self.address, list) else self.address
+        return address, self.offset, getattr(self, '_plg', None), segments, tuple(map(_revision, segments))
+
+    def _update_layout(self):
         raise NotImplementedError()
 
+    def _update(self):
+        """ Update Image Object, the layout is recomputed only if anything was changed since last update """
+        if self._layout_state() != self._state:
+            self._update_layout()
+            self._state = self._layout_state()
+
+    def iter_info(self):
+        """ Render image info part by part
+        :return generator of strings
+        """
+        raise NotImplementedError()
+
+    def info(self):
+        return ''.join(self.iter_info())
+
     def add_image(self, data, img_type, address):
         raise NotImplementedError()
 
     def export(self):
         raise NotImplementedError()
 
+    def export_to(self, fileobj):
+        """ Export image directly into file object
+        :param fileobj: The writable file object
+        :return: Count of written bytes
+        """
+        data = self.export()
+        fileobj.write(data)
+        return len(data)
+
     @classmethod
     def parse(cls, buffer, step=0x100):
         raise NotImplementedError()
@@ -205,8 +383,10 @@ class BootImg2(BootImgBase):
         self._csf = SegCSF()
         self._plg = plugin
 
-    def _update(self):
-        """ Update Image Object """
+    def _segments(self):
+        return self.ivt, self.bdt, self.dcd, self.app, self.csf
+
+    def _update_layout(self):
         # Set zero padding for IVT and BDT sections
         self.ivt.padding = 0
         self.bdt.padding = 0
@@ -235,31 +415,30 @@ class BootImg2(BootImgBase):
         self.bdt.length = self.size + self.offset
         self.bdt.plugin = 1 if self.plugin else 0
 
-    def info(self):
+    def iter_info(self):
         self._update()
         # Print IVT
-        msg = "#" * 60 + "\n"
-        msg += "# IVT (Image Vector Table)\n"
-        msg += "#" * 60 + "\n\n"
-        msg += str(self.ivt)
+        yield "#" * 60 + "\n"
+        yield "# IVT (Image Vector Table)\n"
+        yield "#" * 60 + "\n\n"
+        yield str(self.ivt)
         # Print DBI
-        msg += "#" * 60 + "\n"
-        msg += "# BDI (Boot Data Info)\n"
-        msg += "#" * 60 + "\n\n"
-        msg += str(self.bdt)
+        yield "#" * 60 + "\n"
+        yield "# BDI (Boot Data Info)\n"
+        yield "#" * 60 + "\n\n"
+        yield str(self.bdt)
         # Print DCD
         if self.dcd.enabled:
-            msg += "#" * 60 + "\n"
-            msg += "# DCD (Device Config Data)\n"
-            msg += "#" * 60 + "\n\n"
-            msg += str(self.dcd)
+            yield "#" * 60 + "\n"
+            yield "# DCD (Device Config Data)\n"
+            yield "#" * 60 + "\n\n"
+            yield from self.dcd.iter_info()
         # Print CSF
         if self.csf.enabled:
-            msg += "#" * 60 + "\n"
-            msg += "# CSF (Code Signing Data)\n"
-            msg += "#" * 60 + "\n\n"
-            msg += str(self.csf)
-        return msg
+            yield "#" * 60 + "\n"
+            yield "# CSF (Code Signing Data)\n"
+            yield "#" * 60 + "\n\n"
+            yield str(self.csf)
 
     def add_image(self, data, img_type=EnumAppType.APP, address=0):
         """ Add specific image into the main boot image
@@ -274,17 +453,25 @@ class BootImg2(BootImgBase):
         else:
             raise Exception('Unknown data type !')
 
+    def _layout(self):
+        """ Get image parts in export order, must be called after _update() """
+        return [self.ivt.export_parts(), self.bdt.export_parts(), self.dcd.export_parts(), self.app.export_parts(),
+                self.csf.export_parts()]
+
     def export(self):
         """ Export image as bytes array
-        :return: bytes
+        :return: bytearray
         """
         self._update()
-        data = self.ivt.export(True)
-        data += self.bdt.export(True)
-        data += self.dcd.export(True)
-        data += self.app.export(True)
-        data += self.csf.export(True)
-        return data
+        return _export_parts(self._layout())
+
+    def export_to(self, fileobj):
+        """ Export image directly into file object
+        :param fileobj: The writable file object
+        :return: Count of written bytes
+        """
+        self._update()
+        return _write_parts(self._layout(), fileobj)
 
     @classmethod
     def parse(cls, buffer, step=0x100):
@@ -293,20 +480,15 @@ class BootImg2(BootImgBase):
         :param step: The
         :return: BootImg2 object
         """
-        if isinstance(buffer, (bytes, bytearray)):
-            buffer = BufferedReader(BytesIO(buffer))
-
-        if not isinstance(buffer, BufferedReader):
-            raise TypeError(" Not correct value type: \"{}\" !".format(type(buffer)))
+        buffer = open_buffer(buffer)
 
         offset = buffer.tell()          # Get stream start index
         buffer.seek(0, 2)               # Seek to end
         bufend = buffer.tell()          # Get stream last index
         buffer.seek(offset, 0)          # Seek to start
-        buffer_size = bufend - offset   # Read buffer size
 
         imx_image = False
-        while buffer.tell() < (buffer_size - Header.SIZE):
+        while buffer.tell() < (bufend - Header.SIZE):
             header = Header.parse(read_raw_data(buffer, Header.SIZE))
             buffer.seek(-Header.SIZE, 1)
             if header.tag == SegTag.IVT2 and \
@@ -337,7 +519,7 @@ class BootImg2(BootImgBase):
         app_start = offset + (obj.ivt.app_address - obj.ivt.ivt_address)
         app_size = obj.ivt.csf_address - obj.ivt.app_address if obj.ivt.csf_address else \
                    obj.bdt.length - (obj.bdt.start - obj.ivt.app_address)
-        app_size = buffer_size - app_start if app_size > (buffer_size - app_start) else app_size
+        app_size = bufend - app_start if app_size > (bufend - app_start) else app_size
         obj.app.data = read_raw_data(buffer, app_size, app_start)
         obj.app.padding = 0
         # Parse CSF
@@ -441,7 +623,10 @@ class BootImg8m(BootImgBase):
         self._csf = SegCSF()
         self._plg = plugin
 
-    def _update(self):
+    def _segments(self):
+        return self.ivt, self.bdt, self.dcd, self.app, self.csf
+
+    def _update_layout(self):
         # Set zero padding for IVT and BDT sections
         self.ivt.padding = 0
         self.bdt.padding = 0
@@ -470,31 +655,30 @@ class BootImg8m(BootImgBase):
         self.bdt.length = self.size + self.offset
         self.bdt.plugin = 1 if self.plugin else 0
 
-    def info(self):
+    def iter_info(self):
         self._update()
         # Print IVT
-        msg = "#" * 60 + "\n"
-        msg += "# IVT (Image Vector Table)\n"
-        msg += "#" * 60 + "\n\n"
-        msg += str(self.ivt)
+        yield "#" * 60 + "\n"
+        yield "# IVT (Image Vector Table)\n"
+        yield "#" * 60 + "\n\n"
+        yield str(self.ivt)
         # Print DBI
-        msg += "#" * 60 + "\n"
-        msg += "# BDI (Boot Data Info)\n"
-        msg += "#" * 60 + "\n\n"
-        msg += str(self.bdt)
+        yield "#" * 60 + "\n"
+        yield "# BDI (Boot Data Info)\n"
+        yield "#" * 60 + "\n\n"
+        yield str(self.bdt)
         # Print DCD
         if self.dcd.enabled:
-            msg += "#" * 60 + "\n"
-            msg += "# DCD (Device Config Data)\n"
-            msg += "#" * 60 + "\n\n"
-            msg += str(self.dcd)
+            yield "#" * 60 + "\n"
+            yield "# DCD (Device Config Data)\n"
+            yield "#" * 60 + "\n\n"
+            yield from self.dcd.iter_info()
         # Print CSF
         if self.csf.enabled:
-            msg += "#" * 60 + "\n"
-            msg += "# CSF (Code Signing Data)\n"
-            msg += "#" * 60 + "\n\n"
-            msg += str(self.csf)
-        return msg
+            yield "#" * 60 + "\n"
+            yield "# CSF (Code Signing Data)\n"
+            yield "#" * 60 + "\n\n"
+            yield str(self.csf)
 
     def add_image(self, data, img_type=EnumAppType.APP, address=0):
         """ Add specific image into the main boot image
@@ -510,17 +694,25 @@ class BootImg8m(BootImgBase):
         else:
             raise Exception('Unknown data type !')
 
+    def _layout(self):
+        """ Get image parts in export order, must be called after _update() """
+        return [self.ivt.export_parts(), self.bdt.export_parts(), self.dcd.export_parts(), self.app.export_parts(),
+                self.csf.export_parts()]
+
     def export(self):
         """ Export Image as bytes array
-        :return: bytes
+        :return: bytearray
         """
         self._update()
-        data = self.ivt.export(True)
-        data += self.bdt.export(True)
-        data += self.dcd.export(True)
-        data += self.app.export(True)
-        data += self.csf.export(True)
-        return data
+        return _export_parts(self._layout())
+
+    def export_to(self, fileobj):
+        """ Export Image directly into file object
+        :param fileobj: The writable file object
+        :return: Count of written bytes
+        """
+        self._update()
+        return _write_parts(self._layout(), fileobj)
 
     @classmethod
     def parse(cls, buffer, step=0x100):
@@ -529,20 +721,15 @@ class BootImg8m(BootImgBase):
         :param step: The
         :return: BootImg2 object
         """
-        if isinstance(buffer, (bytes, bytearray)):
-            buffer = BufferedReader(BytesIO(buffer))
-
-        if not isinstance(buffer, BufferedReader):
-            raise TypeError(" Not correct value type: \"{}\" !".format(type(buffer)))
+        buffer = open_buffer(buffer)
 
         offset = buffer.tell()          # Get stream start index
         buffer.seek(0, 2)               # Seek to end
         bufend = buffer.tell()          # Get stream last index
         buffer.seek(offset, 0)          # Seek to start
-        buffer_size = bufend - offset   # Read buffer size
 
         imx_image = False
-        while buffer.tell() < (buffer_size - Header.SIZE):
+        while buffer.tell() < (bufend - Header.SIZE):
             header = Header.parse(read_raw_data(buffer, Header.SIZE))
             buffer.seek(-Header.SIZE, 1)
             if header.tag == SegTag.IVT2 and \
@@ -573,7 +760,7 @@ class BootImg8m(BootImgBase):
         app_start = offset + (obj.ivt.app_address - obj.ivt.ivt_address)
         app_size = obj.ivt.csf_address - obj.ivt.app_address if obj.ivt.csf_address else \
                    obj.bdt.length - (obj.bdt.start - obj.ivt.app_address)
-        app_size = buffer_size - app_start if app_size > (buffer_size - app_start) else app_size
+        app_size = bufend - app_start if app_size > (bufend - app_start) else app_size
         obj.app.data = read_raw_data(buffer, app_size, app_start)
         obj.app.padding = 0
         # Parse CSF
@@ -690,7 +877,13 @@ class BootImg3a(BootImgBase):
     def _compute_padding(size, sector_size):
         return ((size // sector_size + (size % sector_size > 0)) * sector_size) - size
 
-    def _update(self):
+    def _segments(self):
+        segments = self.ivt + self.bdt + [self.dcd, self.csf]
+        for container in range(self.COUNT_OF_CONTAINERS):
+            segments += self.bdt[container].images + self.app[container]
+        return segments
+
+    def _update_layout(self):
         # Set zero padding for IVT and BDT sections
         for container in range(self.COUNT_OF_CONTAINERS):
             self.ivt[container].padding = 0
@@ -741,39 +934,38 @@ class BootImg3a(BootImgBase):
                 self.app[container][self.bdt[container].images_count - 1].padding = 0
                 # Set BDT section
 
-    def info(self):
+    def iter_info(self):
         self._update()
         # Print IVT
-        msg = "#" * 60 + "\n"
-        msg += "# IVT (Image Vector Table)\n"
-        msg += "#" * 60 + "\n\n"
+        yield "#" * 60 + "\n"
+        yield "# IVT (Image Vector Table)\n"
+        yield "#" * 60 + "\n\n"
         for index, ivt in enumerate(self.ivt):
-            msg += "-" * 60 + "\n"
-            msg += "- IVT[{}]\n".format(index)
-            msg += "-" * 60 + "\n\n"
-            msg += str(ivt)
+            yield "-" * 60 + "\n"
+            yield "- IVT[{}]\n".format(index)
+            yield "-" * 60 + "\n\n"
+            yield str(ivt)
         # Print BDI
-        msg += "#" * 60 + "\n"
-        msg += "# BDI (Boot Data Info)\n"
-        msg += "#" * 60 + "\n\n"
+        yield "#" * 60 + "\n"
+        yield "# BDI (Boot Data Info)\n"
+        yield "#" * 60 + "\n\n"
         for index, bdi in enumerate(self.bdt):
-            msg += "-" * 60 + "\n"
-            msg += "- BDI[{}]\n".format(index)
-            msg += "-" * 60 + "\n\n"
-            msg += str(bdi)
+            yield "-" * 60 + "\n"
+            yield "- BDI[{}]\n".format(index)
+            yield "-" * 60 + "\n\n"
+            yield str(bdi)
         # Print DCD
         if self.dcd.enabled:
-            msg += "#" * 60 + "\n"
-            msg += "# DCD (Device Config Data)\n"
-            msg += "#" * 60 + "\n\n"
-            msg += str(self.dcd)
+            yield "#" * 60 + "\n"
+            yield "# DCD (Device Config Data)\n"
+            yield "#" * 60 + "\n\n"
+            yield from self.dcd.iter_info()
         # Print CSF
         if self.csf.enabled:
-            msg += "#" * 60 + "\n"
-            msg += "# CSF (Code Signing Data)\n"
-            msg += "#" * 60 + "\n\n"
-            msg += str(self.csf)
-        return msg
+            yield "#" * 60 + "\n"
+            yield "# CSF (Code Signing Data)\n"
+            yield "#" * 60 + "\n\n"
+            yield str(self.csf)
 
     def add_image(self, data, img_type=EnumAppType.APP, address=0):
         """ Add specific image into the main boot image
@@ -842,25 +1034,33 @@ class BootImg3a(BootImgBase):
         else:
             raise Exception('Unknown data type !')
 
+    def _layout(self):
+        """ Get image parts in export order, must be called after _update() """
+        parts = [self.ivt[0].export_parts(), self.ivt[1].export_parts(), self.bdt[0].export_parts(),
+                 self.bdt[1].export_parts(), self.dcd.export_parts(), self.csf.export_parts()]
+        size = sum(len(data) + padding for data, padding, _ in parts)
+        parts.append((b'', self._compute_padding(size, self.APP_ALIGN - self.offset), self.PADDING_VAL))
+
+        for container in range(self.COUNT_OF_CONTAINERS):
+            for image in range(self.bdt[container].images_count):
+                parts.append(self.app[container][image].export_parts())
+
+        return parts
+
     def export(self):
         ''' Export Image as binary blob
-        :return:
+        :return: bytearray
         '''
         self._update()
-        data = bytes()
-        data += self.ivt[0].export(True)
-        data += self.ivt[1].export(True)
-        data += self.bdt[0].export(True)
-        data += self.bdt[1].export(True)
-        data += self.dcd.export(True)
-        data += self.csf.export(True)
-        data += bytes([self.PADDING_VAL] * self._compute_padding(len(data), self.APP_ALIGN - self.offset))
+        return _export_parts(self._layout())
 
-        for container in range(self.COUNT_OF_CONTAINERS):
-            for image in range(self.bdt[container].images_count):
-                data += self.app[container][image].export(True)
-
-        return data
+    def export_to(self, fileobj):
+        ''' Export Image directly into file object
+        :param fileobj: The writable file object
+        :return: Count of written bytes
+        '''
+        self._update()
+        return _write_parts(self._layout(), fileobj)
 
     @classmethod
     def parse(cls, buffer, step=0x100):
@@ -869,20 +1069,15 @@ class BootImg3a(BootImgBase):
         :param ivt_offset:
         :return:
         """
-        if isinstance(buffer, (bytes, bytearray)):
-            buffer = BufferedReader(BytesIO(buffer))
-
-        if not isinstance(buffer, BufferedReader):
-            raise TypeError(" Not correct value type: \"{}\" !".format(type(buffer)))
+        buffer = open_buffer(buffer)
 
         offset = buffer.tell()          # Get stream start index
         buffer.seek(0, 2)               # Seek to end
         bufend = buffer.tell()          # Get stream last index
         buffer.seek(offset, 0)          # Seek to start
-        buffer_size = bufend - offset   # Read buffer size
 
         imx_image = False
-        while buffer.tell() < (buffer_size - Header.SIZE):
+        while buffer.tell() < (bufend - Header.SIZE):
             header = Header.parse(read_raw_data(buffer, Header.SIZE))
             buffer.seek(-Header.SIZE, 1)
             if header.tag == SegTag.IVT3 and \
@@ -1040,7 +1235,14 @@ class BootImg3b(BootImgBase):
     def _compute_padding(image_size, sector_size):
         return ((image_size // sector_size + (image_size % sector_size > 0)) * sector_size) - image_size
 
-    def _update(self):
+    def _segments(self):
+        segments = self.ivt + self.bdt + [self.dcd, self.scd, self.csf]
+        for container in range(self.COUNT_OF_CONTAINERS):
+            bdt = self.bdt[container]
+            segments += bdt.images + [bdt.scd, bdt.csf, bdt.rs_img] + self.app[container]
+        return segments
+
+    def _update_layout(self):
         # Set zero padding for IVT and BDT sections
         for container in range(self.COUNT_OF_CONTAINERS):
             self.ivt[container].padding = 0
@@ -1102,39 +1304,38 @@ class BootImg3b(BootImgBase):
                     next_image_address += self.csf.space
                     # Set BDT section
 
-    def info(self):
+    def iter_info(self):
         self._update()
         # Print IVT
-        msg = "#" * 60 + "\n"
-        msg += "# IVT (Image Vector Table)\n"
-        msg += "#" * 60 + "\n\n"
+        yield "#" * 60 + "\n"
+        yield "# IVT (Image Vector Table)\n"
+        yield "#" * 60 + "\n\n"
         for index, ivt in enumerate(self.ivt):
-            msg += "-" * 60 + "\n"
-            msg += "- IVT[{}]\n".format(index)
-            msg += "-" * 60 + "\n\n"
-            msg += str(ivt)
+            yield "-" * 60 + "\n"
+            yield "- IVT[{}]\n".format(index)
+            yield "-" * 60 + "\n\n"
+            yield str(ivt)
         # Print BDI
-        msg += "#" * 60 + "\n"
-        msg += "# BDI (Boot Data Info)\n"
-        msg += "#" * 60 + "\n\n"
+        yield "#" * 60 + "\n"
+        yield "# BDI (Boot Data Info)\n"
+        yield "#" * 60 + "\n\n"
         for index, bdi in enumerate(self.bdt):
-            msg += "-" * 60 + "\n"
-            msg += "- BDI[{}]\n".format(index)
-            msg += "-" * 60 + "\n\n"
-            msg += str(bdi)
+            yield "-" * 60 + "\n"
+            yield "- BDI[{}]\n".format(index)
+            yield "-" * 60 + "\n\n"
+            yield str(bdi)
         # Print DCD
         if self.dcd.enabled:
-            msg += "#" * 60 + "\n"
-            msg += "# DCD (Device Config Data)\n"
-            msg += "#" * 60 + "\n\n"
-            msg += str(self.dcd)
+            yield "#" * 60 + "\n"
+            yield "# DCD (Device Config Data)\n"
+            yield "#" * 60 + "\n\n"
+            yield from self.dcd.iter_info()
         # Print CSF
         if self.csf.enabled:
-            msg += "#" * 60 + "\n"
-            msg += "# CSF (Code Signing Data)\n"
-            msg += "#" * 60 + "\n\n"
-            msg += str(self.csf)
-        return msg
+            yield "#" * 60 + "\n"
+            yield "# CSF (Code Signing Data)\n"
+            yield "#" * 60 + "\n\n"
+            yield str(self.csf)
 
     def add_image(self, data, img_type=EnumAppType.APP, address=0):
         """ Add specific image into the main boot image
@@ -1201,28 +1402,32 @@ class BootImg3b(BootImgBase):
         else:
             raise Exception(' Unknown image type !')
 
-    def export(self):
-        self._update()
-        # data = bytearray(self._offset)
-        data = bytes()
-        data += self.ivt[0].export(True)
-        data += self.ivt[1].export(True)
-        data += self.bdt[0].export(True)
-        data += self.bdt[1].export(True)
-        data += self.dcd.export(True)
-        data += bytes([self.PADDING_VAL] * self._compute_padding(len(data), self.APP_ALIGN - self.offset))
+    def _layout(self):
+        """ Get image parts in export order, must be called after _update() """
+        parts = [self.ivt[0].export_parts(), self.ivt[1].export_parts(), self.bdt[0].export_parts(),
+                 self.bdt[1].export_parts(), self.dcd.export_parts()]
+        size = sum(len(data) + padding for data, padding, _ in parts)
+        parts.append((b'', self._compute_padding(size, self.APP_ALIGN - self.offset), self.PADDING_VAL))
 
         for container in range(self.COUNT_OF_CONTAINERS):
             for i in range(self.bdt[container].images_count):
-                data += self.app[container][i].export(True)
+                parts.append(self.app[container][i].export_parts())
 
         if self.bdt[0].scd.image_source != 0:
-            data += self.scd.export(True)
+            parts.append(self.scd.export_parts())
 
         if self.bdt[0].csf.image_source != 0:
-            data += self.csf.export(True)
+            parts.append(self.csf.export_parts())
 
-        return data
+        return parts
+
+    def export(self):
+        self._update()
+        return _export_parts(self._layout())
+
+    def export_to(self, fileobj):
+        self._update()
+        return _write_parts(self._layout(), fileobj)
 
     @classmethod
     def parse(cls, buffer, step=0x100):
@@ -1231,20 +1436,15 @@ class BootImg3b(BootImgBase):
         :param step:
         :return:
         """
-        if isinstance(buffer, (bytes, bytearray)):
-            buffer = BufferedReader(BytesIO(buffer))
-
-        if not isinstance(buffer, BufferedReader):
-            raise TypeError(" Not correct value type: \"{}\" !".format(type(buffer)))
+        buffer = open_buffer(buffer)
 
         offset = buffer.tell()          # Get stream start index
         buffer.seek(0, 2)               # Seek to end
         bufend = buffer.tell()          # Get stream last index
         buffer.seek(offset, 0)          # Seek to start
-        buffer_size = bufend - offset   # Read buffer size
 
         imx_image = False
-        while buffer.tell() < (buffer_size - Header.SIZE):
+        while buffer.tell() < (bufend - Header.SIZE):
             header = Header.parse(read_raw_data(buffer, Header.SIZE))
             buffer.seek(-Header.SIZE, 1)
             if header.tag == SegTag.IVT2 and \
@@ -1311,23 +1511,21 @@ class BootImg4(BootImgBase):
     def _update(self):
         pass
 
-    def info(self):
+    def iter_info(self):
         self._update()
-        msg = ""
-        msg += "#" * 60 + "\n"
-        msg += "# Boot Images Container 1\n"
-        msg += "#" * 60 + "\n\n"
-        msg += self._cont1_header.info()
-        msg += "#" * 60 + "\n"
-        msg += "# Boot Images Container 2\n"
-        msg += "#" * 60 + "\n\n"
-        msg += self._cont2_header.info()
+        yield "#" * 60 + "\n"
+        yield "# Boot Images Container 1\n"
+        yield "#" * 60 + "\n\n"
+        yield self._cont1_header.info()
+        yield "#" * 60 + "\n"
+        yield "# Boot Images Container 2\n"
+        yield "#" * 60 + "\n\n"
+        yield self._cont2_header.info()
         if self.dcd.enabled:
-            msg += "#" * 60 + "\n"
-            msg += "# DCD (Device Config Data)\n"
-            msg += "#" * 60 + "\n\n"
-            msg += self.dcd.info()
-        return msg
+            yield "#" * 60 + "\n"
+            yield "# DCD (Device Config Data)\n"
+            yield "#" * 60 + "\n\n"
+            yield from self.dcd.iter_info()
 
     def add_image(self, data, img_type, address):
         raise NotImplementedError()
@@ -1342,20 +1540,15 @@ class BootImg4(BootImgBase):
 
     @classmethod
     def parse(cls, buffer, step=0x100):
-        if isinstance(buffer, (bytes, bytearray)):
-            buffer = BufferedReader(BytesIO(buffer))
-
-        if not isinstance(buffer, BufferedReader):
-            raise TypeError(" Not correct value type: \"{}\" !".format(type(buffer)))
+        buffer = open_buffer(buffer)
 
         offset = buffer.tell()          # Get stream start index
         buffer.seek(0, 2)               # Seek to end
         bufend = buffer.tell()          # Get stream last index
         buffer.seek(offset, 0)          # Seek to start
-        buffer_size = bufend - offset   # Read buffer size
 
         imx_image = False
-        while buffer.tell() < (buffer_size - Header2.SIZE):
+        while buffer.tell() < (bufend - Header2.SIZE):
             header = Header2.parse(read_raw_data(buffer, Header2.SIZE))
             buffer.seek(-Header2.SIZE, 1)
             if header.tag == SegTag.BIC1:
@@ -4,6 +4,7 @@
 # The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
 # or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
 
+import mmap
 from io import BytesIO, BufferedReader
 from .header import Header
 
@@ -35,5 +36,54 @@ def read_raw_data(stream, length, index=None):
 
 def read_raw_segment(buffer, segment_tag, index=None):
     hrdata = read_raw_data(buffer, Header.SIZE, index)
-    length = Header.parse(hrdata, 0, segment_tag).length - Header.SIZE
-    return hrdata + read_raw_data(buffer, length)
+    length = Header.parse(hrdata, 0, segment_tag).length
+    buffer.seek(-Header.SIZE, 1)
+    return bytes(read_raw_data(buffer, length))
+
+
+class ViewReader(object):
+    """ Read-only stream over memoryview of bytes-like object (bytes, bytearray, mmap, ...)
+    The read() method returns memoryview slices, so the data are not copied.
+    """
+
+    @property
+    def view(self):
+        return self._view
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast('B')
+        self._pos = 0
+
+    def __len__(self):
+        return len(self._view)
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._pos
+        elif whence == 2:
+            offset += len(self._view)
+        if offset < 0:
+            raise ValueError(" Negative seek position {}".format(offset))
+        self._pos = offset
+        return self._pos
+
+    def read(self, size=-1):
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        data = self._view[self._pos:end]
+        self._pos = max(self._pos, end)
+        return data
+
+
+def open_buffer(buffer):
+    """ Get stream for parsing from bytes-like object or stream
+    :param buffer: The bytes-like object (bytes, bytearray, memoryview, mmap) or stream (BufferedReader, ViewReader)
+    :return: ViewReader or the input stream
+    """
+    if isinstance(buffer, (BufferedReader, ViewReader)):
+        return buffer
+    if isinstance(buffer, (bytes, bytearray, memoryview, mmap.mmap)):
+        return ViewReader(buffer)
+    raise TypeError(" Not correct value type: \"{}\" !".format(type(buffer)))
@@ -4,6 +4,9 @@
 # The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
 # or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
 
+import re
+import sys
+from array import array
 from io import BytesIO, BufferedReader
 from struct import pack, unpack_from, calcsize
 
@@ -24,6 +27,8 @@ class BaseSegment(object):
 
     # padding fill value
     PADDING_VALUE = 0x00
+    # initial value of modification counter
+    _revision = 0
 
     @property
     def padding(self):
@@ -41,8 +46,21 @@ class BaseSegment(object):
     def size(self):
         return 0
 
+    @property
+    def revision(self):
+        """ Modification counter, incremented by every attribute assignment """
+        return self._revision
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        object.__setattr__(self, '_revision', self._revision + 1)
+
+    def _touch(self):
+        """ Mark segment as modified, for in-place changes which are not an attribute assignment """
+        object.__setattr__(self, '_revision', self._revision + 1)
+
     def _padding_export(self):
-        return bytes([self.PADDING_VALUE] * self._padding) if self._padding > 0 else b''
+        return bytes([self.PADDING_VALUE]) * self._padding if self._padding > 0 else b''
 
     def __init__(self):
         self._padding = 0
@@ -61,6 +79,13 @@ class BaseSegment(object):
         """ export interface """
         raise NotImplementedError()
 
+    def export_parts(self):
+        """ Export segment data and padding without joining them
+        :return: tuple (bytes-like object, padding length, padding value)
+        """
+        data = self.export()
+        return data, max(self._padding, 0) if data else 0, self.PADDING_VALUE
+
     @classmethod
     def parse(cls, buffer):
         """ parse interface """
@@ -143,9 +168,10 @@ class SegIVT2(BaseSegment):
         return data
 
     @classmethod
-    def parse(cls, data):
+    def parse(cls, data, validate=True):
         """ Parse segment from bytes array
         :param data: The bytes array of IVT2 segment
+        :param validate: Validate parsed values (disable for kernel IVT which has no BDT)
         :return SegIVT2 object
         """
         header = Header.parse(data, 0, SegTag.IVT2)
@@ -161,7 +187,8 @@ class SegIVT2(BaseSegment):
         # Calculate IVT padding (should be zero)
         obj.padding = obj.bdt_address - obj.ivt_address - obj.size
         # Validate parsed values
-        obj.validate()
+        if validate:
+            obj.validate()
         return obj
 
 class SegBDT(BaseSegment):
@@ -225,10 +252,18 @@ class SegBDT(BaseSegment):
 
 
 class SegAPP(BaseSegment):
-    """ Boot data segment """
+    """ Boot data segment
+
+    The segment parsed from bytes-like object keeps a memoryview of it until the data are accessed, so modification
+    of the parsed buffer changes the image and resizing of it (bytearray) raises BufferError.
+    """
 
     @property
     def data(self):
+        # The parsed data are kept as memoryview of input buffer, materialize them only on access. The cached copy
+        # is not a modification, so it's assigned without incrementing the revision counter.
+        if isinstance(self._data, memoryview):
+            object.__setattr__(self, '_data', bytes(self._data))
         return self._data
 
     @data.setter
@@ -261,10 +296,62 @@ class SegAPP(BaseSegment):
             data += self._padding_export()
         return data
 
+    def export_parts(self):
+        """ Export segment data and padding without joining them, the data are not copied
+        :return: tuple (bytes-like object, padding length, padding value)
+        """
+        return self._data, max(self._padding, 0), self.PADDING_VALUE
+
+
+# Block of write commands with the same operation and bytes, one command with address, value and optional comment per
+# line. The multi-line commands or other count of arguments stop the block, these lines are parsed one by one.
+_TXT_WRITE_LINE = r'[ \t]*{0}[ \t]+{1}[ \t]+[^\s#\\\0]+[ \t]+[^\s#\\\0]+(?:[ \t]+#[^\n\\\0]*)?[ \t\r]*(?:\n|$)'
+_TXT_COMMENT = re.compile(r'#[^\n]*')
+_TXT_UINT32_HEX = re.compile(r'(?:0[xX][0-9A-Fa-f]{8})+')
+_TXT_HEX_PREFIX = re.compile(r'0[xX]')
+_TXT_WRITE_BLOCK = re.compile(_TXT_WRITE_LINE.format(r'(WriteValue1?|ClearBitMask|SetBitMask)', r'(\d+)') +
+                              r'(?:' + _TXT_WRITE_LINE.format(r'\1', r'\2') + r')*')
+
+
+def _txt_uint32(tokens):
+    """ Convert the number strings into array('I'), the common format 0xXXXXXXXX is converted at once
+    :param tokens: The list of number strings
+    :return array('I')
+    """
+    text = ''.join(tokens)
+    # With every token of 10 chars the joined text matches only if each token is in 0xXXXXXXXX format
+    if all(len(token) == 10 for token in tokens) and _TXT_UINT32_HEX.fullmatch(text):
+        data = array('I', bytes.fromhex(_TXT_HEX_PREFIX.sub('', text)))
+        if sys.byteorder == 'little':
+            data.byteswap()
+        return data
+
+    return array('I', [int(token, 0) for token in tokens])
+
+
+def _parse_commands(obj, data, start, end):
+    """ Parse commands of DCD or CSF segment, the command parser is selected by the tag in command header
+    :param obj: The segment object the commands are appended to
+    :param data: The bytes array
+    :param start: The offset of first command
+    :param end: The offset of segment end
+    """
+    parsers = obj.CMD_PARSERS
+    index = start
+    while index < end:
+        cmd_class = parsers.get(data[index])
+        if cmd_class is None:
+            raise CorruptedException("at position: " + hex(index))
+        cmd_obj = cmd_class.parse(data, index)
+        obj.append(cmd_obj)
+        index += cmd_obj.size
+
 
 class SegDCD(BaseSegment):
     """ DCD segment """
     CMD_TYPES = (CmdWriteData, CmdCheckData, CmdNop, CmdUnlock)
+    # command parser selected by the tag in command header
+    CMD_PARSERS = {cmd.TAG: cmd for cmd in CMD_TYPES}
 
     @property
     def header(self):
@@ -306,66 +393,85 @@ class SegDCD(BaseSegment):
     def __setitem__(self, key, value):
         assert type(value) in self.CMD_TYPES
         self._commands[key] = value
+        self._touch()
 
     def __iter__(self):
         return self._commands.__iter__()
 
-    def info(self):
-        msg = ""
+    def iter_info(self):
+        """ Render segment info part by part
+        :return generator of strings
+        """
         for cmd in self._commands:
-            msg += str(cmd)
-            msg += "\n"
-        return msg
+            if type(cmd) is CmdWriteData:
+                yield from cmd.iter_info()
+            else:
+                yield cmd.info()
+            yield "\n"
+
+    def info(self):
+        return ''.join(self.iter_info())
 
     def append(self, cmd):
         assert type(cmd) in self.CMD_TYPES
         self._commands.append(cmd)
         self._header.length += cmd.size
+        self._touch()
 
     def pop(self, index):
         assert 0 <= index < len(self._commands)
         cmd = self._commands.pop(index)
         self._header.length -= cmd.size
+        self._touch()
         return cmd
 
     def clear(self):
         self._commands.clear()
         self._header.length = self._header.size
+        self._touch()
 
-    def export_txt(self, txt_data=None):
+    def iter_txt(self):
+        """ Render segment as DCD text part by part
+        :return generator of strings
+        """
         write_ops = ('WriteValue', 'WriteValue1', 'ClearBitMask', 'SetBitMask')
         check_ops = ('CheckAllClear', 'CheckAllSet', 'CheckAnyClear', 'CheckAnySet')
-        if txt_data is None:
-            txt_data = ""
 
         for cmd in self._commands:
             if type(cmd) is CmdWriteData:
-                for (address, value) in cmd:
-                    txt_data += "{0:s} {1:d} 0x{2:08X} 0x{3:08X}\n".format(write_ops[cmd.ops],cmd.bytes,address,value)
+                yield from cmd.iter_txt("{0:s} {1:d} 0x%08X 0x%08X\n".format(write_ops[cmd.ops], cmd.bytes))
 
             elif type(cmd) is CmdCheckData:
-                txt_data += "{0:s} {1:d} 0x{2:08X} 0x{3:08X}".format(check_ops[cmd.ops],cmd.bytes,cmd.address,cmd.mask)
-                txt_data += "{0:d}\n".format(cmd.count) if cmd.count else "\n"
+                txt_data = "{0:s} {1:d} 0x{2:08X} 0x{3:08X}".format(check_ops[cmd.ops],cmd.bytes,cmd.address,cmd.mask)
+                txt_data += " {0:d}\n".format(cmd.count) if cmd.count else "\n"
+                yield txt_data
 
             elif type(cmd) is CmdUnlock:
-                txt_data += "Unlock {0:s}".format(EnumEngine[cmd.engine])
-                cnt = 1
-                for value in cmd:
-                    if cnt > 6:
-                        txt_data += " \\\n"
-                        cnt = 0
-                    txt_data += " 0x{0:08X}".format(value)
-                    cnt += 1
-
-                txt_data += '\n'
+                values = ["Unlock {0:s}".format(EnumEngine[cmd.engine])]
+                for cnt, value in enumerate(cmd, 1):
+                    if cnt % 7 == 0:
+                        values.append("\\\n")
+                    values.append("0x{0:08X}".format(value))
+                yield ' '.join(values) + '\n'
 
             else:
-                txt_data += "Nop\n"
+                yield "Nop\n"
 
             # Split with new line every group of commands
-            txt_data += '\n'
+            yield '\n'
+
+    def write_txt(self, fileobj):
+        """ Write segment as DCD text into file
+        :param fileobj: The file object opened in text mode
+        """
+        fileobj.writelines(self.iter_txt())
 
-        return txt_data
+    def export_txt(self, txt_data=None):
+        """ Export segment as DCD text
+        :param txt_data: The string which the DCD text is appended to (default: None)
+        :return: string
+        """
+        return (txt_data or "") + ''.join(self.iter_txt())
 
     def export(self, padding=False):
         """ Export segment as bytes array
@@ -374,9 +480,7 @@ class SegDCD(BaseSegment):
         """
         data = b''
         if self.enabled:
-            data = self._header.export()
-            for command in self._commands:
-                data += command.export()
+            data = b''.join([self._header.export()] + [command.export() for command in self._commands])
             if padding:
                 data += self._padding_export()
 
@@ -401,13 +505,56 @@ class SegDCD(BaseSegment):
             'Nop': None
         }
 
+        pos = 0
         line_cnt = 0
-        cmd_write = None
+        cmd_line = 0
         cmd_mline = False
+        # The consecutive writes with same ops and bytes are collected and converted into one command at once
+        cmd_write = None
+        write_data = array('I')
         dcd_obj = cls(enabled=True)
 
-        for line in text.split('\n'):
-            line = line.rstrip('\0')
+        while pos < len(text):
+            # fast path for block of write commands on single lines
+            match = None if cmd_mline else _TXT_WRITE_BLOCK.match(text, pos)
+            if match is not None:
+                block = match.group(0)
+                lines = block.count('\n') + (0 if block.endswith('\n') else 1)
+                tokens = (_TXT_COMMENT.sub('', block) if '#' in block else block).split()
+                ops, bytes = cmds[match.group(1)][1], int(match.group(2))
+                if cmd_write is not None and (cmd_write.ops != ops or cmd_write.bytes != bytes):
+                    cmd_write.extend(write_data)
+                    dcd_obj.append(cmd_write)
+                    cmd_write = None
+                if cmd_write is None:
+                    cmd_write = CmdWriteData(bytes, ops)
+                    write_data = array('I')
+
+                values = [None] * (len(tokens) // 2)
+                values[0::2] = tokens[2::4]
+                values[1::2] = tokens[3::4]
+                try:
+                    write_data += _txt_uint32(values)
+                except (ValueError, OverflowError):
+                    # find the line with wrong value
+                    for index, line in enumerate(block.split('\n'), line_cnt + 1):
+                        for value in line.split()[2:4]:
+                            try:
+                                valid = 0 <= int(value, 0) <= 0xFFFFFFFF
+                            except ValueError:
+                                valid = False
+                            if not valid:
+                                raise SyntaxError("Write CMD: wrong value '%s' at line %d" % (value, index))
+
+                pos = match.end()
+                line_cnt += lines
+                continue
+
+            end = text.find('\n', pos)
+            if end < 0:
+                end = len(text)
+            line = text[pos:end].rstrip('\0')
+            pos = end + 1
             # increment line counter
             line_cnt += 1
             # ignore comments
@@ -419,7 +566,8 @@ class SegDCD(BaseSegment):
                 cmd_mline = False
             else:
                 cmd = line.split()
-                if cmd[0] not in cmds:
+                cmd_line = line_cnt
+                if not cmd or cmd[0] not in cmds:
                     continue
             #
             if cmd[-1] == '\\':
@@ -429,20 +577,18 @@ class SegDCD(BaseSegment):
             # ----------------------------
             # Parse command
             # ----------------------------
-            if cmd[0] == 'Nop':
+            if cmds[cmd[0]] is None or cmds[cmd[0]][0] != 'write':
                 if cmd_write is not None:
+                    cmd_write.extend(write_data)
                     dcd_obj.append(cmd_write)
                     cmd_write = None
 
+            if cmd[0] == 'Nop':
                 dcd_obj.append(CmdNop())
 
             elif cmd[0] == 'Unlock':
-                if cmd_write is not None:
-                    dcd_obj.append(cmd_write)
-                    cmd_write = None
-
                 if not EnumEngine.is_valid(cmd[1]):
-                    raise SyntaxError("Unlock CMD: wrong engine parameter at line %d" % (line_cnt - 1))
+                    raise SyntaxError("Unlock CMD: wrong engine parameter at line %d" % cmd_line)
 
                 engine = EnumEngine[cmd[1]]
                 data = [int(value, 0) for value in cmd[2:]]
@@ -450,30 +596,28 @@ class SegDCD(BaseSegment):
 
             elif cmds[cmd[0]][0] == 'write':
                 if len(cmd) < 4:
-                    raise SyntaxError("Write CMD: not enough arguments at line %d" % (line_cnt - 1))
+                    raise SyntaxError("Write CMD: not enough arguments at line %d" % cmd_line)
 
                 ops = cmds[cmd[0]][1]
                 bytes = int(cmd[1])
-                addr = int(cmd[2], 0)
-                value = int(cmd[3], 0)
-
-                if cmd_write is not None:
-                    if cmd_write.ops != ops or cmd_write.bytes != bytes:
-                        dcd_obj.append(cmd_write)
-                        cmd_write = None
+                try:
+                    data = array('I', (int(cmd[2], 0), int(cmd[3], 0)))
+                except (ValueError, OverflowError):
+                    raise SyntaxError("Write CMD: wrong value at line %d" % cmd_line)
 
+                if cmd_write is not None and (cmd_write.ops != ops or cmd_write.bytes != bytes):
+                    cmd_write.extend(write_data)
+                    dcd_obj.append(cmd_write)
+                    cmd_write = None
                 if cmd_write is None:
                     cmd_write = CmdWriteData(bytes, ops)
+                    write_data = array('I')
 
-                cmd_write.append(addr, value)
+                write_data += data
 
             else:
                 if len(cmd) < 4:
-                    raise SyntaxError("Check CMD: not enough arguments at line %d" % (line_cnt - 1))
-
-                if cmd_write is not None:
-                    dcd_obj.append(cmd_write)
-                    cmd_write = None
+                    raise SyntaxError("Check CMD: not enough arguments at line %d" % cmd_line)
 
                 ops = cmds[cmd[0]][1]
                 bytes = int(cmd[1])
@@ -483,6 +627,7 @@ class SegDCD(BaseSegment):
                 dcd_obj.append(CmdCheckData(bytes, ops, addr, mask, count))
 
         if cmd_write is not None:
+            cmd_write.extend(write_data)
             dcd_obj.append(cmd_write)
 
         return dcd_obj
@@ -494,28 +639,16 @@ class SegDCD(BaseSegment):
         :return SegDCD object
         """
         header = Header.parse(data, 0, SegTag.DCD)
-        index = header.size
         obj = cls(header.param, True)
-        while index < header.length:
-            passed = False
-            for cmd_class in cls.CMD_TYPES:
-                try:
-                    cmd_obj = cmd_class.parse(data, index)
-                except UnparsedException:
-                    passed = False
-                    continue
-                obj.append(cmd_obj)
-                index += cmd_obj.size
-                passed = True
-                break
-            if not passed:
-                raise CorruptedException("at position: " + hex(index))
+        _parse_commands(obj, data, header.size, header.length)
         return obj
 
 
 class SegCSF(BaseSegment):
     """ CSF segment """
     CMD_TYPES = (CmdWriteData, CmdCheckData, CmdNop, CmdSet, CmdInitialize, CmdUnlock, CmdInstallKey, CmdAuthData)
+    # command parser selected by the tag in command header
+    CMD_PARSERS = {cmd.TAG: cmd for cmd in CMD_TYPES}
 
     @property
     def header(self):
@@ -562,6 +695,7 @@ class SegCSF(BaseSegment):
     def __setitem__(self, key, value):
         assert type(value) in self.CMD_TYPES
         self._commands[key] = value
+        self._touch()
 
     def __iter__(self):
         return self._commands.__iter__()
@@ -577,16 +711,19 @@ class SegCSF(BaseSegment):
         assert type(cmd) in self.CMD_TYPES
         self._commands.append(cmd)
         self._header.length += cmd.size
+        self._touch()
 
     def pop(self, index):
         assert 0 <= index < len(self._commands)
         cmd = self._commands.pop(index)
         self._header.length -= cmd.size
+        self._touch()
         return cmd
 
     def clear(self):
         self._commands.clear()
         self._header.length = self._header.size
+        self._touch()
 
     def export(self, padding=False):
         """ Export segment as bytes array
@@ -595,9 +732,7 @@ class SegCSF(BaseSegment):
         """
         data = b''
         if self.enabled:
-            data = self.header.export()
-            for command in self._commands:
-                data += command.export()
+            data = b''.join([self.header.export()] + [command.export() for command in self._commands])
             if padding:
                 data += self._padding_export()
 
@@ -610,22 +745,8 @@ class SegCSF(BaseSegment):
         :return SegCSF object
         """
         header = Header.parse(data, offset, SegTag.CSF)
-        index = header.size
         obj = cls(header.param, True)
-        while index < header.length:
-            passed = False
-            for cmd_class in cls.CMD_TYPES:
-                try:
-                    cmd_obj = cmd_class.parse(data, offset + index)
-                except UnparsedException:
-                    passed = False
-                    continue
-                obj.append(cmd_obj)
-                index += cmd_obj.size
-                passed = True
-                break
-            if not passed:
-                raise CorruptedException("at position: " + hex(offset + index))
+        _parse_commands(obj, data, offset + header.size, offset + header.length)
 # TODO: Parse CSF blob
 #        for cmd in obj.commands:
 #            if isinstance(cmd, CmdInstallKey):
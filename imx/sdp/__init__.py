@@ -6,12 +6,17 @@
 
 from .sdp import SdpBase, SdpMX8, SdpMX67, SdpMXRT, SdpGenericError, SdpCommandError, SdpConnectionError, \
                  SdpDataError, SdpSecureError, SdpTimeoutError, supported_devices, scan_usb
+from .engine import TransferEngine, TransferStats
+from .info import DevInfo, get_rom_info, get_dev_info, read_dev_info
 
 __all__ = [
     # Classes
     'SdpMX8',
     'SdpMXRT',
     'SdpMX67',
+    'TransferEngine',
+    'TransferStats',
+    'DevInfo',
     # Errors
     'SdpGenericError',
     'SdpCommandError',
@@ -21,5 +26,8 @@ __all__ = [
     'SdpTimeoutError',
     # methods
     'supported_devices',
-    'scan_usb'
+    'scan_usb',
+    'get_rom_info',
+    'get_dev_info',
+    'read_dev_info'
 ]
@@ -8,11 +8,13 @@
 
 import os
 import sys
+import mmap
 import imx
 import click
-import struct
 import logging
 import traceback
+from time import perf_counter
+from concurrent.futures import ThreadPoolExecutor
 
 
 ########################################################################################################################
@@ -98,148 +100,6 @@ def hexdump(data, saddr=0, compress=True, length=16, sep='.'):
     return '\n'.join(result)
 
 
-########################################################################################################################
-# HAB Parser
-########################################################################################################################
-
-# mx6Codes from Analog Digprog register
-# [mx6DQ, mx6SDL, mx6SL, mx6SX, mx6UL, mx6ULL]
-mx6Codes = [0x63, 0x61, 0x60, 0x62, 0x64, 0x65]
-mx7Codes = [0x72]
-
-# Create list of ROM addresses for reading USB VID/PID
-# Search elf file for a2 15 or c9 1f subtract elf offset (0x38 or 0x60 or 0x34)
-def get_rom_info(dev_name):
-
-    # RELEASE -> The ROM code official releases number
-    # PIDADDR -> The absolute address of USB-PID value in ROM code
-    # VERADDR -> The absolute address of silicon revision value in ROM code
-    ROMVER = {
-        'MX6DQP':  {
-            'RELEASE': ('01.01.01', '01.02.00', '01.03.00', '01.04.01', '01.05.02', '02.00.02'),
-            'PIDADDR': (0x0001108C, 0x00011130, 0x000111E4, 0x000112A0, 0x00011330, 0x000115B8),
-            'VERADDR':  0x00000048,
-            'DEVTYPE':  imx.hab.EnumDevType.IMX6
-        },
-        'MX6SDL':   {
-            'RELEASE': ('00.00.05', '01.01.02', '01.02.02', '01.03.00'),
-            'PIDADDR': (0x00010E28, 0x0001108C, 0x000111AC, 0x000111CC),
-            'VERADDR':  0x00000048,
-            'DEVTYPE':  imx.hab.EnumDevType.IMX6
-        },
-        'MX6SL':   {
-            'RELEASE': ('01.00.01', '01.02.00', '01.03.00'),
-            'PIDADDR': (0x0000E0B0, 0x0000E210, 0x0000E2C2),
-            'VERADDR':  0x00000048,
-            'DEVTYPE':  imx.hab.EnumDevType.IMX6
-        },
-        'MX6SX':  {
-            'RELEASE': ('01.00.02', '01.01.01'),
-            'PIDADDR': (0x00012398, 0x00013124),
-            'VERADDR':  0x00000080,
-            'DEVTYPE':  imx.hab.EnumDevType.IMX6
-        },
-        'MX6UL':  {
-            'RELEASE': ('01.00.00', '01.01.00'),
-            'PIDADDR': (0x000129C4, 0x00012A04),
-            'VERADDR':  0x00000080,
-            'DEVTYPE':  imx.hab.EnumDevType.IMX6
-        },
-        'MX6ULL': {
-            'RELEASE': ('01.00.01',),
-            'PIDADDR': (0x00010E84,),
-            'VERADDR':  0x00000080,
-            'DEVTYPE':  imx.hab.EnumDevType.IMX6
-        },
-        'MX7SD':   {
-            'RELEASE': ('01.00.05', '01.01.01'),
-            'PIDADDR': (0x000130A0, 0x000130A0),
-            'VERADDR':  0x00000080,
-            'DEVTYPE':  imx.hab.EnumDevType.IMX7
-        },
-        'MX6SLL': {
-            'RELEASE': ('01.00.00',),
-            'PIDADDR': (0x0000F884,),
-            'VERADDR':  0x00000080,
-            'DEVTYPE':  imx.hab.EnumDevType.IMX6
-        },
-        'VIBRID': {
-            'RELEASE': ('01.00.10',),
-            'PIDADDR': (0x0000F884,),
-            'VERADDR':  0x00000048,
-            'DEVTYPE':  imx.hab.EnumDevType.IMX6
-        },
-    }
-
-    retval = None
-
-    if dev_name in ROMVER:
-        retval = ROMVER[dev_name]
-
-    return retval
-
-
-def get_dev_info(dev_name, rom_ver):
-    # Create List of details for each device
-    # 0 - Analog Digprog Address
-    # 1 - SBMR1 Address
-    # 2 - SBMR2 Address
-    # 3 - Persist Reg Address
-    # 4 - WDOG Fuse Address
-    # 5 - Free Space Address
-    # 6 - Log Buffer Address
-
-    if dev_name == 'MX6DQP':
-        if rom_ver >= 0x20:
-            desc = 'iMX6 Dual/Quad Plus'
-            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00902190)
-        elif rom_ver < 0x15:
-            desc = 'iMX6 Dual/Quad'
-            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00902190)
-        else:
-            desc = 'iMX6 Dual/Quad'
-            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00902190)
-    elif dev_name == 'MX6SDL':
-        if rom_ver > 0x11:
-            desc = 'iMX6 Solo/DualLite'
-            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901AB8)
-        else:
-            desc = 'iMX6 Solo/DualLite'
-            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901AB8)
-    elif dev_name == 'MX6SL':
-        desc     = 'iMX6 SoloLite'
-        regs     = (0x020C8280, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901948)
-    elif dev_name == 'MX6SX':
-        desc     = 'iMX6 SoloX'
-        if rom_ver < 0x11:
-            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901BE4)
-        else:
-            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901CD8)
-    elif dev_name == 'MX6UL':
-        desc     = 'iMX6 UltraLite'
-        regs     = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901D14)
-    elif dev_name == 'MX6ULL':
-        desc     = 'iMX6 UltraLiteLite'
-        regs     = (0x020C8280, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901CF4)
-    elif dev_name == 'MX7SD':
-        desc     = 'iMX7 Solo/Dual'
-        if rom_ver < 0x11:
-            regs = (0x30360800, 0x30390058, 0x30390070, 0x30390098, 0x30350480, 0x00910000, 0x00909150)
-        else:
-            regs = (0x30360800, 0x30390058, 0x30390070, 0x30390098, 0x30350480, 0x00910000, 0x0090915C)
-    elif dev_name == 'MX6SLL':
-        desc = 'iMX6 SoloLiteLite'
-        regs = None
-    elif dev_name == 'VIBRID':
-        desc = 'VFxxx Controller'
-        regs = None
-    else:
-        desc = None
-        regs = None
-
-    return desc, regs
-
-
 ########################################################################################################################
 # New argument types
 ########################################################################################################################
@@ -285,10 +145,34 @@ DESCRIP = (
 
 
 # helper method
-def scan_usb(device_name):
+def import_server():
+    """ Import imx.sdp.server module on demand, it requires Unix domain sockets """
+    try:
+        import imx.sdp.server
+    except ImportError as e:
+        click.echo("\n - ERROR: %s" % str(e))
+        sys.exit(ERROR_CODE)
+    return imx.sdp.server
+
+
+# helper method
+def find_devices(device_name, server=None, rescan=False):
+    """ Scan for connected devices, use the sessions of "imxsd serve" if server socket is specified. The server
+        enumerates the devices again (opens only the new ones) if rescan is True or no session matches. """
+    if server is None:
+        return imx.sdp.scan_usb(device_name)
+    try:
+        return import_server().SdpClient(server).scan(device_name, rescan)
+    except imx.sdp.SdpGenericError as e:
+        click.echo("\n - ERROR: %s" % str(e))
+        sys.exit(ERROR_CODE)
+
+
+# helper method
+def scan_usb(device_name, server=None, rescan=False):
     # Scan for connected devices
 
-    fsls = imx.sdp.scan_usb(device_name)
+    fsls = find_devices(device_name, server, rescan)
 
     if fsls:
         index = 0
@@ -314,10 +198,16 @@ def scan_usb(device_name):
 
 @click.group(context_settings=dict(help_option_names=['-?', '--help']), help=DESCRIP)
 @click.option('-t', '--target', type=click.STRING, default=None, help='Select target MX6SX, MX6UL, ... [optional]')
-@click.option('-d', '--debug', type=click.IntRange(0, 2, True), default=0, help="Debug level (0-off, 1-info, 2-debug)")
+@click.option('-d', '--debug', type=click.IntRange(0, 2, clamp=True), default=0, help="Debug level (0-off, 1-info, 2-debug)")
+@click.option('--cache', is_flag=True, default=False, envvar='IMX_CACHE',
+              help="Use the on-disk cache of parsed *.imx images [optional]")
+@click.option('-S', '--server', type=click.Path(), default=None, envvar='IMXSD_SERVER',
+              help="Use devices opened by \"imxsd serve\" at this socket [optional]")
+@click.option('-R', '--rescan', is_flag=True, default=False,
+              help="Let \"imxsd serve\" look for newly connected devices [optional]")
 @click.version_option(VERSION, '-v', '--version')
 @click.pass_context
-def cli(ctx, target, debug):
+def cli(ctx, target, debug, cache, server, rescan):
 
     if debug > 0:
         FORMAT = "[%(asctime)s.%(msecs)03d %(levelname)-5s] %(message)s"
@@ -326,6 +216,9 @@ def cli(ctx, target, debug):
 
     ctx.obj['DEBUG']  = debug
     ctx.obj['TARGET'] = target
+    ctx.obj['CACHE']  = imx.img.ImageCache() if cache else None
+    ctx.obj['SERVER'] = server
+    ctx.obj['RESCAN'] = rescan
 
 
 @cli.command(short_help="Read i.MX device info")
@@ -335,51 +228,14 @@ def info(ctx):
 
     error = False
 
-    def read_memory_32(addr):
-        val = struct.unpack_from('I', flasher.read(addr, 4))
-        return val[0]
-
-    def read_rom_release(rom_info, pid):
-        pidaddr = rom_info['PIDADDR']
-        release = rom_info['RELEASE']
-        for i in range(len(pidaddr)):
-            rpid = read_memory_32(pidaddr[i]) & 0xFFFF
-            if rpid == pid:
-                return release[i]
-        return None
-
     # Create Flasher instance
-    flasher = scan_usb(ctx.obj['TARGET'])
+    flasher = scan_usb(ctx.obj['TARGET'], ctx.obj['SERVER'], ctx.obj['RESCAN'])
 
     try:
         # Connect IMX Device
         flasher.open()
-        # Get Connected Device Name
-        dev_name = flasher.device_name
-        if dev_name is None:
-            raise Exception('Not Connected or Unsupported Device')
-        # Get Connected Device PID Value
-        dev_pid  = flasher.usbd.pid
-        # Get Device and ROM Specific Data
-        rom_info = get_rom_info(dev_name)
-        if rom_info is None:
-            raise Exception('Unknown Device Info')
-        # Get ROM Release Number
-        rom_release = read_rom_release(rom_info, dev_pid)
-        if rom_release is None:
-            raise Exception('Unknown Device Variant')
-        # Read ROM Version
-        rom_version = read_memory_32(rom_info['VERADDR'])
-        # Get Device description and addresses to specific regs
-        desc, regs = get_dev_info(dev_name, rom_version)
-        # Read values of specific regs
-        digprog_val = read_memory_32(regs[0])
-        sbmr1_val   = read_memory_32(regs[1])
-        sbmr2_val   = read_memory_32(regs[2])
-        persist_val = read_memory_32(regs[3])
-        wdog_val    = read_memory_32(regs[4])
-        # Read HAB Log Data
-        log_data = flasher.read(regs[6], 64 * 4)
+        # Read all device info at once
+        dev_info = imx.sdp.read_dev_info(flasher)
     except Exception as e:
         error = True
         if ctx.obj['DEBUG']:
@@ -387,56 +243,13 @@ def info(ctx):
         else:
             error_msg = ' - ERROR: %s' % str(e)
     else:
-        bmodList = {
-            0: "Boot from Fuses",
-            1: "Serial Downloader",
-            2: "Boot from GPIO/Fuses",
-            3: "Reserved"
-        }
-
-        bmodName = bmodList[(sbmr2_val >> 24 ) & 0x3]
-
-        if rom_info['DEVTYPE'] == 7:
-            wdogBit = wdog_val & 0x4
-            mxRevMajor = (digprog_val >> 4 & 0xf)
-            mxRevMinor = digprog_val & 0xf
-        else:
-            wdogBit = wdog_val & 0x00200000
-            mxRevMajor = (digprog_val >> 8 & 0xff) + 1
-            mxRevMinor = digprog_val & 0xff
-
         if ctx.obj['DEBUG']: click.echo()
 
         click.echo(" ---------------------------------------------------------")
         click.echo(" Connected Device Info")
         click.echo(" ---------------------------------------------------------")
         click.echo()
-        click.secho(" Device:        %s" % (desc))
-        click.secho(" Silicon Rev:   %d.%d" % (mxRevMajor, mxRevMinor))
-        click.echo()
-        click.secho(" iROM Release:  %s" % rom_release)
-        click.secho(" iROM Version:  0x%02x" % (rom_version & 0xff))
-        click.echo()
-        click.secho(" WDOG State:    %s" % ('Enabled' if wdogBit > 0 else 'Disabled'))
-        click.echo()
-        click.secho(" SBMR1: 0x%08x" % sbmr1_val)
-        click.secho("   BOOT_CFG_1  = 0x%02x" % (sbmr1_val & 0xff))
-        click.secho("   BOOT_CFG_2  = 0x%02x" % ((sbmr1_val >> 8) & 0xff))
-        click.secho("   BOOT_CFG_3  = 0x%02x" % ((sbmr1_val >> 16) & 0xff))
-        click.secho("   BOOT_CFG_4  = 0x%02x" % ((sbmr1_val >> 24) & 0xff))
-        click.echo()
-        click.secho(" SBMR2: 0x%08x" % sbmr2_val)
-        click.secho("   BMOD        = %1d%1d\t%s" % (((sbmr2_val >> 25) & 0x1),
-                                                     ((sbmr2_val >> 24) & 0x1), bmodName))
-        click.secho("   BT_FUSE_SEL = %1d" % ((sbmr2_val >> 4) & 0x1))
-        click.secho("   DIR_BT_DIS  = %1d" % ((sbmr2_val >> 3) & 0x1))
-        click.secho("   SEC_CONFIG  = %1d%1d" % (((sbmr2_val >> 1) & 0x1), sbmr2_val & 0x1))
-        click.echo()
-        click.secho(" PersistReg Val: 0x%08x" % persist_val)
-        click.secho(" ANALOG DIGPROG: 0x%08x" % digprog_val)
-        click.echo()
-        click.echo(" HAB Log Info --------------------------------------------\n")
-        click.echo(imx.hab.parse_hab_log(rom_info['DEVTYPE'], log_data))
+        click.echo(dev_info.info())
         click.echo(" ---------------------------------------------------------")
 
     # Disconnect IMX Device
@@ -461,7 +274,7 @@ def read(ctx, address, length, size, compress, file):
 
     error = False
     # Create Flasher instance
-    flasher = scan_usb(ctx.obj['TARGET'])
+    flasher = scan_usb(ctx.obj['TARGET'], ctx.obj['SERVER'], ctx.obj['RESCAN'])
 
     try:
         # Connect IMX Device
@@ -509,7 +322,7 @@ def rreg(ctx, address, count, size, format):
     reg_size = int(size) // 8
 
     # Create Flasher instance
-    flasher = scan_usb(ctx.obj['TARGET'])
+    flasher = scan_usb(ctx.obj['TARGET'], ctx.obj['SERVER'], ctx.obj['RESCAN'])
 
     try:
         # Connect IMX Device
@@ -554,7 +367,7 @@ def rreg(ctx, address, count, size, format):
 @click.argument('address', nargs=1, type=UINT)
 @click.argument('value', nargs=1, type=UINT)
 @click.option('-s', '--size', type=click.Choice(['8', '16', '32']), default='32', show_default=True, help='Access Size')
-@click.option('-b', '--bytes', type=click.IntRange(1, 4, True), default=4, show_default=True, help='Count of Bytes')
+@click.option('-b', '--bytes', type=click.IntRange(1, 4, clamp=True), default=4, show_default=True, help='Count of Bytes')
 @click.pass_context
 def wreg(ctx, address, value, size, bytes):
     ''' Write value into register or memory at specified address in connected IMX device.
@@ -564,7 +377,7 @@ def wreg(ctx, address, value, size, bytes):
     error = False
 
     # Create Flasher instance
-    flasher = scan_usb(ctx.obj['TARGET'])
+    flasher = scan_usb(ctx.obj['TARGET'], ctx.obj['SERVER'], ctx.obj['RESCAN'])
 
     try:
         # Connect IMX Device
@@ -589,6 +402,62 @@ def wreg(ctx, address, value, size, bytes):
         sys.exit(ERROR_CODE)
 
 
+# helper method
+def load_image(file, addr, offset, cache=None):
+    """ Load image file as memory mapped buffer, so the image is not copied into RAM
+    :param cache: The ImageCache object for *.imx parsing or None
+    :return Tuple [data, img object (*.imx only) or None, start address]
+    """
+    img = None
+    with open(file, 'rb') as f:
+        # The empty file can't be mapped, it's sent as zero length data
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(f.fileno()).st_size else b''
+        if file.lower().endswith('.imx'):
+            # The image is parsed from mapped buffer, so the APP data stay a view of it
+            img = cache.parse(file, buffer=data) if cache is not None else imx.img.parse(data)
+            if addr is None:
+                addr = img.address + img.offset
+        else:
+            if addr is None:
+                raise Exception('Argument: -a/--addr must be specified !')
+            if offset > 0:
+                data = memoryview(data)[offset:]
+
+    return data, img, addr
+
+
+# helper method
+def write_image(flasher, file, data, img, addr, ocram, init, run, skipdcd, echo=click.echo):
+    """ Write loaded image into connected i.MX device """
+    if img is not None and init:
+        if ocram == 0:
+            raise Exception('Argument: -m/--ocram must be specified !')
+
+        echo(' - Init DDR')
+        dcd = img.dcd.export()
+        flasher.write_dcd(ocram, dcd)
+
+        if flasher.device_name in ('MX6UL', 'MX6ULL', 'MX6SLL', 'MX7SD', 'MX7ULP'):
+            skipdcd = True
+
+    echo(" - Writing %s, please wait !" % file)
+    # Write data from img into device
+    flasher.write_file(addr, data)
+    stats = flasher.transfer_stats
+    # Skip DCD header if set
+    if img is not None and skipdcd:
+        echo(' - Skip DCD content')
+        flasher.skip_dcd()
+    # Run loaded uboot.imx img
+    if img is not None and run:
+        if flasher.device_name in imx.sdp.SdpMXRT.DEVICES:
+            addr = img.address
+        echo(' - Jump to ADDR: 0x%08X and RUN' % addr)
+        flasher.jump_and_run(addr)
+
+    return stats
+
+
 @cli.command(short_help="Write image into i.MX device and RUN it")
 @click.argument('file', nargs=1, type=click.Path(exists=True))
 @click.option('-a', '--addr', type=UINT, default=None, help='Start Address (required for *.bin)')
@@ -597,64 +466,26 @@ def wreg(ctx, address, value, size, bytes):
 @click.option('-i/','--init/', is_flag=True, default=False, help='Init DDR from *.imx img')
 @click.option('-r/','--run/', is_flag=True, default=False, help='Run loaded *.imx img')
 @click.option('-s/','--skipdcd/', is_flag=True, default=False, help='Skip DCD Header from *.imx img')
+@click.option('-x/','--all/', 'all_devices', is_flag=True, default=False, help='Write into all connected devices')
 @click.pass_context
-def wimg(ctx, addr, offset, ocram, init, run, skipdcd, file):
+def wimg(ctx, addr, offset, ocram, init, run, skipdcd, all_devices, file):
     ''' Write image file (uboot.imx, uImage, ...) into i.MX device and RUN it '''
 
+    if all_devices:
+        wimg_all(ctx, addr, offset, ocram, init, run, skipdcd, file)
+        return
+
     error = False
 
     # Create Flasher instance
-    flasher = scan_usb(ctx.obj['TARGET'])
+    flasher = scan_usb(ctx.obj['TARGET'], ctx.obj['SERVER'], ctx.obj['RESCAN'])
 
     try:
         # Connect IMX Device
         flasher.open()
         # Load img
-        if file.lower().endswith('.imx'):
-            data = bytearray(os.path.getsize(file))
-            with open(file, 'rb') as f:
-                f.readinto(data)
-
-            img = imx.img.parse(data)
-
-            if addr is None:
-                addr = img.address + img.offset
-
-            if init:
-                if ocram == 0:
-                    raise Exception('Argument: -m/--ocram must be specified !')
-
-                click.echo(' - Init DDR')
-                dcd = img.dcd.export()
-                flasher.write_dcd(ocram, dcd)
-
-                if flasher.device_name in ('MX6UL', 'MX6ULL', 'MX6SLL', 'MX7SD', 'MX7ULP'):
-                    skipdcd = True
-        else:
-            if addr is None:
-                raise Exception('Argument: -a/--addr must be specified !')
-
-            with open(file, "rb") as f:
-                if offset > 0:
-                    f.seek(offset)
-                data = f.read()
-                f.close()
-
-        click.secho(" - Writing %s, please wait !" % file)
-        if ctx.obj['DEBUG']: click.echo()
-        # Write data from img into device
-        flasher.write_file(addr, data)
-        # Skip DCD header if set
-        if file.lower().endswith('.imx') and skipdcd:
-            click.echo(' - Skip DCD content')
-            flasher.skip_dcd()
-            if ctx.obj['DEBUG']: click.echo()
-        # Run loaded uboot.imx img
-        if file.lower().endswith('.imx') and run:
-            if isinstance(flasher, imx.sdp.SdpMXRT):
-                addr = img.address
-            click.secho(' - Jump to ADDR: 0x%08X and RUN' % addr)
-            flasher.jump_and_run(addr)
+        data, img, addr = load_image(file, addr, offset, ctx.obj.get('CACHE'))
+        write_image(flasher, file, data, img, addr, ocram, init, run, skipdcd)
 
     except Exception as e:
         error = True
@@ -674,6 +505,48 @@ def wimg(ctx, addr, offset, ocram, init, run, skipdcd, file):
         sys.exit(ERROR_CODE)
 
 
+def wimg_all(ctx, addr, offset, ocram, init, run, skipdcd, file):
+    """ Write image into all connected devices in parallel (one worker per device) """
+
+    def worker(flasher):
+        start = perf_counter()
+        try:
+            flasher.open()
+            stats = write_image(flasher, file, data, img, addr, ocram, init, run, skipdcd, echo=lambda msg: None)
+            result = ("OK", stats.throughput / 1e6 if stats else 0.0)
+        except Exception as e:
+            result = ("ERROR: %s" % str(e), 0.0)
+        finally:
+            flasher.close()
+        return result + (perf_counter() - start,)
+
+    try:
+        data, img, addr = load_image(file, addr, offset, ctx.obj.get('CACHE'))
+    except Exception as e:
+        click.echo(' - ERROR: %s' % str(e))
+        sys.exit(ERROR_CODE)
+
+    # The server looks for newly connected devices every time, so no board is skipped
+    flashers = find_devices(ctx.obj['TARGET'], ctx.obj['SERVER'], True)
+    if not flashers:
+        click.echo("\n - No i.MX board detected !")
+        sys.exit(ERROR_CODE)
+
+    click.secho("\n - Writing %s into %d devices, please wait !\n" % (file, len(flashers)))
+    with ThreadPoolExecutor(max_workers=len(flashers)) as executor:
+        results = list(executor.map(worker, flashers))
+
+    click.echo(" {0:<3s} {1:<36s} {2:>8s} {3:>9s}  {4:s}".format("#", "DEVICE", "TIME [s]", "MB/s", "RESULT"))
+    click.echo(" " + "-" * 78)
+    for i, (flasher, (result, throughput, elapsed)) in enumerate(zip(flashers, results)):
+        click.echo(" {0:<3d} {1:<36s} {2:8.3f} {3:9.2f}  {4:s}".format(i, flasher.usbd.info, elapsed, throughput,
+                                                                        result))
+    failed = sum(1 for result in results if result[0] != "OK")
+    click.echo("\n - Done: %d passed, %d failed" % (len(results) - failed, failed))
+    if failed:
+        sys.exit(ERROR_CODE)
+
+
 @cli.command(short_help="Write DCD blob into i.MX device")
 @click.argument('address', nargs=1, type=UINT)
 @click.argument('file', nargs=1, type=click.Path(exists=True))
@@ -685,11 +558,13 @@ def wdcd(ctx, address, file, offset):
     error = False
 
     if file.lower().endswith('.imx'):
-        raw_data = bytearray(os.path.getsize(file))
-        with open(file, 'rb') as f:
-            f.readinto(raw_data)
-
-        img = imx.img.parse(raw_data)
+        if ctx.obj.get('CACHE') is not None:
+            img = ctx.obj['CACHE'].parse(file)
+        else:
+            raw_data = bytearray(os.path.getsize(file))
+            with open(file, 'rb') as f:
+                f.readinto(raw_data)
+            img = imx.img.parse(raw_data)
         data = img.dcd.export()
 
     else:
@@ -700,7 +575,7 @@ def wdcd(ctx, address, file, offset):
             f.close()
 
     # Create Flasher instance
-    flasher = scan_usb(ctx.obj['TARGET'])
+    flasher = scan_usb(ctx.obj['TARGET'], ctx.obj['SERVER'], ctx.obj['RESCAN'])
 
     try:
         # Connect i.MX Device
@@ -748,7 +623,7 @@ def wcsf(ctx, address, file, offset):
             f.close()
 
     # Create Flasher instance
-    flasher = scan_usb(ctx.obj['TARGET'])
+    flasher = scan_usb(ctx.obj['TARGET'], ctx.obj['SERVER'], ctx.obj['RESCAN'])
 
     try:
         # Connect IMX Device
@@ -783,7 +658,7 @@ def jump(ctx, address):
     error = False
 
     # Create Flasher instance
-    flasher = scan_usb(ctx.obj['TARGET'])
+    flasher = scan_usb(ctx.obj['TARGET'], ctx.obj['SERVER'], ctx.obj['RESCAN'])
 
     try:
         # Connect IMX Device
@@ -816,7 +691,7 @@ def stat(ctx):
     error = False
 
     # Create Flasher instance
-    flasher = scan_usb(ctx.obj['TARGET'])
+    flasher = scan_usb(ctx.obj['TARGET'], ctx.obj['SERVER'], ctx.obj['RESCAN'])
 
     try:
         # Connect IMX Device
@@ -842,6 +717,40 @@ def stat(ctx):
         sys.exit(ERROR_CODE)
 
 
+@cli.command(short_help="Hold i.MX devices opened for other imxsd calls")
+@click.option('-s', '--socket', 'path', type=click.Path(), default=None,
+              help="Socket path [default: $XDG_RUNTIME_DIR/imxsd.sock or /tmp/imxsd-<uid>.sock]")
+@click.option('-k/', '--stop/', is_flag=True, default=False, help="Stop running server")
+@click.pass_context
+def serve(ctx, path, stop):
+    ''' Enumerate and open connected i.MX devices once and serve them over local socket, so the sequence of
+        imxsd commands called with -S/--server (or IMXSD_SERVER env variable) skips the USB enumeration.
+    '''
+
+    sdp_server = import_server()
+    if path is None:
+        path = sdp_server.default_socket_path()
+
+    try:
+        if stop:
+            sdp_server.SdpClient(path).shutdown()
+            click.secho(" - Server at %s stopped" % path)
+            return
+        server = sdp_server.SdpServer(path)
+    except Exception as e:
+        click.echo(' - ERROR: %s' % str(e))
+        sys.exit(ERROR_CODE)
+
+    click.secho(" - Serving at %s, stop it by CTRL+C or: imxsd serve --stop" % path)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    click.secho(" - Done")
+
+
 def main():
     cli(obj={})
 
@@ -0,0 +1,118 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import queue
+import threading
+from time import perf_counter
+
+from .misc import iter_chunks
+
+
+########################################################################################################################
+# Transfer Statistics
+########################################################################################################################
+
+class TransferStats(object):
+    """ Statistics of one data transfer """
+
+    @property
+    def throughput(self):
+        """ Effective throughput in Bytes/s """
+        return self.length / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __init__(self, length=0, packets=0, elapsed=0.0):
+        """ Initialize TransferStats object
+        :param length: Count of transferred bytes
+        :param packets: Count of transferred USB reports
+        :param elapsed: Transfer time in seconds
+        """
+        self.length = length
+        self.packets = packets
+        self.elapsed = elapsed
+
+    def __str__(self):
+        return self.info()
+
+    def __repr__(self):
+        return self.info()
+
+    def info(self):
+        return "{0:d} Bytes in {1:d} packets, {2:.3f} s ({3:.2f} MB/s)".format(
+            self.length, self.packets, self.elapsed, self.throughput / 1e6)
+
+
+########################################################################################################################
+# Pipelined Transfer Engine
+########################################################################################################################
+
+class TransferEngine(object):
+    """ Pipelined USB transfer engine
+
+    The producer thread packs the reports into a pool of `depth` buffers while the caller thread (consumer)
+    submits the already packed reports into USB device, so the bus is not waiting for the host side.
+    """
+
+    def __init__(self, depth=4):
+        """ Initialize TransferEngine object
+        :param depth: Count of reports prepared ahead (queue depth)
+        """
+        assert depth > 0, "Queue depth must be greater than zero !"
+        self.depth = depth
+        self.stats = None
+
+    def send(self, usbd, report_id, report_len, data, handler=None):
+        """ Send data to USB device
+        :param usbd: The RawHid object
+        :param report_id: The Report ID of data reports
+        :param report_len: The length of data reports
+        :param data: The data as any bytes-like object
+        :param handler: The callback called with data offset of every submitted report
+        :return TransferStats object
+        """
+        pool = queue.Queue()
+        ready = queue.Queue()
+        # The count of buffers in pool is limiting the queue depth
+        for _ in range(self.depth):
+            pool.put(bytearray(report_len + 1))
+
+        def producer():
+            try:
+                for chunk in iter_chunks(data, report_len):
+                    buffer = pool.get()
+                    if buffer is None:
+                        return
+                    usbd._pack_report(buffer, report_id, chunk)
+                    ready.put((buffer, len(chunk)))
+                ready.put(None)
+            except Exception as e:
+                ready.put(e)
+
+        stats = TransferStats()
+        thread = threading.Thread(target=producer, name="sdp-producer", daemon=True)
+        start = perf_counter()
+        thread.start()
+        try:
+            while True:
+                item = ready.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                buffer, length = item
+                usbd.write_raw(report_id, buffer)
+                pool.put(buffer)
+                if handler is not None:
+                    handler(stats.length)
+                stats.length += length
+                stats.packets += 1
+        finally:
+            # Wake up the producer if still waiting for free buffer
+            pool.put(None)
+            thread.join()
+            stats.elapsed = perf_counter() - start
+            self.stats = stats
+
+        return stats
@@ -0,0 +1,316 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import struct
+import logging
+
+from ..hab import EnumDevType, decode_hab_log, parse_hab_log
+
+logger = logging.getLogger(__name__)
+
+
+########################################################################################################################
+# Device and ROM Tables
+########################################################################################################################
+
+# Size of HAB log buffer in Bytes
+HAB_LOG_SIZE = 64 * 4
+
+# Max count of unused bytes between two registers read by single READ command (reading of 0x100 bytes takes about
+# the same time as one round trip: command, secure info and data reports)
+MAX_GAP = 0x100
+
+# mx6Codes from Analog Digprog register
+# [mx6DQ, mx6SDL, mx6SL, mx6SX, mx6UL, mx6ULL]
+mx6Codes = [0x63, 0x61, 0x60, 0x62, 0x64, 0x65]
+mx7Codes = [0x72]
+
+# Create list of ROM addresses for reading USB VID/PID
+# Search elf file for a2 15 or c9 1f subtract elf offset (0x38 or 0x60 or 0x34)
+# RELEASE -> The ROM code official releases number
+# PIDADDR -> The absolute address of USB-PID value in ROM code
+# VERADDR -> The absolute address of silicon revision value in ROM code
+ROM_INFO = {
+    'MX6DQP':  {
+        'RELEASE': ('01.01.01', '01.02.00', '01.03.00', '01.04.01', '01.05.02', '02.00.02'),
+        'PIDADDR': (0x0001108C, 0x00011130, 0x000111E4, 0x000112A0, 0x00011330, 0x000115B8),
+        'VERADDR':  0x00000048,
+        'DEVTYPE':  EnumDevType.IMX6
+    },
+    'MX6SDL':   {
+        'RELEASE': ('00.00.05', '01.01.02', '01.02.02', '01.03.00'),
+        'PIDADDR': (0x00010E28, 0x0001108C, 0x000111AC, 0x000111CC),
+        'VERADDR':  0x00000048,
+        'DEVTYPE':  EnumDevType.IMX6
+    },
+    'MX6SL':   {
+        'RELEASE': ('01.00.01', '01.02.00', '01.03.00'),
+        'PIDADDR': (0x0000E0B0, 0x0000E210, 0x0000E2C2),
+        'VERADDR':  0x00000048,
+        'DEVTYPE':  EnumDevType.IMX6
+    },
+    'MX6SX':  {
+        'RELEASE': ('01.00.02', '01.01.01'),
+        'PIDADDR': (0x00012398, 0x00013124),
+        'VERADDR':  0x00000080,
+        'DEVTYPE':  EnumDevType.IMX6
+    },
+    'MX6UL':  {
+        'RELEASE': ('01.00.00', '01.01.00'),
+        'PIDADDR': (0x000129C4, 0x00012A04),
+        'VERADDR':  0x00000080,
+        'DEVTYPE':  EnumDevType.IMX6
+    },
+    'MX6ULL': {
+        'RELEASE': ('01.00.01',),
+        'PIDADDR': (0x00010E84,),
+        'VERADDR':  0x00000080,
+        'DEVTYPE':  EnumDevType.IMX6
+    },
+    'MX7SD':   {
+        'RELEASE': ('01.00.05', '01.01.01'),
+        'PIDADDR': (0x000130A0, 0x000130A0),
+        'VERADDR':  0x00000080,
+        'DEVTYPE':  EnumDevType.IMX7
+    },
+    'MX6SLL': {
+        'RELEASE': ('01.00.00',),
+        'PIDADDR': (0x0000F884,),
+        'VERADDR':  0x00000080,
+        'DEVTYPE':  EnumDevType.IMX6
+    },
+    'VIBRID': {
+        'RELEASE': ('01.00.10',),
+        'PIDADDR': (0x0000F884,),
+        'VERADDR':  0x00000048,
+        'DEVTYPE':  EnumDevType.IMX6
+    },
+}
+
+
+def get_rom_info(dev_name):
+    return ROM_INFO.get(dev_name)
+
+
+def get_dev_info(dev_name, rom_ver):
+    # Create List of details for each device
+    # 0 - Analog Digprog Address
+    # 1 - SBMR1 Address
+    # 2 - SBMR2 Address
+    # 3 - Persist Reg Address
+    # 4 - WDOG Fuse Address
+    # 5 - Free Space Address
+    # 6 - Log Buffer Address
+
+    if dev_name == 'MX6DQP':
+        if rom_ver >= 0x20:
+            desc = 'iMX6 Dual/Quad Plus'
+            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00902190)
+        elif rom_ver < 0x15:
+            desc = 'iMX6 Dual/Quad'
+            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00902190)
+        else:
+            desc = 'iMX6 Dual/Quad'
+            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00902190)
+    elif dev_name == 'MX6SDL':
+        if rom_ver > 0x11:
+            desc = 'iMX6 Solo/DualLite'
+            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901AB8)
+        else:
+            desc = 'iMX6 Solo/DualLite'
+            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901AB8)
+    elif dev_name == 'MX6SL':
+        desc     = 'iMX6 SoloLite'
+        regs     = (0x020C8280, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901948)
+    elif dev_name == 'MX6SX':
+        desc     = 'iMX6 SoloX'
+        if rom_ver < 0x11:
+            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901BE4)
+        else:
+            regs = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901CD8)
+    elif dev_name == 'MX6UL':
+        desc     = 'iMX6 UltraLite'
+        regs     = (0x020C8260, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901D14)
+    elif dev_name == 'MX6ULL':
+        desc     = 'iMX6 UltraLiteLite'
+        regs     = (0x020C8280, 0x020D8004, 0x020D801C, 0x020D8044, 0x021BC460, 0x00907000, 0x00901CF4)
+    elif dev_name == 'MX7SD':
+        desc     = 'iMX7 Solo/Dual'
+        if rom_ver < 0x11:
+            regs = (0x30360800, 0x30390058, 0x30390070, 0x30390098, 0x30350480, 0x00910000, 0x00909150)
+        else:
+            regs = (0x30360800, 0x30390058, 0x30390070, 0x30390098, 0x30350480, 0x00910000, 0x0090915C)
+    elif dev_name == 'MX6SLL':
+        desc = 'iMX6 SoloLiteLite'
+        regs = None
+    elif dev_name == 'VIBRID':
+        desc = 'VFxxx Controller'
+        regs = None
+    else:
+        desc = None
+        regs = None
+
+    return desc, regs
+
+
+# ROM versions which select all variants in get_dev_info()
+_ROM_VERSIONS = (0x10, 0x11, 0x12, 0x15, 0x20)
+
+
+########################################################################################################################
+# Device Info
+########################################################################################################################
+
+class DevInfo(object):
+    """ Info about connected i.MX device, collected by read_dev_info() """
+
+    BOOT_MODES = {
+        0: "Boot from Fuses",
+        1: "Serial Downloader",
+        2: "Boot from GPIO/Fuses",
+        3: "Reserved"
+    }
+
+    @property
+    def silicon_rev(self):
+        """ Silicon revision as Tuple [major, minor] """
+        if self.dev_type == EnumDevType.IMX7:
+            return (self.digprog >> 4) & 0xF, self.digprog & 0xF
+        return ((self.digprog >> 8) & 0xFF) + 1, self.digprog & 0xFF
+
+    @property
+    def wdog_enabled(self):
+        return (self.wdog & (0x4 if self.dev_type == EnumDevType.IMX7 else 0x00200000)) > 0
+
+    @property
+    def boot_mode(self):
+        """ BMOD value from SBMR2 """
+        return (self.sbmr2 >> 24) & 0x3
+
+    @property
+    def hab_events(self):
+        """ Decoded HAB log as list of HabEvent objects """
+        return decode_hab_log(self.dev_type, self.hab_log)
+
+    def __init__(self, name, desc, dev_type, rom_release, rom_version, digprog, sbmr1, sbmr2, persist, wdog, hab_log):
+        """ Initialize DevInfo object
+        :param name: The device name (MX6UL, MX7SD, ...)
+        :param desc: The device description
+        :param dev_type: The device type (EnumDevType)
+        :param rom_release: The ROM code release number
+        :param rom_version: The ROM version word
+        :param digprog: The value of ANALOG DIGPROG register
+        :param sbmr1: The value of SBMR1 register
+        :param sbmr2: The value of SBMR2 register
+        :param persist: The value of persistent register
+        :param wdog: The value of WDOG fuse word
+        :param hab_log: The raw HAB log buffer
+        """
+        self.name = name
+        self.desc = desc
+        self.dev_type = dev_type
+        self.rom_release = rom_release
+        self.rom_version = rom_version
+        self.digprog = digprog
+        self.sbmr1 = sbmr1
+        self.sbmr2 = sbmr2
+        self.persist = persist
+        self.wdog = wdog
+        self.hab_log = hab_log
+
+    def __str__(self):
+        return self.info()
+
+    def __repr__(self):
+        return self.info()
+
+    def info(self):
+        lines = [
+            " Device:        %s" % self.desc,
+            " Silicon Rev:   %d.%d" % self.silicon_rev,
+            "",
+            " iROM Release:  %s" % self.rom_release,
+            " iROM Version:  0x%02x" % (self.rom_version & 0xff),
+            "",
+            " WDOG State:    %s" % ('Enabled' if self.wdog_enabled else 'Disabled'),
+            "",
+            " SBMR1: 0x%08x" % self.sbmr1,
+            "   BOOT_CFG_1  = 0x%02x" % (self.sbmr1 & 0xff),
+            "   BOOT_CFG_2  = 0x%02x" % ((self.sbmr1 >> 8) & 0xff),
+            "   BOOT_CFG_3  = 0x%02x" % ((self.sbmr1 >> 16) & 0xff),
+            "   BOOT_CFG_4  = 0x%02x" % ((self.sbmr1 >> 24) & 0xff),
+            "",
+            " SBMR2: 0x%08x" % self.sbmr2,
+            "   BMOD        = %1d%1d\t%s" % (((self.sbmr2 >> 25) & 0x1), ((self.sbmr2 >> 24) & 0x1),
+                                             self.BOOT_MODES[self.boot_mode]),
+            "   BT_FUSE_SEL = %1d" % ((self.sbmr2 >> 4) & 0x1),
+            "   DIR_BT_DIS  = %1d" % ((self.sbmr2 >> 3) & 0x1),
+            "   SEC_CONFIG  = %1d%1d" % (((self.sbmr2 >> 1) & 0x1), self.sbmr2 & 0x1),
+            "",
+            " PersistReg Val: 0x%08x" % self.persist,
+            " ANALOG DIGPROG: 0x%08x" % self.digprog,
+            "",
+            " HAB Log Info --------------------------------------------",
+            "",
+            parse_hab_log(self.dev_type, self.hab_log)
+        ]
+        return '\n'.join(lines)
+
+
+def plan_dev_info(dev_name):
+    """ Get the addresses of all 32-bit words which can be needed for device info
+    The device variant is known only after reading of ROM, so the registers of all variants are included.
+    :param dev_name: The device name (MX6UL, MX7SD, ...)
+    :return: sorted list of addresses
+    """
+    rom_info = get_rom_info(dev_name)
+    if rom_info is None:
+        raise Exception('Unknown Device Info')
+
+    addresses = set(rom_info['PIDADDR'])
+    addresses.add(rom_info['VERADDR'])
+    for regs in set(get_dev_info(dev_name, rom_ver)[1] for rom_ver in _ROM_VERSIONS):
+        if regs is None:
+            continue
+        addresses.update(regs[:5])
+        addresses.update(range(regs[6], regs[6] + HAB_LOG_SIZE, 4))
+    return sorted(addresses)
+
+
+def read_dev_info(flasher, max_gap=MAX_GAP):
+    """ Read info about connected i.MX device
+    All needed registers are read at once by SdpBase.read_many(), the near registers by single READ command.
+    :param flasher: The opened SDP object of i.MX6/7 device
+    :param max_gap: Max count of unused bytes between two registers read by single READ command
+    :return: DevInfo object
+    """
+    dev_name = flasher.device_name
+    if dev_name is None:
+        raise Exception('Not Connected or Unsupported Device')
+
+    rom_info = get_rom_info(dev_name)
+    addresses = plan_dev_info(dev_name)
+    values = dict(zip(addresses, flasher.read_many(addresses, 32, max_gap)))
+
+    # Get ROM Release Number
+    rom_release = None
+    for release, address in zip(rom_info['RELEASE'], rom_info['PIDADDR']):
+        if values[address] & 0xFFFF == flasher.usbd.pid:
+            rom_release = release
+            break
+    if rom_release is None:
+        raise Exception('Unknown Device Variant')
+
+    # Get Device description and addresses to specific regs
+    rom_version = values[rom_info['VERADDR']]
+    desc, regs = get_dev_info(dev_name, rom_version)
+    if regs is None:
+        raise Exception('Unsupported Device Info')
+
+    hab_log = struct.pack('<64I', *[values[address] for address in range(regs[6], regs[6] + HAB_LOG_SIZE, 4)])
+    logger.info('Device info of %s read by %d commands', dev_name, len(addresses) - flasher.saved_round_trips)
+    return DevInfo(dev_name, desc, rom_info['DEVTYPE'], rom_release, rom_version, values[regs[0]], values[regs[1]],
+                   values[regs[2]], values[regs[3]], values[regs[4]], hab_log)
@@ -4,22 +4,28 @@
 # The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
 # or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
 
+import sys
+
+# bytes.hex() accepts separator since Python 3.8
+_HEX_SEP = sys.version_info >= (3, 8)
+
+# Printable ASCII chars (0x01 - 0x7E) are kept, all other replaced by '.'
+_ASCII_TABLE = bytes(x if 0x00 < x < 0x7F else 0x2E for x in range(256))
+
+
 def atos(data, sep=' ', fmt='02X'):
     """
     Convert array of bytes into HEX String
     :rtype: String
     """
-    ret = ''
-    for x in data:
-        if fmt == 'c':
-            if 0x00 < x < 0x7F:
-                ret += ('{:'+fmt+'}').format(x)
-            else:
-                ret += '.'
-        else:
-            ret += ('{:'+fmt+'}').format(x)
-        ret += sep
-    return ret
+    if not data:
+        return ''
+    if fmt == 'c':
+        return sep.join(bytes(data).translate(_ASCII_TABLE).decode('ascii')) + sep
+    if _HEX_SEP and fmt in ('02X', '02x') and len(sep) == 1:
+        ret = bytes(data).hex(sep)
+        return (ret.upper() if fmt == '02X' else ret) + sep
+    return sep.join(('{:' + fmt + '}').format(x) for x in data) + sep
 
 
 def crc16(data, crc_init=0):
@@ -35,4 +41,47 @@ def crc16(data, crc_init=0):
             if crc & 0x8000:
                 temp ^= 0x1021
             crc = temp
-    return crc
\ No newline at end of file
+    return crc
+
+def data_size(data):
+    """
+    Get size of data
+    :param data: Any bytes-like object or binary stream (file object), the stream is measured from current position
+    :rtype: int value
+    """
+    if hasattr(data, 'readinto'):
+        start = data.tell()
+        size = data.seek(0, 2) - start
+        data.seek(start, 0)
+        return size
+    return memoryview(data).nbytes
+
+
+def iter_chunks(data, size):
+    """
+    Split data into chunks without copying it
+    :param data: Any bytes-like object (bytes, bytearray, memoryview, mmap, ...) or binary stream (file object)
+    :param size: Max size of one chunk
+    :rtype: Iterator of memoryview
+    NOTE: The chunks of stream share one buffer, every chunk must be consumed before next one is requested.
+    """
+    if hasattr(data, 'readinto'):
+        buffer = memoryview(bytearray(size))
+        while True:
+            # Fill whole chunk, the raw streams can return less bytes than requested
+            length = 0
+            while length < size:
+                n = data.readinto(buffer[length:])
+                if not n:
+                    break
+                length += n
+            if not length:
+                break
+            yield buffer[:length]
+            if length < size:
+                break
+        return
+
+    view = memoryview(data).cast('B')
+    for offset in range(0, len(view), size):
+        yield view[offset:offset + size]
@@ -7,10 +7,15 @@
 import sys
 import struct
 import logging
+from time import perf_counter
 
-from .usb import RawHid
-from .misc import atos
+from .usb import RawHidBase, RawHid
+from .engine import TransferStats
+from .misc import atos, data_size, iter_chunks
 from ..hab import status_info
+from ..img import SegDCD, CmdWriteData
+
+logger = logging.getLogger(__name__)
 
 
 ########################################################################################################################
@@ -100,18 +105,27 @@ class SdpBase(object):
         'LOCK': 0x12343412
     }
 
+    # Max size of DCD blob accepted by ROM
+    DCD_MAX_SIZE = 1768
+
     # Supported i.MX USB Devices
     DEVICES = {}
 
-    def __init__(self, device):
-        """ Constructor """
-        assert isinstance(device, RawHid), "Not a \"RawHid\" instance !"
+    def __init__(self, device, engine=None):
+        """ Constructor
+        :param device: The RawHid object
+        :param engine: The TransferEngine object for pipelined data transfer (optional)
+        """
+        assert isinstance(device, RawHidBase), "Not a \"RawHid\" instance !"
 
         self.usbd = device
+        self.engine = engine
         self.opened = False
         self.pg_handler = None
         self.pg_range = 100
         self.pg_resolution = 5
+        self.transfer_stats = None
+        self.saved_round_trips = 0
 
     @property
     def device_name(self):
@@ -126,8 +140,14 @@ class SdpBase(object):
     def open(self, handler=None):
         """ Connect i.MX device """
         if not self.opened:
-            logging.info('Connect: %s', self.usbd.info)
-            self.usbd.open()
+            logger.info('Connect: %s', self.usbd.info)
+            try:
+                self.usbd.open()
+            except SdpGenericError:
+                raise
+            except Exception as e:
+                # The USB device is configured by first open(), the backend errors are reported as connection error
+                raise SdpConnectionError('Connect %s failed: %s' % (self.usbd.info, str(e)))
             self.opened = True
             self.pg_handler = handler
 
@@ -145,14 +165,15 @@ class SdpBase(object):
         :param value:
         """
         if not self.opened or self.usbd is None:
-            logging.info('RX-CMD: USB Disconnected')
+            logger.info('RX-CMD: USB Disconnected')
             raise SdpConnectionError('USB Disconnected !')
         # Assembly Command
         buf = struct.pack('>HIBII', self.CMDS[name]['ID'], addr, format, count, value)
         # Send it to USB
         self.usbd.write(self.HID_REPORT['CMD']['ID'], buf, self.HID_REPORT['CMD']['LEN'])
         # Write into log
-        logging.debug('TX-CMD [0x]: %s', atos(buf))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('TX-CMD [0x]: %s', atos(buf))
 
     def _check_secinfo(self, timeout=1000, wait=True):
         """ Check secure info of connected i.MX device
@@ -163,21 +184,21 @@ class SdpBase(object):
             report_id, rx_data = self.usbd.read(timeout)
         except:
             if wait:
-                logging.info('RX-CMD: Timeout Error >> USB Disconnected')
+                logger.info('RX-CMD: Timeout Error >> USB Disconnected')
                 raise SdpTimeoutError('Timeout >> USB Disconnected !')
             else:
                 return None
 
         if report_id != self.HID_REPORT['SEC']['ID']:
-            logging.info('RX-CMD: Wrong Report ID %d', report_id)
+            logger.info('RX-CMD: Wrong Report ID %d', report_id)
             raise SdpDataError('Wrong Report ID')
 
         tmp = struct.unpack_from("I", rx_data)
         if tmp[0] == self.SECNFO['LOCK']:
-            logging.info('SECURE: Target is Locked !')
+            logger.info('SECURE: Target is Locked !')
             raise SdpSecureError()
 
-        logging.debug('SECURE: Not Enabled')
+        logger.debug('SECURE: Not Enabled')
 
     def _get_status(self, timeout=1000, wait=True):
         """ Read status value
@@ -188,13 +209,13 @@ class SdpBase(object):
             report_id, rx_data = self.usbd.read(timeout)
         except:
             if wait:
-                logging.info('RX-CMD: Timeout Error >> USB Disconnected')
+                logger.info('RX-CMD: Timeout Error >> USB Disconnected')
                 raise SdpTimeoutError('Timeout >> USB Disconnected !')
             else:
                 return None
 
         if report_id != self.HID_REPORT['RET']['ID']:
-            logging.info('RX-CMD: Wrong Report ID %d', report_id)
+            logger.info('RX-CMD: Wrong Report ID %d', report_id)
             raise SdpDataError('Wrong Report ID')
 
         return struct.unpack_from("I", rx_data)[0]
@@ -207,9 +228,9 @@ class SdpBase(object):
         if 'ACK' in self.CMDS[cmd]:
             status = self._get_status(timeout=timeout, wait=True if self.CMDS[cmd]['ACK'] else False)
             if status is not None and status != self.CMDS[cmd]['ACK']:
-                logging.info('RX-CMD: ERROR: 0x%08X', status)
+                logger.info('RX-CMD: ERROR: 0x%08X', status)
                 raise SdpCommandError(status_info(status))
-        logging.info('RX-CMD: OK')
+        logger.info('RX-CMD: OK')
 
     def _read_data(self, length, timeout=1000):
         """ Read data from target
@@ -224,7 +245,7 @@ class SdpBase(object):
                 report_id, rx_data = self.usbd.read(timeout)
             except Exception as e:
                 print(e)
-                logging.info('RX-CMD: Timeout Error >> USB Disconnected')
+                logger.info('RX-CMD: Timeout Error >> USB Disconnected')
                 raise SdpTimeoutError('Timeout >> USB Disconnected !')
             # test for correct report
             if report_id != self.HID_REPORT['RET']['ID']:
@@ -252,29 +273,46 @@ class SdpBase(object):
         """ Send data to target
         :param data: array with data to send
         """
-        update = True
         report = self.HID_REPORT['DAT']
-        length = len(data)
-        offset = 0
-        pkglen = report['LEN']
-        while length > 0:
-            if length < report['LEN']:
-                pkglen = length
-            try:
-                self.usbd.write(report['ID'], data[offset:offset + pkglen], report['LEN'])
-            except:
-                logging.info('TX-CMD: Data Error >> USB Disconnected')
-                raise SdpDataError('USB Disconnected')
+        length = data_size(data)
+        update = [True]
+
+        def progress(offset):
             if self.pg_handler is not None and (offset % (report['LEN'] * self.pg_resolution)) == 0:
-                running = self.pg_handler(min(int((self.pg_range / len(data)) * offset), self.pg_range))
-                update = False
+                running = self.pg_handler(min(int((self.pg_range / length) * offset), self.pg_range))
+                update[0] = False
                 if not running:
                     raise SdpAbortError()
 
-            offset += pkglen
-            length -= pkglen
-
-        if self.pg_handler is not None and update:
+        if self.engine is not None:
+            try:
+                self.transfer_stats = self.engine.send(self.usbd, report['ID'], report['LEN'], data, progress)
+            except SdpAbortError:
+                raise
+            except:
+                logger.info('TX-CMD: Data Error >> USB Disconnected')
+                raise SdpDataError('USB Disconnected')
+        else:
+            stats = TransferStats()
+            start = perf_counter()
+            offset = 0
+            # Walk the data by memoryview chunks, so the packets are not copied
+            for chunk in iter_chunks(data, report['LEN']):
+                try:
+                    self.usbd.write(report['ID'], chunk, report['LEN'])
+                except:
+                    logger.info('TX-CMD: Data Error >> USB Disconnected')
+                    raise SdpDataError('USB Disconnected')
+                progress(offset)
+                offset += len(chunk)
+                stats.packets += 1
+
+            stats.length = offset
+            stats.elapsed = perf_counter() - start
+            self.transfer_stats = stats
+
+        logger.info('TX-DATA: %s', self.transfer_stats)
+        if self.pg_handler is not None and update[0]:
             self.pg_handler(self.pg_range)
 
     def read(self, address, length, format=32):
@@ -291,11 +329,12 @@ class SdpBase(object):
         if align > 0:
             length += (format // 8) - align
 
-        logging.info('TX-CMD: Read [ Addr=0x%08X | Len=%d | Format=%d ] ', address, length, format)
+        logger.info('TX-CMD: Read [ Addr=0x%08X | Len=%d | Format=%d ] ', address, length, format)
         self._send_cmd('READ', address, format, length)
         self._check_secinfo()
         ret_val = self._read_data(length, timeout=1000)
-        logging.info('RX-CMD: %s', atos(ret_val))
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('RX-CMD: %s', atos(ret_val))
         return ret_val
 
     def write(self, address, value, count=4, format=32):
@@ -315,17 +354,80 @@ class SdpBase(object):
         if count > 4:
             count = 4
 
-        logging.info('TX-CMD: Write [ Addr=0x%08X | Val=0x%08X | Count=%d | Format=%d ] ', address, value, count, format)
+        logger.info('TX-CMD: Write [ Addr=0x%08X | Val=0x%08X | Count=%d | Format=%d ] ', address, value, count, format)
         self._send_cmd('WRITE', address, format, count, value)
         self._check_secinfo()
         self._check_status('WRITE')
 
+    def read_many(self, addresses, format=32, max_gap=0):
+        """ Read values from list of reg/mem addresses
+        The addresses which are contiguous (or with gap <= max_gap bytes) are read by single READ command.
+        :param addresses: The list of register addresses
+        :param format: Register access format 8, 16, 32 bytes
+        :param max_gap: Max count of unused bytes between two addresses read in one command
+        :return {list} read values in the same order as addresses
+        """
+        width = format // 8
+        addresses = list(addresses)
+        blocks = []
+        for address in sorted(set(addresses)):
+            if blocks and address - blocks[-1][1] <= max_gap:
+                blocks[-1][1] = address + width
+                blocks[-1][2].append(address)
+            else:
+                blocks.append([address, address + width, [address]])
+
+        values = {}
+        for start, end, items in blocks:
+            data = self.read(start, end - start, format)
+            for address in items:
+                values[address] = int.from_bytes(data[address - start:address - start + width], 'little')
+
+        self.saved_round_trips = len(addresses) - len(blocks)
+        logger.info('Read %d values by %d commands, saved %d round trips',
+                    len(addresses), len(blocks), self.saved_round_trips)
+        return [values[address] for address in addresses]
+
+    def write_many(self, pairs, format=32, dcd_address=None):
+        """ Write values into list of reg/mem addresses
+        If the DCD address is specified, the writes are packed into DCD blobs (max DCD_MAX_SIZE bytes) and sent by
+        WDCD command, otherwise every value is written by single WRITE command. The DCD is used only on caller
+        request, it's on caller to know that the target accepts WDCD and which memory is free for the blob.
+        :param pairs: The list of [address, value] pairs
+        :param format: Register access format 8, 16, 32 bytes
+        :param dcd_address: The address of free memory (OCRAM) for DCD blob or None for WRITE commands
+        """
+        pairs = list(pairs)
+        total = commands = len(pairs)
+
+        if dcd_address is not None and pairs:
+            # Count of write-data items fitting into one blob (DCD header + command header)
+            count = (self.DCD_MAX_SIZE - 8) // 8
+            blobs = []
+            for i in range(0, len(pairs), count):
+                cmd = CmdWriteData(bytes=format // 8)
+                for address, value in pairs[i:i + count]:
+                    cmd.append(address, value)
+                dcd = SegDCD(enabled=True)
+                dcd.append(cmd)
+                blobs.append(dcd.export())
+            for blob in blobs:
+                self.write_dcd(dcd_address, blob)
+            commands = len(blobs)
+            pairs = []
+
+        for address, value in pairs:
+            self.write(address, value, format // 8, format)
+
+        self.saved_round_trips = total - commands
+        logger.info('Wrote %d values by %d commands, saved %d round trips', total, commands, self.saved_round_trips)
+
     def write_csf(self, address, data):
         """ Write CSF Data at specified address
         :param address: Start Address
         :param data: The CSF data in bytearray type
         """
-        logging.info('TX-CMD: WriteCSF [ Addr=0x%08X | Len=%d ] ', address, len(data))
+        logger.info('TX-CMD: WriteCSF [ Addr=0x%08X | Len=%d ] ', address, len(data))
         self._send_cmd('WCSF', address, 0, len(data))
         self._send_data(data)
         self._check_secinfo()
@@ -336,7 +438,7 @@ class SdpBase(object):
         :param address: Start Address
         :param data: The DCD data in bytearray type
         """
-        logging.info('TX-CMD: WriteDCD [ Addr=0x%08X | Len=%d ] ', address, len(data))
+        logger.info('TX-CMD: WriteDCD [ Addr=0x%08X | Len=%d ] ', address, len(data))
         self._send_cmd('WDCD', address, 0, len(data))
         self._send_data(data)
         self._check_secinfo()
@@ -345,17 +447,18 @@ class SdpBase(object):
     def write_file(self, address, data):
         """ Write File/Data at specified address
         :param address: Start Address
-        :param data: The img data in bytearray type
+        :param data: The img data as any bytes-like object (bytes, bytearray, mmap, ...) or binary stream
         """
-        logging.info('TX-CMD: WriteFile [ Addr=0x%08X | Len=%d ] ', address, len(data))
-        self._send_cmd('WFILE', address, 0, len(data))
+        length = data_size(data)
+        logger.info('TX-CMD: WriteFile [ Addr=0x%08X | Len=%d ] ', address, length)
+        self._send_cmd('WFILE', address, 0, length)
         self._send_data(data)
         self._check_secinfo()
         self._check_status('WFILE')
 
     def skip_dcd(self):
         """ Skip DCD blob from loaded file """
-        logging.info('TX-CMD: SkipDCD')
+        logger.info('TX-CMD: SkipDCD')
         self._send_cmd('SKIPDCD')
         self._check_secinfo()
         self._check_status('SKIPDCD')
@@ -366,7 +469,7 @@ class SdpBase(object):
         """ Jump to specified address and run code
         :param address: Destination address
         """
-        logging.info('TX-CMD: Jump To Address: 0x%08X', address)
+        logger.info('TX-CMD: Jump To Address: 0x%08X', address)
         self._send_cmd('JUMP', address)
         self._check_secinfo()
         self._check_status('JUMP', timeout=100)
@@ -377,13 +480,13 @@ class SdpBase(object):
         """ Read Error Status
         :return status value
         """
-        logging.info('TX-CMD: ReadStatus')
+        logger.info('TX-CMD: ReadStatus')
         self._send_cmd('ERROR')
         self._check_secinfo()
         status = self._get_status()
         if self.pg_handler is not None:
             self.pg_handler(self.pg_range)
-        logging.info('RX-CMD: 0x%08X', status)
+        logger.info('RX-CMD: 0x%08X', status)
         return status
 
     def parse_status(self, status):
@@ -453,6 +556,9 @@ class SdpMXRT(SdpBase):
 ########################################################################################################################
 SDP_CLS = (SdpMXRT, SdpMX67, SdpMX8)
 
+# Lookup of supported devices: (VID, PID) -> SDP class
+SDP_LOOKUP = {value: cls for cls in SDP_CLS for value in cls.DEVICES.values()}
+
 
 ########################################################################################################################
 # Helper function
@@ -470,31 +576,29 @@ def supported_devices():
     return names
 
 
-def scan_usb(device_name=None):
+def scan_usb(device_name=None, backend=None):
     """ Scan for available USB devices
     :param device_name: The device name (MX6DQP, MX6SDL, ...) or USB device VID:PID value
+    :param backend: The USB backend with enumerate(vid, pid) method (default: RawHid)
     :rtype list
     """
+    if backend is None:
+        backend = RawHid
 
     if device_name is None:
-        objs = []
-        devs = RawHid.enumerate()
-        for cls in SDP_CLS:
-            for dev in devs:
-                for value in cls.DEVICES.values():
-                    if dev.vid == value[0] and dev.pid == value[1]:
-                        objs += [cls(dev)]
-        return objs
+        # The backend lists the devices without opening them, only the supported are wrapped
+        return [SDP_LOOKUP[(dev.vid, dev.pid)](dev) for dev in backend.enumerate()
+                if (dev.vid, dev.pid) in SDP_LOOKUP]
     else:
         if ':' in device_name:
             vid, pid = device_name.split(':')
-            devs = RawHid.enumerate(int(vid, 0), int(pid, 0))
-            return [SdpBase(dev) for dev in devs]
+            devs = backend.enumerate(int(vid, 0), int(pid, 0))
+            return [SDP_LOOKUP.get((dev.vid, dev.pid), SdpBase)(dev) for dev in devs]
         else:
             for cls in SDP_CLS:
                 if device_name in cls.DEVICES:
                     vid = cls.DEVICES[device_name][0]
                     pid = cls.DEVICES[device_name][1]
-                    devs = RawHid.enumerate(vid, pid)
+                    devs = backend.enumerate(vid, pid)
                     return [cls(dev) for dev in devs]
     return []
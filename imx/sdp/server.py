@@ -0,0 +1,465 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import os
+import json
+import socket
+import struct
+import logging
+import threading
+import socketserver
+
+from .usb import RawHidBase
+from .sdp import SdpGenericError, SdpCommandError, SdpConnectionError, SdpDataError, SdpSecureError, \
+                 SdpTimeoutError, SdpAbortError, scan_usb
+from .engine import TransferStats
+
+logger = logging.getLogger(__name__)
+
+# The server is imported on demand by imxsd, the package itself stays importable on systems without AF_UNIX
+if not hasattr(socket, 'AF_UNIX'):
+    raise ImportError('imxsd server requires Unix domain sockets, which are not supported on this system')
+
+
+########################################################################################################################
+# Message Framing
+########################################################################################################################
+
+# Frame header: length of JSON header, length of binary payload
+FRAME_FORMAT = '<II'
+FRAME_SIZE = struct.calcsize(FRAME_FORMAT)
+
+
+def default_socket_path():
+    """ Get default path of imxsd server socket: $XDG_RUNTIME_DIR/imxsd.sock or /tmp/imxsd-<uid>.sock """
+    if os.environ.get('XDG_RUNTIME_DIR'):
+        return os.path.join(os.environ['XDG_RUNTIME_DIR'], 'imxsd.sock')
+    return os.path.join('/tmp', 'imxsd-{}.sock'.format(os.getuid()))
+
+
+def _recv_exact(sock, length):
+    """ Receive exactly length bytes, return None if the connection is closed before the first byte """
+    data = bytearray(length)
+    view = memoryview(data)
+    index = 0
+    while index < length:
+        count = sock.recv_into(view[index:])
+        if count == 0:
+            if index == 0:
+                return None
+            raise SdpConnectionError('Server connection closed !')
+        index += count
+    return data
+
+
+def send_msg(sock, header, payload=b''):
+    """ Send one message
+    :param sock: The connected socket
+    :param header: The message header as JSON serializable dict
+    :param payload: The binary payload as any bytes-like object (bytes, bytearray, memoryview, mmap)
+    """
+    header = json.dumps(header).encode('utf-8')
+    length = memoryview(payload).nbytes
+    sock.sendall(struct.pack(FRAME_FORMAT, len(header), length) + header)
+    if length:
+        # The payload is sent without copying, so the memory mapped image stays on disk
+        sock.sendall(payload)
+
+
+def recv_msg(sock):
+    """ Receive one message
+    :param sock: The connected socket
+    :return Tuple [header, payload] or None if the connection is closed
+    """
+    frame = _recv_exact(sock, FRAME_SIZE)
+    if frame is None:
+        return None
+    header_len, payload_len = struct.unpack(FRAME_FORMAT, frame)
+    header = json.loads(_recv_exact(sock, header_len).decode('utf-8'))
+    payload = _recv_exact(sock, payload_len) if payload_len else b''
+    return header, payload
+
+
+########################################################################################################################
+# Server
+########################################################################################################################
+
+class _Session(object):
+    """ Opened SDP object held by server """
+
+    def __init__(self, id, flasher):
+        self.id = id
+        self.flasher = flasher
+        self.lock = threading.Lock()
+
+    def describe(self):
+        usbd = self.flasher.usbd
+        return {'id': self.id, 'name': self.flasher.device_name, 'vid': usbd.vid, 'pid': usbd.pid,
+                'vendor': usbd.vendor_name, 'product': usbd.product_name}
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    """ Serve messages of one client connection until it's closed """
+
+    def handle(self):
+        while True:
+            try:
+                msg = recv_msg(self.request)
+            except (OSError, SdpGenericError, ValueError):
+                return
+            if msg is None:
+                return
+            header, payload = msg
+            try:
+                reply = self.server.dispatch(header, payload)
+            except Exception as e:
+                logger.debug('Request %s failed: %s', header.get('cmd'), str(e))
+                reply = {'error': type(e).__name__, 'msg': str(e)}, b''
+            try:
+                send_msg(self.request, *reply)
+            except OSError:
+                return
+
+
+class SdpServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ Local server which holds opened USB sessions of i.MX devices
+
+    The connected devices are enumerated and opened once, the clients (SdpClient) use them over Unix domain socket,
+    so a sequence of imxsd commands doesn't pay the USB enumeration for each command. Every message is a frame
+    header (FRAME_FORMAT) followed by a JSON header and a binary payload (data of write_file(), read(), ...).
+    The devices are enumerated again if no opened device matches the required target or if a client requests it,
+    only the newly connected devices are opened and the sessions of disconnected devices are dropped.
+    """
+
+    daemon_threads = True
+
+    # Methods of SdpBase which can be called remotely, value is the index of binary argument or None
+    METHODS = {
+        'read': None,
+        'write': None,
+        'read_many': None,
+        'write_many': None,
+        'write_csf': 1,
+        'write_dcd': 1,
+        'write_file': 1,
+        'skip_dcd': None,
+        'jump_and_run': None,
+        'read_status': None,
+    }
+
+    def __init__(self, path=None, backend=None):
+        """ Initialize SdpServer object and bind the socket
+        :param path: The socket path (default: default_socket_path())
+        :param backend: The USB backend with enumerate(vid, pid) method (default: RawHid)
+        """
+        self.path = path if path is not None else default_socket_path()
+        self.backend = backend
+        self.sessions = {}
+        self.scans = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            self._remove_stale()
+        super().__init__(self.path, _Handler)
+
+    def _remove_stale(self):
+        """ Remove socket file left by not running server """
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.path)
+        except OSError:
+            os.remove(self.path)
+        else:
+            raise Exception('Server is already running at: ' + self.path)
+        finally:
+            sock.close()
+
+    @staticmethod
+    def _device_key(usbd):
+        """ Get key which identifies USB device across enumerations: bus and address (PyUSB), device path (PyWinUSB)
+        or the object itself (simulated devices) """
+        dev = getattr(usbd, 'dev', None)
+        if hasattr(dev, 'bus'):
+            return dev.bus, dev.address
+        dev = getattr(usbd, 'device', None)
+        if hasattr(dev, 'device_path'):
+            return dev.device_path
+        return id(usbd)
+
+    def _enumerate(self):
+        """ Open newly connected devices and drop sessions of disconnected ones, must be called with self._lock held.
+        The opened devices are not touched, so the boards in use by other clients aren't configured or reset again.
+        """
+        self.scans += 1
+        found = {self._device_key(flasher.usbd): flasher for flasher in scan_usb(backend=self.backend)}
+
+        for session in list(self.sessions.values()):
+            key = self._device_key(session.flasher.usbd)
+            if key in found:
+                del found[key]
+                continue
+            del self.sessions[session.id]
+            # The session in use is closed by the running call, which fails on the disconnected device
+            if session.lock.acquire(blocking=False):
+                try:
+                    session.flasher.close()
+                finally:
+                    session.lock.release()
+
+        for flasher in found.values():
+            try:
+                flasher.open()
+            except Exception as e:
+                logger.warning('Open %s failed: %s', flasher.usbd.info, str(e))
+                continue
+            self.sessions[self._next_id] = _Session(self._next_id, flasher)
+            self._next_id += 1
+
+    def _close_sessions(self):
+        with self._lock:
+            for session in self.sessions.values():
+                with session.lock:
+                    session.flasher.close()
+            self.sessions.clear()
+
+    @staticmethod
+    def _match(session, target):
+        """ Check if session match the device name (MX6UL, ...) or VID:PID value """
+        if target is None:
+            return True
+        if ':' in target:
+            vid, pid = target.split(':')
+            return session.flasher.usbd.vid == int(vid, 0) and session.flasher.usbd.pid == int(pid, 0)
+        return session.flasher.device_name == target
+
+    def scan(self, target=None, rescan=False):
+        """ Get sessions of devices which match the target
+        :param target: The device name (MX6DQP, MX6SDL, ...) or USB device VID:PID value
+        :param rescan: Enumerate the devices again
+        :return list of _Session objects
+        """
+        with self._lock:
+            sessions = [] if rescan else [s for s in self.sessions.values() if self._match(s, target)]
+            if not sessions:
+                self._enumerate()
+                sessions = [s for s in self.sessions.values() if self._match(s, target)]
+        return sessions
+
+    def dispatch(self, header, payload):
+        """ Process one request
+        :param header: The request header
+        :param payload: The request binary payload
+        :return Tuple [reply header, reply payload]
+        """
+        cmd = header.get('cmd')
+        if cmd == 'scan':
+            sessions = self.scan(header.get('target'), header.get('rescan', False))
+            return {'devices': [session.describe() for session in sessions]}, b''
+        if cmd == 'shutdown':
+            # The shutdown() waits for serve_forever() loop, so it can't be called from the handler thread
+            threading.Thread(target=self.shutdown).start()
+            return {}, b''
+        if cmd != 'call':
+            raise Exception('Unknown command: %s' % cmd)
+
+        method = header['method']
+        if method not in self.METHODS:
+            raise Exception('Not supported method: %s' % method)
+        with self._lock:
+            session = self.sessions.get(header['id'])
+            if session is None:
+                raise SdpConnectionError('Session %d is closed, scan the devices again !' % header['id'])
+
+        args = list(header.get('args', ()))
+        if self.METHODS[method] is not None:
+            args.insert(self.METHODS[method], payload)
+        with session.lock:
+            flasher = session.flasher
+            flasher.transfer_stats = None
+            try:
+                result = getattr(flasher, method)(*args)
+                error = None
+            except (SdpConnectionError, SdpTimeoutError) as e:
+                flasher.close()
+                error = e
+        if error is not None:
+            # The device is disconnected, it must be enumerated again. The server lock is taken after the session
+            # lock is released, re-enumeration holds the server lock and only tries the session lock.
+            with self._lock:
+                self.sessions.pop(session.id, None)
+            raise error
+
+        reply = {'saved_round_trips': flasher.saved_round_trips}
+        stats = flasher.transfer_stats
+        if stats is not None:
+            reply['stats'] = [stats.length, stats.packets, stats.elapsed]
+        if isinstance(result, (bytes, bytearray)):
+            return reply, result
+        reply['result'] = result
+        return reply, b''
+
+    def server_close(self):
+        super().server_close()
+        self._close_sessions()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+########################################################################################################################
+# Client
+########################################################################################################################
+
+# Errors which are raised by client with the same type as on server side
+ERRORS = {cls.__name__: cls for cls in (SdpGenericError, SdpCommandError, SdpConnectionError, SdpDataError,
+                                        SdpSecureError, SdpTimeoutError, SdpAbortError, NotImplementedError)}
+
+
+def _request(sock, header, payload=b''):
+    """ Send request and receive reply, raise the server side error """
+    send_msg(sock, header, payload)
+    msg = recv_msg(sock)
+    if msg is None:
+        raise SdpConnectionError('Server connection closed !')
+    reply, data = msg
+    if 'error' in reply:
+        raise ERRORS.get(reply['error'], Exception)(reply['msg'])
+    return reply, data
+
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError as e:
+        sock.close()
+        raise SdpConnectionError('Server is not running at: %s (%s)' % (path, e.strerror))
+    return sock
+
+
+class RemoteHid(RawHidBase):
+    """ Description of USB device opened by SdpServer """
+
+    def __init__(self, vid, pid, vendor_name, product_name):
+        super().__init__()
+        self.vid = vid
+        self.pid = pid
+        self.vendor_name = vendor_name
+        self.product_name = product_name
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SdpRemote(object):
+    """ Proxy of SDP object opened by SdpServer, it has the same methods as SdpBase
+
+    Every proxy has own server connection, which is created by open() and closed by close(). The device stays opened
+    by server.
+    """
+
+    def __init__(self, path, device):
+        """ Initialize SdpRemote object
+        :param path: The server socket path
+        :param device: The device description from server scan reply
+        """
+        self.path = path
+        self.id = device['id']
+        self.usbd = RemoteHid(device['vid'], device['pid'], device['vendor'], device['product'])
+        self.device_name = device['name']
+        self.opened = False
+        self.transfer_stats = None
+        self.saved_round_trips = 0
+        self._sock = None
+
+    def _call(self, method, *args, data=b''):
+        if self._sock is None:
+            self.open()
+        reply, payload = _request(self._sock, {'cmd': 'call', 'id': self.id, 'method': method, 'args': args}, data)
+        self.saved_round_trips = reply['saved_round_trips']
+        self.transfer_stats = TransferStats(*reply['stats']) if 'stats' in reply else None
+        return reply['result'] if 'result' in reply else payload
+
+    def open(self, handler=None):
+        """ Connect server, the progress handler is not supported """
+        if self._sock is None:
+            self._sock = _connect(self.path)
+        self.opened = True
+
+    def close(self):
+        """ Disconnect server, the device stays opened """
+        self.opened = False
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def read(self, address, length, format=32):
+        return self._call('read', address, length, format)
+
+    def write(self, address, value, count=4, format=32):
+        return self._call('write', address, value, count, format)
+
+    def read_many(self, addresses, format=32, max_gap=0):
+        return self._call('read_many', list(addresses), format, max_gap)
+
+    def write_many(self, pairs, format=32, dcd_address=None):
+        return self._call('write_many', [list(pair) for pair in pairs], format, dcd_address)
+
+    def write_csf(self, address, data):
+        return self._call('write_csf', address, data=data)
+
+    def write_dcd(self, address, data):
+        return self._call('write_dcd', address, data=data)
+
+    def write_file(self, address, data):
+        try:
+            # Any bytes-like object (mmap too) is sent without copying and without moving its position
+            data = memoryview(data)
+        except TypeError:
+            # Binary stream without buffer interface
+            data = data.read()
+        return self._call('write_file', address, data=data)
+
+    def skip_dcd(self):
+        return self._call('skip_dcd')
+
+    def jump_and_run(self, address):
+        return self._call('jump_and_run', address)
+
+    def read_status(self):
+        return self._call('read_status')
+
+
+class SdpClient(object):
+    """ Client of SdpServer """
+
+    def __init__(self, path=None):
+        """ Initialize SdpClient object
+        :param path: The server socket path (default: default_socket_path())
+        """
+        self.path = path if path is not None else default_socket_path()
+
+    def _request(self, header):
+        sock = _connect(self.path)
+        try:
+            return _request(sock, header)[0]
+        finally:
+            sock.close()
+
+    def scan(self, device_name=None, rescan=False):
+        """ Get devices opened by server, same as scan_usb()
+        :param device_name: The device name (MX6DQP, MX6SDL, ...) or USB device VID:PID value
+        :param rescan: Enumerate the devices again
+        :return list of SdpRemote objects
+        """
+        reply = self._request({'cmd': 'scan', 'target': device_name, 'rescan': rescan})
+        return [SdpRemote(self.path, device) for device in reply['devices']]
+
+    def shutdown(self):
+        """ Stop the server, the opened devices are closed """
+        self._request({'cmd': 'shutdown'})
@@ -0,0 +1,228 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import struct
+import logging
+from time import sleep
+
+from .usb import RawHidBase, RxQueue
+from ..img import SegDCD, CmdWriteData, EnumWriteOps
+
+logger = logging.getLogger(__name__)
+
+
+########################################################################################################################
+# Sparse Memory Model
+########################################################################################################################
+
+class SparseMemory(object):
+    """ Sparse memory of simulated device, only the written pages are allocated """
+
+    PAGE_SIZE = 4096
+
+    def __init__(self, fill=0x00):
+        """ Initialize SparseMemory object
+        :param fill: The value of not written bytes
+        """
+        self.fill = fill
+        self._pages = {}
+
+    def __len__(self):
+        """ Count of allocated bytes """
+        return len(self._pages) * self.PAGE_SIZE
+
+    def read(self, address, length):
+        """ Read data from memory
+        :param address: Start address
+        :param length: Count of bytes
+        :return bytes
+        """
+        data = bytearray()
+        while length > 0:
+            index, offset = divmod(address, self.PAGE_SIZE)
+            size = min(length, self.PAGE_SIZE - offset)
+            page = self._pages.get(index)
+            data += page[offset:offset + size] if page is not None else bytes([self.fill]) * size
+            address += size
+            length -= size
+        return bytes(data)
+
+    def write(self, address, data):
+        """ Write data into memory
+        :param address: Start address
+        :param data: Any bytes-like object
+        """
+        view = memoryview(data).cast('B')
+        while view:
+            index, offset = divmod(address, self.PAGE_SIZE)
+            size = min(len(view), self.PAGE_SIZE - offset)
+            page = self._pages.get(index)
+            if page is None:
+                page = self._pages[index] = bytearray([self.fill]) * self.PAGE_SIZE
+            page[offset:offset + size] = view[:size]
+            address += size
+            view = view[size:]
+
+    def read_value(self, address, size=4):
+        return int.from_bytes(self.read(address, size), 'little')
+
+    def write_value(self, address, value, size=4):
+        self.write(address, (value & ((1 << (8 * size)) - 1)).to_bytes(size, 'little'))
+
+
+########################################################################################################################
+# Simulated i.MX Device
+########################################################################################################################
+
+class RawHidSim(RawHidBase):
+    """ USB-HID device which simulates the ROM side of i.MX Serial Download Protocol """
+
+    # Command IDs
+    READ = 0x0101
+    WRITE = 0x0202
+    WFILE = 0x0404
+    ERROR = 0x0505
+    WCSF = 0x0606
+    WDCD = 0x0A0A
+    JUMP = 0x0B0B
+    SKIPDCD = 0x0C0C
+
+    # Responses
+    SEC_OPEN = 0x56787856
+    SEC_LOCK = 0x12343412
+    ACK_WRITE = 0x128A8A12
+    ACK_FILE = 0x88888888
+    ACK_SKIPDCD = 0x900DD009
+    HAB_SUCCESS = 0xF0F0F0F0
+
+    # Length of IN report with data
+    RET_LEN = 64
+
+    def __init__(self, vid=0x15A2, pid=0x0054, product_name="SE Blank SIM", latency=0.0, bandwidth=None,
+                 locked=False):
+        """ Initialize RawHidSim object
+        :param vid: USB Vendor ID
+        :param pid: USB Product ID
+        :param product_name: USB Product Name
+        :param latency: The time in seconds per report
+        :param bandwidth: The bus bandwidth in Bytes/s (None for infinite)
+        :param locked: Simulate HAB closed (secured) device
+        """
+        super().__init__()
+        self.vid = vid
+        self.pid = pid
+        self.vendor_name = "Freescale SemiConductor Inc"
+        self.product_name = product_name
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.locked = locked
+        self.memory = SparseMemory()
+        self.status = self.HAB_SUCCESS
+        self.commands = []
+        self.jump_address = None
+        self.opened = False
+        self._rx = RxQueue()
+        self._cmd = None
+        self._data = bytearray()
+
+    def _delay(self, length):
+        delay = self.latency
+        if self.bandwidth:
+            delay += length / self.bandwidth
+        if delay > 0:
+            sleep(delay)
+
+    def _respond(self, *values):
+        """ Send secure info report followed by status reports """
+        self._rx.put(bytes([0x03]) + struct.pack('I', self.SEC_LOCK if self.locked else self.SEC_OPEN))
+        for value in values:
+            self._rx.put(bytes([0x04]) + struct.pack('I', value))
+
+    def _command(self, cmd, address, format, count, value):
+        self.commands.append(cmd)
+        if cmd == self.READ:
+            data = self.memory.read(address, count)
+            self._respond()
+            for i in range(0, count, self.RET_LEN):
+                self._rx.put(bytes([0x04]) + data[i:i + self.RET_LEN])
+        elif cmd == self.WRITE:
+            self.memory.write_value(address, value, count)
+            self._respond(self.ACK_WRITE)
+        elif cmd in (self.WFILE, self.WCSF, self.WDCD):
+            # Wait for data phase
+            self._cmd = (cmd, address, count)
+            self._data = bytearray()
+        elif cmd == self.ERROR:
+            self._respond(self.status)
+        elif cmd == self.JUMP:
+            self.jump_address = address
+            self._respond()
+        elif cmd == self.SKIPDCD:
+            self._respond(self.ACK_SKIPDCD)
+        else:
+            logger.warning('SIM: Unknown command 0x%04X', cmd)
+
+    def _complete(self, cmd, address, data):
+        self.memory.write(address, data)
+        if cmd == self.WDCD:
+            self._run_dcd(data)
+        self._respond(self.ACK_FILE if cmd == self.WFILE else self.ACK_WRITE)
+
+    def _run_dcd(self, data):
+        """ Execute write commands of DCD blob """
+        for cmd in SegDCD.parse(data):
+            if not isinstance(cmd, CmdWriteData):
+                continue
+            for address, value in cmd:
+                if cmd.ops == EnumWriteOps.CLEAR_BITMASK:
+                    value = self.memory.read_value(address, cmd.bytes) & ~value
+                elif cmd.ops == EnumWriteOps.SET_BITMASK:
+                    value = self.memory.read_value(address, cmd.bytes) | value
+                self.memory.write_value(address, value, cmd.bytes)
+
+    def open(self):
+        self.opened = True
+
+    def close(self):
+        self.opened = False
+
+    def write_raw(self, id, rawdata):
+        if not self.opened:
+            raise Exception("USB Disconnected")
+        self._delay(len(rawdata))
+        if id == 0x01:
+            self._command(*struct.unpack_from('>HIBII', rawdata, 1))
+        elif id == 0x02 and self._cmd is not None:
+            cmd, address, count = self._cmd
+            self._data += memoryview(rawdata)[1:1 + count - len(self._data)]
+            if len(self._data) >= count:
+                self._cmd = None
+                self._complete(cmd, address, self._data)
+        else:
+            logger.warning('SIM: Unexpected report %d', id)
+
+    def read(self, timeout=1000):
+        rawdata = self._rx.get(timeout)
+        self._delay(len(rawdata))
+        return self._decode_packet(rawdata)
+
+
+########################################################################################################################
+# Simulated USB Bus
+########################################################################################################################
+
+class SimBus(object):
+    """ USB backend with simulated devices, usable as `backend` argument of scan_usb() """
+
+    def __init__(self, devices=None):
+        """ Initialize SimBus object
+        :param devices: The list of RawHidSim objects
+        """
+        self.devices = list(devices) if devices else []
+
+    def enumerate(self, vid=None, pid=None):
+        """ Get list of connected devices with required VID/PID """
+        return [dev for dev in self.devices if (vid is None or dev.vid == vid) and (pid is None or dev.pid == pid)]
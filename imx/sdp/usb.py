@@ -8,10 +8,11 @@ import os
 import logging
 import threading
 import collections
-from time import time
 
 from .misc import atos
 
+logger = logging.getLogger(__name__)
+
 #os.environ['PYUSB_DEBUG'] = 'debug'
 #os.environ['PYUSB_LOG_FILENAME'] = 'usb.log'
 
@@ -31,13 +32,34 @@ class RawHidBase(object):
         self.pid = 0
         self.vendor_name = ""
         self.product_name = ""
+        self._tx_buffer = None
 
     @staticmethod
-    def _encode_packet(report_id, data, pkglen):
-        buf = bytes([report_id])                   # Set Report ID (byte 0)
-        buf += data                                # Set data
-        buf += bytes([0x00]*(pkglen - len(data)))  # Align packet to pkglen
-        return buf
+    def _pack_report(buffer, report_id, data):
+        """ Pack USB-HID report into preallocated buffer
+        :param buffer: The bytearray of report size + 1 (Report ID)
+        :param report_id: The Report ID
+        :param data: The report data as any bytes-like object (bytes, bytearray, memoryview)
+        :return: buffer
+        """
+        length = len(data)
+        buffer[0] = report_id                                # Set Report ID (byte 0)
+        buffer[1:length + 1] = data                          # Set data
+        if length + 1 < len(buffer):
+            buffer[length + 1:] = bytes(len(buffer) - length - 1)  # Align only short packet to pkglen
+        return buffer
+
+    def _encode_packet(self, report_id, data, pkglen):
+        """ Encode USB-HID report into reusable TX buffer
+        NOTE: The returned buffer is overwritten by next call, it must be consumed before.
+        :param report_id: The Report ID
+        :param data: The report data as any bytes-like object
+        :param pkglen: The report length
+        :return: bytearray
+        """
+        if self._tx_buffer is None or len(self._tx_buffer) != pkglen + 1:
+            self._tx_buffer = bytearray(pkglen + 1)
+        return self._pack_report(self._tx_buffer, report_id, data)
 
     @staticmethod
     def _decode_packet(data):
@@ -51,12 +73,57 @@ class RawHidBase(object):
         raise NotImplementedError()
 
     def write(self, id, data, size):
+        self.write_raw(id, self._encode_packet(id, data, size))
+
+    def write_raw(self, id, rawdata):
         raise NotImplementedError()
 
     def read(self, timeout):
         raise NotImplementedError()
 
 
+########################################################################################################################
+# USB Receive Queue
+########################################################################################################################
+
+class RxQueue(object):
+    """ Thread-safe queue of received reports
+
+    The reader is blocking on condition variable until the report is delivered by backend callback or until
+    the timeout expires, so no CPU time is consumed while waiting.
+    """
+
+    def __init__(self):
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, item):
+        """ Add item into queue and wake up waiting reader
+        :param item: The received report
+        """
+        with self._cond:
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """ Get the oldest item from queue
+        :param timeout: The wait time in ms (None for infinite)
+        :return The received report
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, None if timeout is None else timeout / 1000):
+                raise Exception("Read timed out")
+            return self._items.popleft()
+
+    def clear(self):
+        """ Remove all items from queue """
+        with self._cond:
+            self._items.clear()
+
+
 ########################################################################################################################
 # USB Interface Classes
 ########################################################################################################################
@@ -78,35 +145,33 @@ if os.name == "nt":
             super().__init__()
             # Vendor page and usage_id = 2
             self.report = []
-            # deque used here instead of synchronized Queue
-            # since read speeds are ~10-30% faster and are
-            # comparable to a based list implementation.
-            self.rcv_data = collections.deque()
+            # Reports received by pywinusb thread, the reader is waiting on condition instead of polling
+            self.rcv_data = RxQueue()
             self.device = None
             return
 
         # handler called when a report is received
         def __rx_handler(self, data):
-            # logging.debug("rcv: %s", data[1:])
-            self.rcv_data.append(data)
+            # logger.debug("rcv: %s", data[1:])
+            self.rcv_data.put(data)
 
         def open(self):
             """ open the interface """
-            logging.debug("Opening USB interface")
+            logger.debug("Opening USB interface")
             self.device.set_raw_data_handler(self.__rx_handler)
             self.device.open(shared=False)
 
         def close(self):
             """ close the interface """
-            logging.debug("Closing USB interface")
+            logger.debug("Closing USB interface")
             self.device.close()
 
-        def write(self, id, data, size):
+        def write_raw(self, id, rawdata):
             """
-            write data on the OUT endpoint associated to the HID interface
+            write encoded report on the OUT endpoint associated to the HID interface
             """
-            rawdata = self._encode_packet(id, data, size)
-            logging.debug('USB-OUT[0x]: %s', atos(rawdata))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('USB-OUT[0x]: %s', atos(rawdata))
             self.report[id - 1].send(rawdata)
 
         def read(self, timeout=2000):
@@ -114,12 +179,9 @@ if os.name == "nt":
             Read data on the IN endpoint associated to the HID interface
             :param timeout:
             """
-            start = time()
-            while len(self.rcv_data) == 0:
-                if ((time() - start) * 1000) > timeout:
-                    raise Exception("Read timed out")
-            rawdata = self.rcv_data.popleft()
-            logging.debug('USB-IN [0x]: %s', atos(rawdata))
+            rawdata = self.rcv_data.get(timeout)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('USB-IN [0x]: %s', atos(rawdata))
             return self._decode_packet(bytes(rawdata))
 
         @staticmethod
@@ -156,7 +218,7 @@ if os.name == "nt":
                         new_target.device.set_raw_data_handler(new_target.__rx_handler)
                         targets.append(new_target)
                 except Exception as e:
-                    logging.error("Receiving Exception: %s", e)
+                    logger.error("Receiving Exception: %s", e)
                     dev.close()
 
             return targets
@@ -180,32 +242,93 @@ elif os.name == "posix":
         pid = 0
         interface_number = 0
 
+        @property
+        def transport(self):
+            """ The transport used for OUT reports: 'INT-OUT' (interrupt endpoint) or 'EP0' (SET_REPORT) """
+            return 'EP0' if self.ep_out is None else 'INT-OUT'
+
+        @property
+        def vendor_name(self):
+            """ Vendor string, read from device at first access """
+            if self._vendor_name is None:
+                self._vendor_name = self._get_string(1)
+            return self._vendor_name
+
+        @vendor_name.setter
+        def vendor_name(self, value):
+            self._vendor_name = value
+
+        @property
+        def product_name(self):
+            """ Product string, read from device at first access """
+            if self._product_name is None:
+                self._product_name = self._get_string(2)
+            return self._product_name
+
+        @product_name.setter
+        def product_name(self, value):
+            self._product_name = value
+
         def __init__(self):
             super().__init__()
             self.dev = None
             self.closed = False
+            self.configured = False
+            self.ep_in = 0x81
+            self.ep_out = None
+            self.timeout = 1000
+            self._vendor_name = None
+            self._product_name = None
+
+        def _get_string(self, index):
+            try:
+                return usb.util.get_string(self.dev, index).strip('\0')
+            except Exception as e:
+                logger.warning("Cannot read string descriptor: %s", str(e))
+                return ""
 
         def open(self):
-            """ open the interface """
-            logging.debug("Opening USB interface")
+            """ open the interface, the device is configured and reset by first call """
+            logger.debug("Opening USB interface")
+            if self.configured:
+                return
+
+            try:
+                if self.dev.is_kernel_driver_active(self.interface_number):
+                    self.dev.detach_kernel_driver(self.interface_number)
+            except Exception as e:
+                logger.warning(str(e))
+
+            try:
+                self.dev.set_configuration()
+                self.dev.reset()
+            except usb.core.USBError as e:
+                raise Exception("Cannot set configuration the device: %s" % str(e))
+
+            self.ep_in, self.ep_out = RawHid.find_endpoints(self.dev, self.interface_number)
+            logger.debug("USB transport: %s", self.transport)
+            self.configured = True
 
         def close(self):
             """ close the interface """
-            logging.debug("Close USB Interface")
+            logger.debug("Close USB Interface")
             self.closed = True
             try:
                 if self.dev: usb.util.dispose_resources(self.dev)
             except:
                 pass
 
-        def write(self, id, data, size):
-            """ write data on the OUT endpoint associated to the HID interface
+        def write_raw(self, id, rawdata):
+            """ write encoded report on the OUT endpoint associated to the HID interface
             :param id: report ID
-            :param data: report data in bytes
-            :param size: report size
+            :param rawdata: encoded report (Report ID + data aligned to report size)
             """
-            rawdata = self._encode_packet(id, data, size)
-            logging.debug('USB-OUT[0x]: %s', atos(rawdata))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('USB-OUT[0x]: %s', atos(rawdata))
+
+            if self.ep_out is not None:
+                self.dev.write(self.ep_out, rawdata, self.timeout)
+                return
 
             bmRequestType = 0x21       # Host to device request of type Class of Recipient Interface
             bmRequest = 0x09           # Set_REPORT (HID class-specific request for transferring data over EP0)
@@ -218,13 +341,47 @@ elif os.name == "posix":
             :param timeout: wait time in ms
             :return Tuple [report_id, data]
             """
-            rawdata = self.dev.read(1 | 0x80, 1024, timeout)
-            logging.debug('USB-IN [0x]: %s', atos(rawdata))
+            rawdata = self.dev.read(self.ep_in, 1024, timeout)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('USB-IN [0x]: %s', atos(rawdata))
             return self._decode_packet(rawdata)
 
         @staticmethod
-        def enumerate(vid=None, pid=None):
+        def find_endpoints(dev, interface_number=0):
+            """ Find the interrupt endpoints of HID interface in active configuration
+            :param dev: The pyusb Device object
+            :param interface_number: The HID interface number
+            :return Tuple [IN endpoint address, OUT endpoint address or None if not present]
+            """
+            def is_interrupt(direction):
+                return lambda ep: usb.util.endpoint_direction(ep.bEndpointAddress) == direction and \
+                                  usb.util.endpoint_type(ep.bmAttributes) == usb.util.ENDPOINT_TYPE_INTR
+
+            ep_in = 0x81
+            ep_out = None
+            try:
+                intf = dev.get_active_configuration()[(interface_number, 0)]
+            except Exception as e:
+                logger.warning("Cannot read interface descriptor: %s", str(e))
+                return ep_in, ep_out
+
+            ep = usb.util.find_descriptor(intf, custom_match=is_interrupt(usb.util.ENDPOINT_IN))
+            if ep is not None:
+                ep_in = ep.bEndpointAddress
+            ep = usb.util.find_descriptor(intf, custom_match=is_interrupt(usb.util.ENDPOINT_OUT))
+            if ep is not None:
+                ep_out = ep.bEndpointAddress
+            return ep_in, ep_out
 
+        @staticmethod
+        def enumerate(vid=None, pid=None):
+            """ List the connected devices by cached device descriptors only
+            The device isn't touched until open(), the string descriptors are read at first access of vendor_name
+            or product_name.
+            :param vid: USB Vendor ID or None for all HID devices
+            :param pid: USB Product ID or None for all HID devices
+            :return list of RawHid objects
+            """
             def is_hid_device(device):
                 if device.bDeviceClass != 0:
                     return False
@@ -232,36 +389,17 @@ elif os.name == "posix":
                     if cfg.bNumInterfaces == 1 and usb.util.find_descriptor(cfg, bInterfaceClass=3) is not None:
                         return True
 
-            devices = []
-
             if vid is None or pid is None:
                 all_hid_devices = usb.core.find(find_all=True, custom_match=is_hid_device)
             else:
                 all_hid_devices = usb.core.find(find_all=True, idVendor=vid, idProduct=pid)
 
-            # iterate on all devices found
+            devices = []
             for dev in all_hid_devices:
-
-                try:
-                    if dev.is_kernel_driver_active(0):
-                        dev.detach_kernel_driver(0)
-                except Exception as e:
-                    logging.warning(str(e))
-                    continue
-
-                try:
-                    dev.set_configuration()
-                    dev.reset()
-                except usb.core.USBError as e:
-                    logging.warning("Cannot set configuration the device: %s" % str(e))
-                    continue
-
                 new_device = RawHid()
                 new_device.dev = dev
                 new_device.vid = dev.idVendor
                 new_device.pid = dev.idProduct
-                new_device.vendor_name = usb.util.get_string(dev, 1).strip('\0')
-                new_device.product_name = usb.util.get_string(dev, 2).strip('\0')
                 new_device.interface_number = 0
                 devices.append(new_device)
 
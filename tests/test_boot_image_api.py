@@ -5,8 +5,12 @@
 # or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
 
 import os
+import struct
 import pytest
+from io import BytesIO
+from click.testing import CliRunner
 from imx import img
+from imx.img.__main__ import cli
 
 
 def setup_module(module):
@@ -24,3 +28,197 @@ def test_ivt2_segment():
 
     assert ivt.header.tag == 0xD1
     assert ivt.header.length == ivt.SIZE
+
+
+def test_csf_segment():
+    csf = img.SegCSF(enabled=True)
+    csf.append(img.CmdSet())
+    csf.append(img.CmdInstallKey(crthsh=bytes(32)))
+    csf.append(img.CmdUnlock(data=[0x3]))
+    csf.append(img.CmdCheckData(4, 0, 0x307A0004, 0x1))
+    csf.append(img.CmdWriteData())
+    csf.append(img.CmdNop())
+    data = csf.export()
+
+    # The commands are parsed from any offset and the corrupted command is reported with its absolute position
+    csf_obj = img.SegCSF.parse(bytes(16) + data, 16)
+    assert [type(cmd) for cmd in csf_obj] == [type(cmd) for cmd in csf]
+    assert csf_obj.export() == data
+    index = 16 + 4 + csf[0].size
+    with pytest.raises(img.header.CorruptedException, match=hex(index) + '$'):
+        img.SegCSF.parse(bytes(16) + data[:index - 16] + b'\x00' + data[index - 15:], 16)
+
+
+def test_parse_disk_image(tmpdir, monkeypatch):
+    # Scan in small blocks, so the image is found across block boundaries
+    monkeypatch.setattr(img.images, "SCAN_BLOCK_SIZE", 0x1000)
+    boot = img.BootImg2(address=0x877FF000)
+    boot.app = img.SegAPP(bytes(range(256)) * 16)
+    raw = boot.export()
+    # False candidates at scanned positions before the image
+    junk = bytearray(0x12300)
+    junk[0x1000] = 0xD1
+    data = bytes(junk) + raw
+
+    assert img.parse(data).export() == raw
+    file = os.path.join(str(tmpdir), 'disk.img')
+    with open(file, 'wb') as f:
+        f.write(data)
+    with open(file, 'rb') as f:
+        assert img.parse(f).export() == raw
+    with pytest.raises(Exception):
+        img.parse(bytes(0x10000))
+
+
+def test_scan_disk_image():
+    boot = img.BootImg2(address=0x877FF000)
+    boot.app = img.SegAPP(bytes(0x3000))
+    raw = boot.export()
+    # Kernel image with IVT (no BDT) at the end
+    kernel = bytes(0x2000) + b'\xD1\x00\x20\x41' + struct.pack('<7L', 0x80008000, 0, 0, 0, 0x8000A000, 0, 0)
+    data = bytes(0x1000) + raw + bytes(0x10000 - len(raw)) + raw
+    data += bytes(-len(data) % 0x100) + kernel
+
+    found = [(offset, cls) for offset, cls, _ in img.scan(data)]
+    assert found == [(0x1000, img.BootImg2), (0x11000, img.BootImg2), (len(data) - 0x20, img.KernelImg)]
+    offset, cls, ivt = list(img.scan(data))[-1]
+    assert ivt.app_address == 0x80008000
+    assert list(img.scan(bytes(0x10000))) == []
+
+
+def test_parse_zero_copy():
+    boot = img.BootImg2(address=0x877FF000)
+    boot.app = img.SegAPP(bytes(range(256)) * 16)
+    data = bytearray(boot.export())
+
+    parsed = img.parse(data)
+    # The APP data are kept as slice of input buffer until accessed
+    assert isinstance(parsed.app._data, memoryview)
+    assert parsed.export() == bytes(data)
+    # Reading the data doesn't mark the segment as modified
+    revision = parsed.app.revision
+    assert parsed.app.data == bytes(range(256)) * 16
+    assert isinstance(parsed.app.data, bytes)
+    assert parsed.app.revision == revision
+
+
+def test_view_reader():
+    reader = img.misc.ViewReader(b'0123456789')
+    assert bytes(reader.read(4)) == b'0123'
+    assert reader.seek(-2, 1) == 2
+    assert bytes(reader.read()) == b'23456789'
+    assert reader.seek(-3, 2) == 7
+    assert bytes(reader.read(10)) == b'789'
+    assert reader.tell() == 10
+
+
+def test_export_to():
+    app = bytes(range(256)) * 17
+    boot2 = img.BootImg2(address=0x877FF000)
+    boot2.app = img.SegAPP(app)
+    boot2.dcd = img.SegDCD(enabled=True)
+    cmd = img.CmdWriteData(4)
+    cmd.append(0x20E0000, 0x5)
+    boot2.dcd.append(cmd)
+    boot3a = img.BootImg3a()
+    boot3a.add_image(app, img.EnumAppType.SCFW, 0x1000)
+    boot3b = img.BootImg3b()
+    boot3b.add_image(app, img.EnumAppType.SCFW, 0x1000)
+
+    for boot in (boot2, boot3a, boot3b):
+        data = boot.export()
+        stream = BytesIO()
+        assert boot.export_to(stream) == len(data)
+        assert stream.getvalue() == data
+    # Legacy concatenation of padded segments
+    legacy = b''.join(seg.export(True) for seg in (boot2.ivt, boot2.bdt, boot2.dcd, boot2.app, boot2.csf))
+    assert boot2.export() == legacy
+
+
+def test_layout_update():
+    boot = img.BootImg2(address=0x877FF000)
+    boot.app = img.SegAPP(bytes(0x1000))
+    calls = []
+    update_layout = boot._update_layout
+    boot._update_layout = lambda: calls.append(1) or update_layout()
+    raw = boot.export()
+    boot.info()
+    assert boot.export() == raw
+    assert len(calls) == 1
+
+    cmd = img.CmdWriteData(4)
+    cmd.append(0x20E0000, 0x5)
+    edits = [lambda: setattr(boot.app, 'data', bytes(0x1800)),
+             lambda: setattr(boot.dcd, 'enabled', True),
+             lambda: boot.dcd.append(cmd),
+             lambda: setattr(boot.csf, 'enabled', True),
+             lambda: setattr(boot, 'address', 0x80000000),
+             lambda: setattr(boot, 'plugin', True),
+             lambda: setattr(boot, 'app', img.SegAPP(bytes(0x100)))]
+    for edit in edits:
+        edit()
+        data = boot.export()
+        # Full recomputation gives the same result
+        boot._state = None
+        assert boot.export() == data
+    assert len(calls) == 1 + 2 * len(edits)
+
+    boot3a = img.BootImg3a()
+    boot3a.add_image(bytes(0x300), img.EnumAppType.SCFW, 0x1000)
+    data = boot3a.export()
+    boot3a.add_image(bytes(0x500), img.EnumAppType.A35, 0x80000000)
+    assert boot3a.export() != data
+    data = boot3a.export()
+    boot3a._state = None
+    assert boot3a.export() == data
+
+
+def test_image_cache(tmpdir):
+    boot = img.BootImg2(address=0x877FF000)
+    boot.app = img.SegAPP(bytes(range(256)) * 16)
+    boot.dcd = img.SegDCD(enabled=True)
+    cmd = img.CmdWriteData(4)
+    cmd.append(0x20E0000, 0x5)
+    boot.dcd.append(cmd)
+    raw = bytes(boot.export())
+    file = os.path.join(str(tmpdir), 'u-boot.imx')
+    with open(file, 'wb') as f:
+        f.write(bytes(0x400) + raw)
+
+    cache = img.ImageCache(os.path.join(str(tmpdir), 'cache'))
+    first = cache.parse(file)
+    second = cache.parse(file)
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert first.export() == second.export() == raw
+    assert str(first) == str(second)
+    # Modified file invalidates the entry (the last byte of DCD write value)
+    with open(file, 'r+b') as f:
+        f.seek(0x400 + img.SegIVT2.SIZE + img.SegBDT.SIZE + 15)
+        f.write(b'\x07')
+    assert list(cache.parse(file).dcd[0]) == [[0x20E0000, 0x7]]
+    assert cache.misses == 2
+    # Corrupted entry is ignored
+    entry, = os.listdir(cache.path)
+    with open(os.path.join(cache.path, entry), 'wb') as f:
+        f.write(b'IMXC')
+    assert list(cache.parse(file).dcd[0]) == [[0x20E0000, 0x7]]
+    assert cache.misses == 3
+    # The APP data stay a view of the buffer passed by caller, on hit as well as on miss
+    with open(file, 'rb') as f:
+        buffer = f.read()
+    cache.clear()
+    for misses in (4, 4):
+        parsed = cache.parse(file, buffer=buffer)
+        assert cache.misses == misses
+        assert isinstance(parsed.app._data, memoryview)
+        assert parsed.export() == bytes(buffer[0x400:])
+    # Least recently used entries are removed
+    cache.max_size = 0
+    cache.evict()
+    assert os.listdir(cache.path) == []
+    # The command line tool uses the cache only if it's enabled
+    runner = CliRunner(env={'IMX_CACHE_DIR': cache.path, 'IMX_CACHE': None})
+    assert runner.invoke(cli, ['info', file]).exit_code == 0
+    assert os.listdir(cache.path) == []
+    assert runner.invoke(cli, ['info', '--cache', file]).exit_code == 0
+    assert len(os.listdir(cache.path)) == 1
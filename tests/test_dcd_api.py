@@ -6,6 +6,7 @@
 
 import os
 import pytest
+from io import StringIO
 from imx import img
 
 # Used Directories
@@ -42,3 +43,128 @@ def test_bin_parser():
 
         assert dcd_obj is not None
         assert len(dcd_obj) == 12
+
+
+def test_bin_parser_roundtrip():
+
+    with open(DCD_BIN, 'rb') as f:
+        data = f.read()
+
+    dcd_obj = img.SegDCD.parse(data)
+    assert dcd_obj.export() == data
+    assert img.SegDCD.parse(memoryview(data)).export() == data
+
+    # Unknown command tag is reported with its position
+    index = 4 + dcd_obj[0].size
+    with pytest.raises(img.header.CorruptedException, match=hex(index)):
+        img.SegDCD.parse(data[:index] + b'\x00' + data[index + 1:])
+
+
+def test_write_data_cmd():
+    cmd = img.CmdWriteData(4)
+    for i in range(4):
+        cmd.append(0x30340000 + 4 * i, 0xFFFFFFF0 + i)
+
+    assert len(cmd) == 4
+    assert cmd.size == 4 + 4 * 8
+    assert cmd[1] == [0x30340004, 0xFFFFFFF1]
+    assert cmd[-1] == [0x3034000C, 0xFFFFFFF3]
+    assert cmd[1:3] == [[0x30340004, 0xFFFFFFF1], [0x30340008, 0xFFFFFFF2]]
+    assert list(cmd)[0] == [0x30340000, 0xFFFFFFF0]
+    with pytest.raises(IndexError):
+        cmd[4]
+
+    cmd[0] = [0x30340100, 0x1]
+    for value in ([0x30340100], [0x30340100, 0x1, 0x2]):
+        with pytest.raises(AssertionError):
+            cmd[1] = value
+    assert cmd[1:3] == [[0x30340004, 0xFFFFFFF1], [0x30340008, 0xFFFFFFF2]]
+    # The entries are updated in place
+    cmd[1][1] = 0x5
+    for entry in cmd[2:]:
+        entry[0] += 0x100
+    assert list(cmd)[1:] == [[0x30340004, 0x5], [0x30340108, 0xFFFFFFF2], [0x3034010C, 0xFFFFFFF3]]
+    address, value = cmd[2]
+    assert (address, value) == (0x30340108, 0xFFFFFFF2)
+    assert cmd.pop(3) == [0x3034010C, 0xFFFFFFF3]
+    assert len(cmd) == 3
+    assert cmd.export() == b'\xCC\x00\x1C\x04' + b''.join(
+        addr.to_bytes(4, 'big') + value.to_bytes(4, 'big') for addr, value in cmd)
+    assert list(img.CmdWriteData.parse(cmd.export())) == list(cmd)
+    cmd.clear()
+    assert len(cmd) == 0 and cmd.size == 4
+
+
+def test_txt_parser_roundtrip():
+
+    with open(DCD_TXT, 'r') as f:
+        text = f.read()
+
+    dcd_obj = img.SegDCD.parse_txt(text)
+    # The binary form of parsed text is the same as the reference binary DCD
+    with open(DCD_BIN, 'rb') as f:
+        assert dcd_obj.export() == f.read()
+    assert img.SegDCD.parse_txt(dcd_obj.export_txt()).export() == dcd_obj.export()
+
+    # Lower case and short numbers are converted too
+    dcd_obj = img.SegDCD.parse_txt("WriteValue 4 0x30340004 0x4F400005\nWriteValue 4 0x3034000c 7\n")
+    assert len(dcd_obj) == 1
+    assert list(dcd_obj[0]) == [[0x30340004, 0x4F400005], [0x3034000C, 7]]
+
+    # Comments, multi-line commands and missing arguments inside block of write commands
+    text = "WriteValue 4 0x1 0x2 # comment\nWriteValue 4 \\\n 0x3 0x4\nWriteValue 4 0x5 0x6\n"
+    assert list(img.SegDCD.parse_txt(text)[0]) == [[1, 2], [3, 4], [5, 6]]
+    with pytest.raises(SyntaxError, match="at line 2"):
+        img.SegDCD.parse_txt("WriteValue 4 0x1 0x2 0x3\nWriteValue 4 0x4\n")
+    with pytest.raises(SyntaxError, match="at line 2"):
+        img.SegDCD.parse_txt("WriteValue 4 0x1 0x2\nWriteValue 4 0x3 0x100000000\n")
+
+    # Comment at the end of every write line, mixed with plain write lines
+    text = "".join("WriteValue 4 0x{:08X} 0x{:08X}{}\n".format(4 * i, i, " # reg %d" % i if i % 3 else "")
+                   for i in range(3000))
+    dcd_obj = img.SegDCD.parse_txt(text)
+    assert len(dcd_obj) == 1
+    assert list(dcd_obj[0]) == [[4 * i, i] for i in range(3000)]
+    with pytest.raises(SyntaxError, match="at line 2999"):
+        img.SegDCD.parse_txt(text.replace("0x00000BB6 # reg", "0xZZ # reg"))
+
+
+def test_txt_parser_errors():
+
+    text = "# comment\n\nWriteValue 4 0x30340004 0x4F400005\nWriteValue 4 0x30340008 0xZZ\n"
+    with pytest.raises(SyntaxError, match="at line 4"):
+        img.SegDCD.parse_txt(text)
+
+    text = "WriteValue 4 0x30340004 0x4F400005\nCheckAllClear 4 \\\n0x307A0004\n"
+    with pytest.raises(SyntaxError, match="at line 2"):
+        img.SegDCD.parse_txt(text)
+
+    with pytest.raises(SyntaxError, match="at line 3"):
+        img.SegDCD.parse_txt("Nop\n\nUnlock XXX 0x1\n")
+
+    # Malformed numbers of the same length as 0xXXXXXXXX aren't converted by the fast path
+    for count in (2, 4):
+        with pytest.raises(SyntaxError, match="at line 1"):
+            img.SegDCD.parse_txt("WriteValue 4 0x0x112233 0x0x445566\n" * count)
+    # Malformed numbers of different lengths whose joined text is valid
+    with pytest.raises(SyntaxError, match="at line 1"):
+        img.SegDCD.parse_txt("WriteValue 4 0x123456780 x12345678\n")
+
+
+def test_txt_writer():
+
+    dcd_obj = img.SegDCD(enabled=True)
+    cmd = img.CmdWriteData(4)
+    for i in range(img.CmdWriteData.TXT_CHUNK + 1):
+        cmd.append(0x307A0000 + 4 * i, i)
+    dcd_obj.append(cmd)
+    dcd_obj.append(img.CmdCheckData(4, 0, 0x307A0004, 0x1, 5))
+
+    f = StringIO()
+    dcd_obj.write_txt(f)
+    assert f.getvalue() == dcd_obj.export_txt()
+    assert f.getvalue().count('WriteValue 4 0x') == len(cmd)
+    assert 'CheckAllClear 4 0x307A0004 0x00000001 5\n' in f.getvalue()
+    assert img.SegDCD.parse_txt(f.getvalue()).export() == dcd_obj.export()
+    assert dcd_obj.info() == ''.join(dcd_obj.iter_info())
+    assert dcd_obj.info().count(', Value: 0x') == len(cmd)
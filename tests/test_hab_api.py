@@ -0,0 +1,84 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import struct
+import pytest
+from collections import Counter
+from imx import hab
+
+# i.MX6 log: USDHC boot, read data call with address, HAB failure (invalid signature)
+MX6_LOG = struct.pack('<64I', 0x00010000, 0x00060001, 0x00080000, 0x87800000, 0x00090000, 0x00001833, *([0] * 58))
+# i.MX7 log: USDHC boot, program image call with address and tick, device init fail, unknown code
+MX7_LOG = struct.pack('<64I', 0x61000000, 0xC0000000, 0x87800000, 0x00001234, 0x8F000042, 0x00005678, 0x55000000,
+                      *([0] * 57))
+
+
+def setup_module(module):
+    # Prepare test environment
+    pass
+
+
+def teardown_module(module):
+    # Clean test environment
+    pass
+
+
+def test_mx6_log():
+    events = hab.decode_hab_log(hab.EnumDevType.IMX6, MX6_LOG)
+
+    assert [event.index for event in events] == [0, 1, 2, 4]
+    assert events[1].desc == "USDHC Boot"
+    assert events[2].address == 0x87800000
+    assert events[3].status == hab.EnumHabStatus.ERROR
+    assert events[3].reason == hab.EnumHabReason.INVALID_SIGNATURE
+
+    txt = hab.parse_hab_log(hab.EnumDevType.IMX6, MX6_LOG)
+    assert " 03. (0x87800000) -> Address: 0x87800000\n" in txt
+    assert " 05. (0x00001833) -> HAB Status Code: 0x33  Failure\n" in txt
+
+    # Unknown code is rendered by i.MX6 rules
+    event, = hab.decode_hab_log(hab.EnumDevType.IMX6, struct.pack('<64I', 0x00ABCDEF, *([0] * 63)))
+    assert event.info() == " Log Buffer Code not found\n"
+
+
+def test_mx7_log():
+    events = hab.decode_hab_log(hab.EnumDevType.IMX7, MX7_LOG)
+
+    assert [event.index for event in events] == [0, 1, 4, 6]
+    assert events[1].address == 0x87800000 and events[1].tick == 0x1234
+    assert events[2].error == 0x42 and events[2].tick == 0x5678
+    assert events[3].desc is None
+
+    txt = hab.parse_hab_log(hab.EnumDevType.IMX7, MX7_LOG)
+    assert " 03. (0x00001234) -> Tick: 0x00001234\n" in txt
+    assert "                     Error Code: 0x000042\n" in txt
+    assert " 06. Log Buffer Code not found\n" in txt
+
+
+def test_log_table():
+    table = hab.decode_hab_logs(hab.EnumDevType.IMX6, [MX6_LOG, bytes(256), MX6_LOG])
+
+    assert table['log'] == [0, 0, 0, 0, 2, 2, 2, 2]
+    assert table['code'][:4] == [0x00010000, 0x00060001, 0x00080000, 0x00090000]
+    assert [hab for hab in table['hab'] if hab is not None] == [0x1833, 0x1833]
+    assert hab.decode_hab_logs(hab.EnumDevType.IMX6, [])['log'] == []
+
+    with pytest.raises(ValueError):
+        hab.decode_hab_logs(0, [MX6_LOG])
+
+
+def test_event_statistics():
+    logs = [MX6_LOG, MX6_LOG, struct.pack('<64I', 0x00010000, *([0] * 63))]
+    events = Counter(event for data in logs for event in hab.decode_hab_log(hab.EnumDevType.IMX6, data))
+
+    assert len(events) == 4
+    assert events[hab.decode_hab_log(hab.EnumDevType.IMX6, MX6_LOG)[0]] == 3
+    assert events[hab.decode_hab_log(hab.EnumDevType.IMX6, MX6_LOG)[3]] == 2
+    # The same event words of other device type are other event
+    events = set(hab.decode_hab_log(hab.EnumDevType.IMX7, MX7_LOG))
+    boot = hab.decode_hab_log(hab.EnumDevType.IMX7, MX7_LOG)[0]
+    assert hab.HabEvent(0, 0x61000000, 0x61, boot.desc, dev_type=hab.EnumDevType.IMX7) in events
+    assert hab.HabEvent(0, 0x61000000, 0x61, boot.desc, dev_type=hab.EnumDevType.IMX6) not in events
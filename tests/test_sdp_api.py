@@ -0,0 +1,193 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import io
+import pytest
+from imx import sdp
+from imx.sdp.usb import RawHid
+from imx.sdp import TransferEngine
+from imx.sdp.sdp import SdpAbortError
+from imx.sdp.misc import atos
+from imx.sdp.simulator import RawHidSim
+
+
+class FakeHid(RawHid):
+    """ RawHid stand-in which records all written reports """
+
+    def __init__(self):
+        super().__init__()
+        self.reports = []
+        self.fail_at = None
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def write_raw(self, id, rawdata):
+        if self.fail_at is not None and len(self.reports) == self.fail_at:
+            raise Exception("USB Disconnected")
+        self.reports.append(bytes(rawdata))
+
+    def read(self, timeout=1000):
+        raise Exception("Read timed out")
+
+
+class SlowStream(io.RawIOBase):
+    """ Raw stream which returns max 100 bytes per read """
+
+    def __init__(self, data):
+        self._data = io.BytesIO(data)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def seek(self, offset, whence=0):
+        return self._data.seek(offset, whence)
+
+    def tell(self):
+        return self._data.tell()
+
+    def readinto(self, buffer):
+        return self._data.readinto(memoryview(buffer)[:100])
+
+
+def setup_module(module):
+    # Prepare test environment
+    pass
+
+
+def teardown_module(module):
+    # Clean test environment
+    pass
+
+
+def test_atos():
+    assert atos(b'') == ''
+    assert atos(b'\x01\xAB\xff') == '01 AB FF '
+    assert atos(bytearray(b'\x01\xAB'), sep='', fmt='02x') == '01ab'
+    assert atos(b'\x0a\x0b', sep=', ', fmt='02X') == '0A, 0B, '
+    assert atos(b'Hi\x00\x80', fmt='c') == 'H i . . '
+    assert atos([1, 2], fmt='d') == '1 2 '
+
+
+def test_encode_packet():
+    hid = FakeHid()
+    full = hid._encode_packet(0x02, bytes(range(1, 9)), 8)
+    assert bytes(full) == b'\x02' + bytes(range(1, 9))
+    short = hid._encode_packet(0x02, b'\xAA\xBB', 8)
+    assert bytes(short) == b'\x02\xAA\xBB' + bytes(6)
+    # The same buffer is reused for all packets of the same length
+    assert full is short
+
+
+def test_send_data_chunks():
+    hid = FakeHid()
+    flasher = sdp.SdpMX67(hid)
+    flasher.opened = True
+    data = bytes(i & 0xFF for i in range(2500))
+    flasher._send_data(data)
+
+    assert len(hid.reports) == 3
+    assert all(len(report) == 1025 and report[0] == 0x02 for report in hid.reports)
+    assert b''.join(report[1:] for report in hid.reports)[:len(data)] == data
+    assert hid.reports[-1][1 + 2500 - 2048:] == bytes(1024 - (2500 - 2048))
+
+
+def test_send_data_stream():
+    data = bytes(i & 0xFF for i in range(2500))
+    hid = FakeHid()
+    flasher = sdp.SdpMX67(hid)
+    flasher.opened = True
+    flasher._send_data(data)
+
+    for stream in (io.BytesIO(data), SlowStream(data)):
+        shid = FakeHid()
+        flasher = sdp.SdpMX67(shid)
+        flasher.opened = True
+        flasher._send_data(stream)
+        assert shid.reports == hid.reports
+        assert flasher.transfer_stats.length == len(data)
+
+
+def test_send_data_engine():
+    data = bytes(i & 0xFF for i in range(10000))
+    hid = FakeHid()
+    flasher = sdp.SdpMX67(hid)
+    flasher.opened = True
+    flasher._send_data(data)
+    # The pipelined engine must send exactly the same reports
+    ehid = FakeHid()
+    flasher = sdp.SdpMX67(ehid, engine=TransferEngine(depth=2))
+    flasher.opened = True
+    flasher._send_data(data)
+
+    assert ehid.reports == hid.reports
+    assert flasher.transfer_stats.length == len(data)
+    assert flasher.transfer_stats.packets == 10
+
+
+def test_send_data_engine_abort():
+    hid = FakeHid()
+    flasher = sdp.SdpMX67(hid, engine=TransferEngine())
+    flasher.opened = True
+    flasher.pg_resolution = 1
+    flasher.pg_handler = lambda value: value < 50
+    with pytest.raises(SdpAbortError):
+        flasher._send_data(bytes(10240))
+    assert len(hid.reports) == 6
+
+
+def test_send_data_engine_error():
+    hid = FakeHid()
+    hid.fail_at = 3
+    flasher = sdp.SdpMX67(hid, engine=TransferEngine())
+    flasher.opened = True
+    with pytest.raises(sdp.SdpDataError):
+        flasher._send_data(bytes(10240))
+    assert len(hid.reports) == 3
+
+
+def test_read_many():
+    hid = RawHidSim()
+    hid.memory.write(0x1000, bytes(range(32)))
+    flasher = sdp.SdpMX67(hid)
+    flasher.open()
+    values = flasher.read_many([0x1008, 0x1000, 0x1004, 0x1010, 0x1000])
+
+    assert values == [0x0B0A0908, 0x03020100, 0x07060504, 0x13121110, 0x03020100]
+    assert hid.commands == [RawHidSim.READ] * 2
+    assert flasher.saved_round_trips == 3
+    # Read the gap instead of sending next command
+    hid.commands.clear()
+    assert flasher.read_many([0x1000, 0x1010], max_gap=12) == [0x03020100, 0x13121110]
+    assert hid.commands == [RawHidSim.READ]
+
+
+def test_write_many():
+    pairs = [(0x20C4068 + 4 * i, i) for i in range(300)]
+    hid = RawHidSim()
+    flasher = sdp.SdpMX67(hid)
+    flasher.open()
+    flasher.write_many(pairs, dcd_address=0x910000)
+
+    assert hid.commands == [RawHidSim.WDCD] * 2
+    assert flasher.saved_round_trips == 298
+    assert hid.memory.read(0x910000, 4) == b'\xD2\x02\x88\x41'
+    assert all(hid.memory.read_value(address) == value for address, value in pairs)
+    # Without DCD address every value is written by WRITE command
+    hid = RawHidSim()
+    flasher = sdp.SdpMX67(hid)
+    flasher.open()
+    flasher.write_many(pairs[:3])
+
+    assert hid.commands == [RawHidSim.WRITE] * 3
+    assert flasher.saved_round_trips == 0
+    assert hid.memory.read_value(0x20C4070) == 2
@@ -0,0 +1,94 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import struct
+from click.testing import CliRunner
+from imx import img
+from imx.sdp.usb import RawHid
+from imx.sdp.__main__ import cli, load_image
+
+
+class FileHid(RawHid):
+    """ RawHid stand-in of i.MX6UL which accepts WFILE command """
+
+    def __init__(self, serial, fail=False):
+        super().__init__()
+        self.vid = 0x15A2
+        self.pid = 0x007D
+        self.product_name = "SE Blank 6UL #%d" % serial
+        self.fail = fail
+        self.received = bytearray()
+        self._pending = 0
+        self._rx = []
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def write_raw(self, id, rawdata):
+        if id == 0x01:
+            cmd, address, format, count, value = struct.unpack_from('>HIBII', rawdata, 1)
+            assert cmd == 0x0404
+            self._pending = count
+        else:
+            if self.fail:
+                raise Exception("USB Disconnected")
+            self.received += rawdata[1:1 + self._pending]
+            self._pending -= min(self._pending, len(rawdata) - 1)
+            if self._pending == 0:
+                self._rx += [(0x03, struct.pack('I', 0x56787856)), (0x04, struct.pack('I', 0x88888888))]
+
+    def read(self, timeout=1000):
+        if not self._rx:
+            raise Exception("Read timed out")
+        return self._rx.pop(0)
+
+
+def setup_module(module):
+    # Prepare test environment
+    pass
+
+
+def teardown_module(module):
+    # Clean test environment
+    pass
+
+
+def test_wimg_all(monkeypatch, tmp_path):
+    devices = [FileHid(0), FileHid(1, fail=True), FileHid(2)]
+    monkeypatch.setattr(RawHid, 'enumerate', staticmethod(lambda vid=None, pid=None: devices))
+    data = bytes(i & 0xFF for i in range(5000))
+    file = tmp_path / "image.bin"
+    file.write_bytes(data)
+
+    result = CliRunner().invoke(cli, ['-t', 'MX6UL', 'wimg', '--all', '-a', '0x80000000', str(file)], obj={})
+
+    assert result.exit_code == 1
+    assert "2 passed, 1 failed" in result.output
+    assert result.output.count(" OK") == 2
+    assert "SE Blank 6UL #1" in result.output
+    assert devices[0].received == data
+    assert devices[2].received == data
+
+
+def test_load_image(tmp_path):
+    # The empty file is loaded as zero length data
+    file = tmp_path / "empty.bin"
+    file.write_bytes(b'')
+    data, boot, addr = load_image(str(file), 0x80000000, 0)
+    assert len(data) == 0 and boot is None and addr == 0x80000000
+
+    # The APP data of *.imx image stay a view of mapped file
+    boot = img.BootImg2(address=0x877FF000)
+    boot.app = img.SegAPP(bytes(range(256)) * 16)
+    file = tmp_path / "u-boot.imx"
+    file.write_bytes(boot.export())
+    data, boot, addr = load_image(str(file), None, 0)
+    assert isinstance(boot.app._data, memoryview)
+    assert addr == boot.address + boot.offset
+    assert bytes(data) == file.read_bytes()
@@ -0,0 +1,162 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import time
+import threading
+import pytest
+from click.testing import CliRunner
+from imx import sdp
+from imx.img import SegDCD, CmdWriteData
+from imx.sdp.simulator import RawHidSim, SimBus
+from imx.sdp.server import SdpServer, SdpClient
+from imx.sdp.__main__ import cli
+
+
+def setup_module(module):
+    # Prepare test environment
+    pass
+
+
+def teardown_module(module):
+    # Clean test environment
+    pass
+
+
+@pytest.fixture
+def server(tmp_path):
+    bus = SimBus([RawHidSim(*sdp.SdpMX67.DEVICES['MX6UL']), RawHidSim(*sdp.SdpMXRT.DEVICES['MXRT'], locked=True)])
+    server = SdpServer(str(tmp_path / 'imxsd.sock'), backend=bus)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+    server.server_close()
+
+
+def test_remote_session(server):
+    client = SdpClient(server.path)
+    devices = client.scan()
+    assert sorted(dev.device_name for dev in devices) == ['MX6UL', 'MXRT']
+
+    flasher = client.scan('MX6UL')[0]
+    hid = [dev.flasher.usbd for dev in server.sessions.values() if dev.flasher.device_name == 'MX6UL'][0]
+    assert flasher.usbd.info == hid.info
+    flasher.open()
+    flasher.write(0x20E0000, 0xA5A5, 2, 16)
+    assert flasher.read(0x20E0000, 4) == b'\xA5\xA5\x00\x00'
+    assert flasher.read_many([0x20E0000, 0x20E0004]) == [0xA5A5, 0]
+
+    data = bytes(i & 0xFF for i in range(100000))
+    flasher.write_file(0x80000000, memoryview(data))
+    assert hid.memory.read(0x80000000, len(data)) == data
+    assert flasher.transfer_stats.length == len(data)
+
+    cmd = CmdWriteData(4)
+    cmd.append(0x20E0004, 0x12345678)
+    dcd = SegDCD(enabled=True)
+    dcd.append(cmd)
+    flasher.write_dcd(0x910000, dcd.export())
+    assert hid.memory.read_value(0x20E0004) == 0x12345678
+    assert flasher.read_status() == RawHidSim.HAB_SUCCESS
+    flasher.jump_and_run(0x80000000)
+    assert hid.jump_address == 0x80000000
+    flasher.close()
+
+    # The device stays opened by server, next client doesn't enumerate it again
+    assert hid.opened
+    assert SdpClient(server.path).scan('MX6UL')[0].read(0x20E0004, 4) == b'\x78\x56\x34\x12'
+    assert server.scans == 1
+    client.scan('MX6UL', rescan=True)
+    assert server.scans == 2
+
+
+def test_remote_errors(server):
+    flasher = SdpClient(server.path).scan('MXRT')[0]
+    with pytest.raises(sdp.SdpSecureError):
+        flasher.read(0x0, 4)
+    with pytest.raises(Exception, match='not aligned'):
+        flasher.read(0x2, 4)
+    flasher.close()
+    with pytest.raises(sdp.SdpConnectionError):
+        SdpClient(server.path + '.none').scan()
+
+
+def test_cli_server(server):
+    runner = CliRunner()
+    result = runner.invoke(cli, ['-S', server.path, '-t', 'MX6UL', 'wreg', '0x20E0000', '0x1234'], obj={})
+    assert result.exit_code == 0
+    result = runner.invoke(cli, ['-t', 'MX6UL', 'rreg', '0x20E0000'], obj={}, env={'IMXSD_SERVER': server.path})
+    assert result.exit_code == 0
+    assert "REG32[0x020E0000] = 0x00001234" in result.output
+    assert server.scans == 1
+    # The device connected after the first scan is found only with -R/--rescan
+    server.backend.devices.append(RawHidSim(*sdp.SdpMX67.DEVICES['MX6UL'], product_name="SE Blank 6UL #2"))
+    result = runner.invoke(cli, ['-S', server.path, '-t', 'MX6UL', 'rreg', '0x20E0000'], obj={}, input='0\n')
+    assert "SE Blank 6UL #2" not in result.output
+    result = runner.invoke(cli, ['-S', server.path, '-R', '-t', 'MX6UL', 'rreg', '0x20E0000'], obj={}, input='0\n')
+    assert result.exit_code == 0
+    assert "SE Blank 6UL #2" in result.output
+    assert server.scans == 2
+
+
+def test_cli_server_wimg_all(tmp_path):
+    hids = [RawHidSim(*sdp.SdpMX67.DEVICES['MX6UL'], product_name="SE Blank 6UL #%d" % i) for i in range(3)]
+    server = SdpServer(str(tmp_path / 'imxsd.sock'), backend=SimBus(hids))
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        data = bytes(i & 0xFF for i in range(50000))
+        file = tmp_path / "image.bin"
+        file.write_bytes(data)
+        result = CliRunner().invoke(cli, ['-S', server.path, '-t', 'MX6UL', 'wimg', '--all', '-a', '0x80000000',
+                                          str(file)], obj={})
+        assert result.exit_code == 0
+        assert "3 passed, 0 failed" in result.output
+        for hid in hids:
+            assert hid.memory.read(0x80000000, len(data)) == data
+        # The newly connected device is found without -R/--rescan
+        hids.append(RawHidSim(*sdp.SdpMX67.DEVICES['MX6UL'], product_name="SE Blank 6UL #3"))
+        server.backend.devices.append(hids[-1])
+        result = CliRunner().invoke(cli, ['-S', server.path, '-t', 'MX6UL', 'wimg', '--all', '-a', '0x80000000',
+                                          str(file)], obj={})
+        assert "4 passed, 0 failed" in result.output
+        assert hids[-1].memory.read(0x80000000, len(data)) == data
+    finally:
+        server.shutdown()
+        thread.join()
+        server.server_close()
+
+
+def test_rescan_sessions(server, monkeypatch):
+    client = SdpClient(server.path)
+    flasher = client.scan('MX6UL')[0]
+    flasher.open()
+    flasher.write(0x20E0000, 0x5A5A)
+    idle = client.scan('MXRT')[0]
+    hids = {session.flasher.device_name: session.flasher.usbd for session in server.sessions.values()}
+    reopened = []
+    for hid in hids.values():
+        monkeypatch.setattr(hid, 'open', lambda hid=hid: reopened.append(hid))
+
+    # Scan of not connected target enumerates the devices again, the opened devices are not touched
+    assert SdpClient(server.path).scan('MX8QM') == []
+    assert server.scans == 2
+    assert flasher.id in server.sessions and idle.id in server.sessions
+    assert reopened == []
+    assert flasher.read(0x20E0000, 4) == b'\x5A\x5A\x00\x00'
+
+    # Only the newly connected device is opened, the session of disconnected device is dropped
+    bus = server.backend
+    bus.devices.remove(hids['MXRT'])
+    bus.devices.append(RawHidSim(*sdp.SdpMX8.DEVICES['MX8QM']))
+    assert [dev.device_name for dev in client.scan('MX8QM')] == ['MX8QM']
+    assert server.scans == 3
+    assert sorted(session.flasher.device_name for session in server.sessions.values()) == ['MX6UL', 'MX8QM']
+    assert not hids['MXRT'].opened and reopened == []
+    with pytest.raises(sdp.SdpConnectionError, match="scan the devices again"):
+        idle.read(0x0, 4)
+    flasher.close()
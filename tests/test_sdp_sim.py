@@ -0,0 +1,107 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import pytest
+from imx import sdp
+from imx.img import SegDCD, CmdWriteData, EnumWriteOps
+from imx.sdp.simulator import RawHidSim, SimBus, SparseMemory
+from imx.sdp.info import HAB_LOG_SIZE
+
+
+def setup_module(module):
+    # Prepare test environment
+    pass
+
+
+def teardown_module(module):
+    # Clean test environment
+    pass
+
+
+def test_sparse_memory():
+    mem = SparseMemory(fill=0xFF)
+    mem.write(0x0FFE, b'\x01\x02\x03\x04')
+    assert mem.read(0x0FFC, 8) == b'\xFF\xFF\x01\x02\x03\x04\xFF\xFF'
+    assert len(mem) == 2 * SparseMemory.PAGE_SIZE
+    mem.write_value(0x2000, 0x12345678)
+    assert mem.read_value(0x2000) == 0x12345678
+    assert mem.read_value(0x2000, 2) == 0x5678
+
+
+def test_scan_usb():
+    bus = SimBus([RawHidSim(0x15A2, 0x007D), RawHidSim(0x1FC9, 0x0129), RawHidSim(0x1FC9, 0x0130)])
+
+    devices = sdp.scan_usb(backend=bus)
+    assert sorted(type(dev).__name__ for dev in devices) == ['SdpMX67', 'SdpMX8', 'SdpMXRT']
+    devices = sdp.scan_usb('MX6UL', backend=bus)
+    assert len(devices) == 1 and devices[0].device_name == 'MX6UL'
+    assert len(sdp.scan_usb('0x1FC9:0x0129', backend=bus)) == 1
+    assert sdp.scan_usb('MX6SX', backend=bus) == []
+
+
+@pytest.mark.parametrize("name", ['MX6UL', 'MX8QM', 'MXRT'])
+def test_end_to_end(name):
+    vid, pid = [cls for cls in sdp.sdp.SDP_CLS if name in cls.DEVICES][0].DEVICES[name]
+    hid = RawHidSim(vid, pid)
+    flasher = sdp.scan_usb(name, backend=SimBus([hid]))[0]
+    flasher.open()
+
+    flasher.write(0x20E0000, 0xA5A5, 2, 16)
+    assert flasher.read(0x20E0000, 4) == b'\xA5\xA5\x00\x00'
+
+    data = bytes(i & 0xFF for i in range(100000))
+    flasher.write_file(0x80000000, data)
+    assert hid.memory.read(0x80000000, len(data)) == data
+    assert flasher.transfer_stats.length == len(data)
+
+    cmd = CmdWriteData(4, EnumWriteOps.SET_BITMASK)
+    cmd.append(0x20E0000, 0x10000)
+    dcd = SegDCD(enabled=True)
+    dcd.append(cmd)
+    flasher.write_dcd(0x910000, dcd.export())
+    assert hid.memory.read_value(0x20E0000) == 0x1A5A5
+
+    if name == 'MX6UL':
+        flasher.write_csf(0x900000, bytes(64))
+        flasher.skip_dcd()
+
+    assert flasher.read_status() == RawHidSim.HAB_SUCCESS
+    flasher.jump_and_run(0x80000000)
+    assert hid.jump_address == 0x80000000
+    flasher.close()
+
+
+def test_locked_device():
+    flasher = sdp.SdpMX67(RawHidSim(locked=True))
+    flasher.open()
+    with pytest.raises(sdp.SdpSecureError):
+        flasher.read(0x0, 4)
+
+
+def test_read_dev_info():
+    hid = RawHidSim(*sdp.SdpMX67.DEVICES['MX6UL'])
+    hid.memory.write_value(0x00012A04, 0x007D)
+    hid.memory.write_value(0x00000080, 0x10)
+    hid.memory.write_value(0x020C8260, 0x00640001)
+    hid.memory.write_value(0x020D8004, 0x12345678)
+    hid.memory.write_value(0x020D801C, 0x01000012)
+    hid.memory.write_value(0x020D8044, 0xA5A5A5A5)
+    hid.memory.write_value(0x021BC460, 0x00200000)
+    hid.memory.write(0x00901D14, bytes([0xF0, 0x00, 0x33]) + bytes(HAB_LOG_SIZE - 3))
+    flasher = sdp.SdpMX67(hid)
+    flasher.open()
+
+    info = sdp.read_dev_info(flasher)
+    assert info.desc == 'iMX6 UltraLite'
+    assert info.rom_release == '01.01.00'
+    assert info.silicon_rev == (1, 1)
+    assert info.wdog_enabled
+    assert info.boot_mode == 1
+    assert (info.sbmr1, info.persist) == (0x12345678, 0xA5A5A5A5)
+    assert len(info.hab_log) == HAB_LOG_SIZE
+    assert 'Serial Downloader' in info.info()
+    # PID words, ROM version, ANALOG, SRC, OCOTP and HAB log are read by a few READ commands
+    assert hid.commands.count(RawHidSim.READ) <= 6
@@ -0,0 +1,156 @@
+# Copyright (c) 2017-2018 Martin Olejar
+#
+# SPDX-License-Identifier: BSD-3-Clause
+# The BSD-3-Clause license for this file can be found in the LICENSE file included with this distribution
+# or at https://spdx.org/licenses/BSD-3-Clause.html#licenseText
+
+import os
+import time
+import threading
+import pytest
+from imx.sdp.usb import RxQueue
+
+posix_only = pytest.mark.skipif(os.name != 'posix', reason="PyUSB backend only")
+
+if os.name == 'posix':
+    import usb.core
+    import usb.util
+    from imx.sdp.usb import RawHid
+
+
+class FakeEndpoint(object):
+
+    def __init__(self, address, attributes=0x03):
+        self.bEndpointAddress = address
+        self.bmAttributes = attributes
+
+
+class FakeDevice(object):
+    """ pyusb Device stand-in with one HID interface """
+
+    def __init__(self, endpoints, vid=0x15A2, pid=0x0054):
+        self.idVendor = vid
+        self.idProduct = pid
+        self.endpoints = endpoints
+        self.ctrl = []
+        self.out = []
+        self.calls = []
+
+    def get_active_configuration(self):
+        return {(0, 0): self.endpoints}
+
+    def is_kernel_driver_active(self, interface):
+        return False
+
+    def set_configuration(self):
+        self.calls.append('set_configuration')
+
+    def reset(self):
+        self.calls.append('reset')
+
+    def ctrl_transfer(self, bmRequestType, bRequest, wValue, wIndex, data):
+        self.ctrl.append((bmRequestType, bRequest, wValue, wIndex, bytes(data)))
+
+    def write(self, endpoint, data, timeout):
+        self.out.append((endpoint, bytes(data)))
+
+
+def setup_module(module):
+    # Prepare test environment
+    pass
+
+
+def teardown_module(module):
+    # Clean test environment
+    pass
+
+
+def enumerate_fake(monkeypatch, device):
+    monkeypatch.setattr(usb.core, 'find', lambda *args, **kwargs: [device])
+    monkeypatch.setattr(usb.util, 'get_string', lambda dev, index: "SE Blank\0")
+    devices = RawHid.enumerate(0x15A2, 0x0054)
+    assert len(devices) == 1
+    devices[0].open()
+    return devices[0]
+
+
+@posix_only
+def test_find_endpoints():
+    dev = FakeDevice([FakeEndpoint(0x82), FakeEndpoint(0x01, 0x02), FakeEndpoint(0x03)])
+    assert RawHid.find_endpoints(dev) == (0x82, 0x03)
+    dev = FakeDevice([FakeEndpoint(0x81)])
+    assert RawHid.find_endpoints(dev) == (0x81, None)
+
+
+@posix_only
+def test_interrupt_out_transport(monkeypatch):
+    dev = FakeDevice([FakeEndpoint(0x81), FakeEndpoint(0x02)])
+    hid = enumerate_fake(monkeypatch, dev)
+    assert hid.transport == 'INT-OUT'
+    hid.write(0x01, b'\x01\x02', 16)
+    assert dev.out == [(0x02, b'\x01\x01\x02' + bytes(14))]
+    assert dev.ctrl == []
+
+
+@posix_only
+def test_control_transport(monkeypatch):
+    dev = FakeDevice([FakeEndpoint(0x81)])
+    hid = enumerate_fake(monkeypatch, dev)
+    assert hid.transport == 'EP0'
+    hid.write(0x02, b'\xAA', 4)
+    assert dev.ctrl == [(0x21, 0x09, 0x202, 0, b'\x02\xAA\x00\x00\x00')]
+    assert dev.out == []
+
+
+@posix_only
+def test_deferred_enumeration(monkeypatch):
+    from imx.sdp import scan_usb, SdpMX67, SdpConnectionError
+    devices = [FakeDevice([FakeEndpoint(0x81)], 0x15A2, 0x007D), FakeDevice([FakeEndpoint(0x81)], 0x046D, 0xC52B)]
+    strings = []
+    monkeypatch.setattr(usb.core, 'find', lambda *args, **kwargs: devices)
+    monkeypatch.setattr(usb.util, 'get_string', lambda dev, index: strings.append(index) or "SE Blank\0")
+
+    # Only supported devices are wrapped, nothing is sent to the devices while scanning
+    flashers = scan_usb()
+    assert len(flashers) == 1 and isinstance(flashers[0], SdpMX67)
+    assert devices[0].calls == devices[1].calls == [] and strings == []
+
+    hid = flashers[0].usbd
+    assert hid.product_name == "SE Blank" and hid.product_name == "SE Blank"
+    assert strings == [2]
+    flashers[0].open()
+    flashers[0].close()
+    flashers[0].open()
+    assert devices[0].calls == ['set_configuration', 'reset']
+    assert devices[1].calls == []
+
+    # The configuration error is reported by open() as connection error
+    def set_configuration():
+        raise usb.core.USBError('Resource busy')
+    devices[0].set_configuration = set_configuration
+    flashers = scan_usb('0x15A2:0x007D')
+    assert isinstance(flashers[0], SdpMX67)
+    with pytest.raises(SdpConnectionError, match="Resource busy"):
+        flashers[0].open()
+
+
+def test_rx_queue():
+    rxq = RxQueue()
+    rxq.put(b'\x03\x01')
+    rxq.put(b'\x04\x02')
+    assert len(rxq) == 2
+    assert rxq.get(0) == b'\x03\x01'
+    assert rxq.get(0) == b'\x04\x02'
+    with pytest.raises(Exception, match="Read timed out"):
+        rxq.get(10)
+
+
+def test_rx_queue_wakeup():
+    rxq = RxQueue()
+    timer = threading.Timer(0.05, rxq.put, args=(b'\x03\x01',))
+    timer.start()
+    start = time.perf_counter()
+    # The reader must be woken up by put() and not wait for the whole timeout
+    assert rxq.get(5000) == b'\x03\x01'
+    assert time.perf_counter() - start < 2
+    timer.join()